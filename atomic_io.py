@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原子写入 - 先写同目录临时文件并刷到磁盘，再改名替换目标文件
+
+- 写入中途崩溃时目标文件保持原样，不会出现写了一半的文件
+- 目标文件被其他程序（如 Word、Excel、网络共享）占用时按退避间隔重试
+- snapshot=True 时替换前把旧文件硬链接为 .bak（不复制内容），
+  启动时 check_integrity() 发现文件损坏可从 .bak 恢复
+- 启动时只清理超过一定时间的临时文件，不影响其他实例（共享目录）正在进行的写入
+"""
+
+import os
+import json
+import time
+import errno
+import threading
+import zipfile
+
+
+TEMP_SUFFIX = ".atomic"
+BACKUP_SUFFIX = ".bak"
+
+# 超过该时间（秒）的临时文件视为上次崩溃遗留
+STALE_TEMP_AGE = 3600
+
+# Windows 拒绝访问 / 共享冲突 / 锁定冲突
+# 目标被其他程序（如 Word）打开且不允许删除共享时，改名替换（MoveFileEx）报的是 5 而不是 32
+_SHARING_WINERRORS = (5, 32, 33)
+
+
+def _is_sharing_violation(error):
+    """文件可能被占用时才重试
+    Windows 上 5 也可能是真正的无权限（只读文件等），此时重试用完后照常抛出
+    POSIX 上只有 EBUSY 重试，EACCES/EPERM 重试也不会成功
+    """
+    if getattr(error, 'winerror', None) in _SHARING_WINERRORS:
+        return True
+    return error.errno == errno.EBUSY
+
+
+def _retry(func, retries, backoff):
+    """目标被占用时重试，等待时间依次加倍"""
+    delay = backoff
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except OSError as e:
+            if attempt == retries or not _is_sharing_violation(e):
+                raise
+            time.sleep(delay)
+            delay *= 2
+
+
+def _fsync_dir(dirpath):
+    """改名后刷新目录项（Windows 不支持，跳过）"""
+    if os.name != 'posix':
+        return
+    try:
+        fd = os.open(dirpath, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _snapshot(path):
+    """把现有文件硬链接为 .bak；不支持硬链接时改名为 .bak"""
+    if not os.path.exists(path):
+        return
+    backup_path = path + BACKUP_SUFFIX
+    link_path = backup_path + TEMP_SUFFIX
+    try:
+        if os.path.exists(link_path):
+            os.remove(link_path)
+        os.link(path, link_path)
+        os.replace(link_path, backup_path)
+    except OSError:
+        # 改名后到新文件就位前目标文件不存在，启动检查会从 .bak 恢复
+        os.replace(path, backup_path)
+
+
+def atomic_write(path, writer, mode='wb', encoding=None, retries=5, backoff=0.1, snapshot=False):
+    """原子写入文件，writer(f) 负责写入内容"""
+    dirpath = os.path.dirname(os.path.abspath(path))
+    os.makedirs(dirpath, exist_ok=True)
+    # 进程号 + 线程号：同时写同一文件的各个写入者使用各自的临时文件
+    temp_name = f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}{TEMP_SUFFIX}"
+    temp_path = os.path.join(dirpath, temp_name)
+
+    try:
+        with open(temp_path, mode, encoding=encoding) as f:
+            writer(f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        if snapshot:
+            _retry(lambda: _snapshot(path), retries, backoff)
+        _retry(lambda: os.replace(temp_path, path), retries, backoff)
+        _fsync_dir(dirpath)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def atomic_write_json(path, content, indent=None, compact=False, snapshot=False):
+    """原子写入 JSON 文件"""
+    separators = (',', ':') if compact else None
+    atomic_write(
+        path,
+        lambda f: json.dump(content, f, ensure_ascii=False, indent=indent, separators=separators),
+        mode='w', encoding='utf-8', snapshot=snapshot,
+    )
+
+
+def atomic_save(document, path, snapshot=False):
+    """原子保存 python-docx / openpyxl 文档（二者都支持保存到文件对象）"""
+    atomic_write(path, document.save, snapshot=snapshot)
+
+
+# ---------- 启动检查 ----------
+
+def _json_ok(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            json.load(f)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def _zip_ok(path):
+    try:
+        with zipfile.ZipFile(path) as zf:
+            return zf.testzip() is None
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+def _restore(path):
+    """从 .bak 恢复，损坏的文件保留为 .corrupt 便于排查"""
+    backup_path = path + BACKUP_SUFFIX
+    if os.path.exists(path):
+        os.replace(path, path + ".corrupt")
+    temp_path = path + TEMP_SUFFIX
+    try:
+        os.link(backup_path, temp_path)
+    except OSError:
+        import shutil
+        shutil.copyfile(backup_path, temp_path)
+    os.replace(temp_path, path)
+
+
+def check_file(path, validator):
+    """检查一个文件，损坏或缺失时从 .bak 恢复；返回说明文字，正常时返回None"""
+    backup_path = path + BACKUP_SUFFIX
+    if os.path.exists(path):
+        if validator(path):
+            return None
+        if os.path.exists(backup_path) and validator(backup_path):
+            _restore(path)
+            return f"{os.path.basename(path)} 已损坏，已从上次备份恢复"
+        return f"{os.path.basename(path)} 已损坏，且没有可用的备份"
+
+    if os.path.exists(backup_path) and validator(backup_path):
+        _restore(path)
+        return f"{os.path.basename(path)} 缺失，已从上次备份恢复"
+    return None
+
+
+def remove_stale_temp_files(dirpath, max_age=STALE_TEMP_AGE):
+    """删除上次崩溃留下的临时文件
+    只删除超过 max_age 秒未修改的，其他进程（可能在另一台电脑上）正在写入的临时文件保留
+    """
+    removed = 0
+    if not os.path.isdir(dirpath):
+        return removed
+    cutoff = time.time() - max_age
+    for filename in os.listdir(dirpath):
+        if filename.endswith(TEMP_SUFFIX):
+            path = os.path.join(dirpath, filename)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def check_integrity(base_dir):
+    """启动检查：案件索引、生成记录和名称汇总表，返回问题说明列表"""
+    from case_index import INDEX_DIR, LEGACY_INDEX_FILE
+
+    messages = []
+    index_dir = os.path.join(base_dir, INDEX_DIR)
+    targets = []
+
+    for dirpath in (base_dir, index_dir):
+        remove_stale_temp_files(dirpath)
+
+    if os.path.isdir(index_dir):
+        names = {name[:-len(BACKUP_SUFFIX)] if name.endswith(BACKUP_SUFFIX) else name
+                 for name in os.listdir(index_dir)}
+        for name in sorted(names):
+            if name.endswith('.json'):
+                targets.append((os.path.join(index_dir, name), _json_ok))
+
+    targets.append((os.path.join(base_dir, LEGACY_INDEX_FILE), _json_ok))
+    targets.append((os.path.join(base_dir, "generated_files.json"), _json_ok))
+    for name in sorted(os.listdir(base_dir)):
+        if name.endswith(".xlsx") or name.endswith(".xlsx" + BACKUP_SUFFIX):
+            path = os.path.join(base_dir, name[:-len(BACKUP_SUFFIX)] if name.endswith(BACKUP_SUFFIX) else name)
+            if (path, _zip_ok) not in targets:
+                targets.append((path, _zip_ok))
+
+    for path, validator in targets:
+        try:
+            message = check_file(path, validator)
+        except OSError as e:
+            message = f"检查 {os.path.basename(path)} 失败: {e}"
+        if message:
+            messages.append(message)
+    return messages
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+案件归档包 - 把一年或指定案件的文件夹和索引导出为一个 zip/tar 包，在另一处导入
+
+包内结构:
+    cases/<年份>/<案本号>/...   案件文件
+    cases_index.json           这些案件的索引条目
+    manifest.json              文件清单和 sha256
+
+- 文件按块流式读写，内存占用与案件大小无关
+- 导出中断后再次执行同一导出会从上次的检查点继续
+- 导入时逐个文件校验哈希；已存在且哈希一致的文件跳过，中断后重新导入即可继续
+"""
+
+import os
+import io
+import json
+import base64
+import hashlib
+import tarfile
+import zipfile
+from datetime import datetime
+
+from atomic_io import atomic_write_json
+from case_index import case_year
+from case_records import CaseRecord
+
+
+MANIFEST_NAME = 'manifest.json'
+INDEX_NAME = 'cases_index.json'
+CASES_PREFIX = 'cases/'
+
+CHUNK_SIZE = 1024 * 1024
+
+# 距上次检查点写入超过这么多字节后保存一次进度
+CHECKPOINT_BYTES = 32 * 1024 * 1024
+
+# 本身已压缩的文件直接存储，不再压缩
+STORED_SUFFIXES = ('.docx', '.xlsx', '.pdf', '.zip', '.jpg', '.jpeg', '.png')
+
+
+class ArchiveError(Exception):
+    """归档包格式或内容错误"""
+
+
+def select_year_cases(case_index, year):
+    """某一年份文件夹下的全部案件"""
+    cases = case_index.cases(year)
+    cases.sort(key=lambda case: case['case_number'])
+    return cases
+
+
+def iter_case_files(base_dir, case):
+    """案件文件夹中的全部文件 (包内路径, 本地路径)，跳过 Word 临时文件"""
+    folder_path = case.get('folder_path', '').strip('/')
+    folder = os.path.join(base_dir, folder_path)
+    if not folder_path or not os.path.isdir(folder):
+        return
+
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.startswith('~$'):
+                continue
+            path = os.path.join(root, filename)
+            rel_path = os.path.relpath(path, base_dir).replace(os.sep, '/')
+            yield CASES_PREFIX + rel_path, path
+
+
+class _HashingReader:
+    """读取时同时计算 sha256"""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.sha = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size=-1):
+        chunk = self.fileobj.read(size)
+        self.sha.update(chunk)
+        self.size += len(chunk)
+        return chunk
+
+
+class _ZipSink:
+    """写入 zip 包；检查点保存数据末尾位置和当时的中央目录"""
+
+    def __init__(self, fileobj, resume):
+        self.fileobj = fileobj
+        self.zf = zipfile.ZipFile(fileobj, 'a' if resume else 'w', allowZip64=True)
+
+    def add_file(self, arcname, path):
+        info = zipfile.ZipInfo.from_file(path, arcname)
+        if arcname.lower().endswith(STORED_SUFFIXES):
+            info.compress_type = zipfile.ZIP_STORED
+        else:
+            info.compress_type = zipfile.ZIP_DEFLATED
+
+        with open(path, 'rb') as src:
+            reader = _HashingReader(src)
+            with self.zf.open(info, 'w', force_zip64=True) as dst:
+                while True:
+                    chunk = reader.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+        return reader.sha.hexdigest(), reader.size
+
+    def add_bytes(self, arcname, data):
+        self.zf.writestr(arcname, data, compress_type=zipfile.ZIP_DEFLATED)
+
+    def checkpoint(self):
+        # 关闭一次让文件成为完整的 zip，再以追加方式打开继续写
+        data_end = self.fileobj.tell()
+        self.zf.close()
+        self.fileobj.seek(data_end)
+        directory = self.fileobj.read()
+        self.zf = zipfile.ZipFile(self.fileobj, 'a', allowZip64=True)
+        return {'data_end': data_end, 'directory': base64.b64encode(directory).decode('ascii')}
+
+    @staticmethod
+    def restore(fileobj, state):
+        fileobj.truncate(state['data_end'])
+        fileobj.seek(state['data_end'])
+        fileobj.write(base64.b64decode(state['directory']))
+        fileobj.flush()
+        fileobj.seek(0)
+
+    def finish(self):
+        self.zf.close()
+
+
+class _TarSink:
+    """写入 tar 包；检查点只需记录已写入的位置"""
+
+    def __init__(self, fileobj, resume):
+        self.fileobj = fileobj
+        self.tf = tarfile.open(fileobj=fileobj, mode='w', format=tarfile.PAX_FORMAT)
+
+    def add_file(self, arcname, path):
+        info = self.tf.gettarinfo(path, arcname)
+        with open(path, 'rb') as src:
+            reader = _HashingReader(src)
+            self.tf.addfile(info, reader)
+        return reader.sha.hexdigest(), reader.size
+
+    def add_bytes(self, arcname, data):
+        info = tarfile.TarInfo(arcname)
+        info.size = len(data)
+        info.mtime = int(datetime.now().timestamp())
+        self.tf.addfile(info, io.BytesIO(data))
+
+    def checkpoint(self):
+        self.fileobj.flush()
+        return {'data_end': self.tf.offset}
+
+    @staticmethod
+    def restore(fileobj, state):
+        fileobj.truncate(state['data_end'])
+        fileobj.seek(state['data_end'])
+
+    def finish(self):
+        self.tf.close()
+
+
+def _sink_class(path):
+    lower = path.lower()
+    if lower.endswith('.zip'):
+        return _ZipSink
+    if lower.endswith('.tar'):
+        return _TarSink
+    raise ArchiveError(f"只支持 .zip 或 .tar 格式: {path}")
+
+
+def export_cases(base_dir, cases, output_path, progress=None, resume=True):
+    """导出案件到归档包，返回清单
+    progress(已完成数, 总数, 案本号) 用于显示进度
+    """
+    sink_class = _sink_class(output_path)
+    part_path = output_path + ".part"
+    journal_path = output_path + ".part.json"
+    case_numbers = [case['case_number'] for case in cases]
+
+    # 同一批案件的未完成导出从检查点继续
+    journal = None
+    if resume and os.path.exists(journal_path) and os.path.exists(part_path):
+        try:
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                journal = json.load(f)
+            if journal.get('cases') != case_numbers:
+                journal = None
+        except Exception as e:
+            print(f"读取导出进度失败: {e}")
+            journal = None
+
+    if journal and journal.get('checkpoint'):
+        fileobj = open(part_path, 'r+b')
+        sink_class.restore(fileobj, journal['checkpoint'])
+        sink = sink_class(fileobj, resume=True)
+    else:
+        journal = {'cases': case_numbers, 'done': [], 'files': {}, 'checkpoint': None}
+        fileobj = open(part_path, 'w+b')
+        sink = sink_class(fileobj, resume=False)
+
+    done = set(journal['done'])
+    pending_bytes = 0
+    try:
+        for i, case in enumerate(cases):
+            case_number = case['case_number']
+            if progress:
+                progress(i, len(cases), case_number)
+            if case_number in done:
+                continue
+
+            for arcname, path in iter_case_files(base_dir, case):
+                sha, size = sink.add_file(arcname, path)
+                journal['files'][arcname] = {'sha256': sha, 'size': size, 'case_number': case_number}
+                pending_bytes += size
+
+            journal['done'].append(case_number)
+            done.add(case_number)
+
+            if pending_bytes >= CHECKPOINT_BYTES:
+                journal['checkpoint'] = sink.checkpoint()
+                atomic_write_json(journal_path, journal)
+                pending_bytes = 0
+
+        manifest = {
+            'format': 'case-archive',
+            'version': 1,
+            'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'cases': case_numbers,
+            'files': journal['files'],
+        }
+        index_subset = {'cases': [CaseRecord.from_dict(case).to_dict() for case in cases],
+                        'total_cases': len(cases)}
+        sink.add_bytes(INDEX_NAME, json.dumps(index_subset, ensure_ascii=False, indent=2).encode('utf-8'))
+        sink.add_bytes(MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8'))
+        sink.finish()
+    finally:
+        fileobj.close()
+
+    if progress:
+        progress(len(cases), len(cases), "")
+
+    os.replace(part_path, output_path)
+    if os.path.exists(journal_path):
+        os.remove(journal_path)
+    return manifest
+
+
+class BundleReader:
+    """读取归档包（zip 或 tar）"""
+
+    def __init__(self, path):
+        self.path = path
+        if zipfile.is_zipfile(path):
+            self._zip = zipfile.ZipFile(path)
+            self._tar = None
+        elif tarfile.is_tarfile(path):
+            self._zip = None
+            self._tar = tarfile.open(path, 'r:')
+        else:
+            raise ArchiveError(f"无法识别的归档包: {path}")
+
+    def open(self, name):
+        try:
+            if self._zip is not None:
+                return self._zip.open(name)
+            member = self._tar.getmember(name)
+            return self._tar.extractfile(member)
+        except KeyError:
+            raise ArchiveError(f"归档包中缺少 {name}")
+
+    def read_json(self, name):
+        with self.open(name) as f:
+            return json.loads(f.read().decode('utf-8'))
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+        else:
+            self._tar.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _target_path(base_dir, arcname):
+    """包内路径转换为本地路径，拒绝跳出数据目录的路径"""
+    if not arcname.startswith(CASES_PREFIX):
+        raise ArchiveError(f"非法路径: {arcname}")
+    rel_path = arcname[len(CASES_PREFIX):]
+    parts = rel_path.split('/')
+    if (not rel_path or '\\' in rel_path or ':' in rel_path or rel_path.startswith('/')
+            or os.path.isabs(rel_path) or os.path.splitdrive(rel_path)[0]
+            or any(part in ('', '.', '..') for part in parts)):
+        raise ArchiveError(f"非法路径: {arcname}")
+
+    # 解析符号链接后仍须位于数据目录内
+    root = os.path.realpath(base_dir)
+    target = os.path.realpath(os.path.join(root, *parts))
+    if os.path.commonpath([root, target]) != root or target == root:
+        raise ArchiveError(f"非法路径: {arcname}")
+    return target
+
+
+def _checked_case(base_dir, case, files):
+    """检查包内索引条目：案本号须为普通名称，文件夹须在数据目录内且包含该案件的全部文件
+    返回可写入索引的条目（副本），不合格时抛出 ArchiveError
+    """
+    case_number = case.get('case_number')
+    if (not isinstance(case_number, str) or not case_number.strip() or case_number in ('.', '..')
+            or any(c in case_number for c in '/\\:\0')):
+        raise ArchiveError(f"非法案本号: {case_number!r}")
+
+    case = dict(case)
+    folder_path = str(case.get('folder_path') or '').strip('/') or f"{case_year(case)}/{case_number}"
+    _target_path(base_dir, CASES_PREFIX + folder_path)
+    prefix = CASES_PREFIX + folder_path + '/'
+    for arcname, _ in files:
+        if not arcname.startswith(prefix):
+            raise ArchiveError(f"文件不在案件文件夹内: {arcname}")
+    case['folder_path'] = folder_path
+    return case
+
+
+def _copy_verified(reader, arcname, target, expected_sha):
+    """流式解出一个文件并校验哈希，校验通过才替换目标文件"""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temp_path = target + ".importing"
+    sha = hashlib.sha256()
+    try:
+        with reader.open(arcname) as src, open(temp_path, 'wb') as dst:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                sha.update(chunk)
+                dst.write(chunk)
+        if sha.hexdigest() != expected_sha:
+            raise ArchiveError(f"哈希校验失败: {arcname}")
+        os.replace(temp_path, target)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def import_bundle(base_dir, bundle_path, case_index, overwrite=False, progress=None):
+    """导入归档包并合并索引
+    本地已有的案件默认跳过；overwrite=True 时用包内文件和索引覆盖
+    返回 {'imported': [...], 'skipped': [...], 'conflicts': [...], 'errors': {案本号: 错误}}
+    """
+    result = {'imported': [], 'skipped': [], 'conflicts': [], 'errors': {}}
+
+    with BundleReader(bundle_path) as reader:
+        manifest = reader.read_json(MANIFEST_NAME)
+        if manifest.get('format') != 'case-archive':
+            raise ArchiveError("不是案件归档包")
+        bundle_cases = reader.read_json(INDEX_NAME).get('cases', [])
+
+        files_by_case = {}
+        for arcname, info in manifest['files'].items():
+            files_by_case.setdefault(info['case_number'], []).append((arcname, info))
+
+        verified = []
+        for i, case in enumerate(bundle_cases):
+            case_number = str(case.get('case_number', ''))
+            if progress:
+                progress(i, len(bundle_cases), case_number)
+
+            files = files_by_case.get(case_number, [])
+            try:
+                case = _checked_case(base_dir, case, files)
+            except ArchiveError as e:
+                result['errors'][case_number] = str(e)
+                continue
+
+            if case_index.get(case_number) is not None and not overwrite:
+                result['skipped'].append(case_number)
+                continue
+
+            try:
+                for arcname, info in files:
+                    target = _target_path(base_dir, arcname)
+                    if os.path.exists(target):
+                        if os.path.getsize(target) == info['size'] and _file_sha256(target) == info['sha256']:
+                            continue  # 已导入过（中断后重新导入）
+                        if not overwrite:
+                            result['conflicts'].append(arcname)
+                            continue
+                    _copy_verified(reader, arcname, target, info['sha256'])
+            except Exception as e:
+                result['errors'][case_number] = str(e)
+                continue
+
+            verified.append(case)
+            result['imported'].append(case_number)
+
+    # 文件全部校验通过的案件一次写入索引
+    if verified:
+        case_index.upsert_many(verified)
+
+    if progress:
+        progress(len(bundle_cases), len(bundle_cases), "")
+    return result
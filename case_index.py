@@ -0,0 +1,598 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+案件索引 - 按年份分区保存在 cases_index/ 目录
+
+    cases_index/2025.json     当年案件（常驻内存，格式化保存）
+    cases_index/2024.json     往年案件（封存：紧凑保存，用到时才加载）
+    cases_index/2024.snap     封存年份的二进制快照（由 JSON 派生，见 case_snapshot），
+                              加载更快，查单个案件时不必解析整个分区
+    cases_index/manifest.json 各年份的案件数和受伤职工姓名，用于判断要加载哪些年份
+
+旧版的单个 cases_index.json 会在首次使用时自动拆分。
+"""
+
+import os
+import json
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+
+from atomic_io import atomic_write_json
+from case_records import CaseRecord
+from case_snapshot import SNAPSHOT_SUFFIX, Snapshot, SnapshotError, write_snapshot
+from org_names import canonical_key
+
+
+INDEX_DIR = "cases_index"
+MANIFEST_NAME = "manifest.json"
+LEGACY_INDEX_FILE = "cases_index.json"
+
+# 案件浏览中可筛选、排序的字段
+QUERY_FIELDS = ('case_number', 'person_name', 'employer', 'regulation', 'created_date', 'operator')
+
+# 缓存的筛选结果数（每个为排序结果中的位置列表）
+QUERY_CACHE_SIZE = 16
+
+
+def case_id_card(case):
+    """案件中受伤职工的身份证号"""
+    return case.get('person_info', {}).get('id_card', '') or case.get('id_card', '')
+
+
+def case_phone(case):
+    """案件中受伤职工的联系电话"""
+    return case.get('person_info', {}).get('phone', '')
+
+
+def case_year(case):
+    """案件所属年份：year 字段，其次文件夹路径、立案日期"""
+    year = str(case.get('year', '') or '')
+    if not year.isdigit():
+        year = case.get('folder_path', '').split('/', 1)[0]
+    if not year.isdigit():
+        year = case.get('created_date', '')[:4]
+    if not year.isdigit():
+        year = str(datetime.now().year)
+    return year
+
+
+def name_from_case_number(case_number):
+    """从案本号（类型-姓名-序号）中取出姓名，格式不符时返回None"""
+    parts = case_number.split('-')
+    if len(parts) < 3:
+        return None
+    return '-'.join(parts[1:-1])
+
+
+def same_person_rank(case, id_card, phone):
+    """同名案件排序键：身份证一致优先，其次电话一致"""
+    case_id = case_id_card(case)
+    if id_card and case_id:
+        id_rank = 0 if case_id == id_card else 2
+    else:
+        id_rank = 1  # 无法比对身份证的排在中间
+
+    case_tel = case_phone(case)
+    phone_rank = 0 if phone and case_tel == phone else 1
+
+    return id_rank, phone_rank
+
+
+def _file_stamp(path):
+    """文件的修改时间和大小，用于判断是否需要重新加载"""
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
+class QueryResult:
+    """查询结果 - 排好序的案件列表和其中符合条件的位置，按行取出，不复制案件列表"""
+
+    def __init__(self, cases, positions=None):
+        self._cases = cases
+        self._positions = positions  # None 表示全部
+
+    def __len__(self):
+        return len(self._cases if self._positions is None else self._positions)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        return self._cases[row if self._positions is None else self._positions[row]]
+
+    def __iter__(self):
+        if self._positions is None:
+            return iter(self._cases)
+        return (self._cases[i] for i in self._positions)
+
+
+class _Partition:
+    """一个年份的案件"""
+
+    def __init__(self, year, path):
+        self.year = year
+        self.path = path
+        self.by_number = {}                # 案本号 -> 案件（按加入顺序）
+        self.by_name = defaultdict(dict)   # 姓名 -> {案本号: 案件}
+        self.stamp = None
+        self.loaded = False
+
+    @property
+    def snapshot_path(self):
+        return os.path.splitext(self.path)[0] + SNAPSHOT_SUFFIX
+
+    def load(self):
+        """首次使用或文件被外部修改后重新加载"""
+        stamp = _file_stamp(self.path)
+        if self.loaded and stamp == self.stamp:
+            return
+
+        cases = []
+        if stamp is not None:
+            cases = self._load_snapshot(stamp)
+            if cases is None:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    cases = json.load(f).get('cases', [])
+        self.set_cases(cases)
+        self.stamp = stamp
+        self.loaded = True
+
+    def _load_snapshot(self, stamp):
+        """快照与分区文件一致时从快照读取，否则返回None"""
+        if not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with Snapshot(self.snapshot_path) as snapshot:
+                if snapshot.meta.get('source_stamp') == list(stamp):
+                    return snapshot.cases()
+        except Exception as e:
+            print(f"读取索引快照失败，改为读取 {self.path}: {e}")
+        return None
+
+    @property
+    def cases(self):
+        """全部案件（按加入顺序）"""
+        return list(self.by_number.values())
+
+    def set_cases(self, cases):
+        self.by_number = {}
+        self.by_name = defaultdict(dict)
+        for case in cases:
+            case = CaseRecord.from_dict(case)
+            self.by_number[case['case_number']] = case
+            self.by_name[case['person_name']][case['case_number']] = case
+
+    def names(self):
+        return sorted(name for name, cases in self.by_name.items() if cases)
+
+    def add(self, case_data):
+        case_number = case_data['case_number']
+        existing = self.by_number.get(case_number)
+        if existing is not None:
+            del self.by_name[existing['person_name']][case_number]
+        self.by_number[case_number] = case_data  # 已有的案件保持原来的位置
+        self.by_name[case_data['person_name']][case_number] = case_data
+
+    def remove(self, case_number):
+        existing = self.by_number.pop(case_number, None)
+        if existing is not None:
+            del self.by_name[existing['person_name']][case_number]
+
+    def save(self, sealed):
+        """写回分区文件：封存的年份紧凑保存"""
+        content = {
+            'year': self.year,
+            'sealed': sealed,
+            'cases': [case.to_dict() for case in self.by_number.values()],
+            'total_cases': len(self.by_number),
+            'last_update': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        if sealed:
+            atomic_write_json(self.path, content, compact=True, snapshot=True)
+        else:
+            atomic_write_json(self.path, content, indent=2, snapshot=True)
+        self.stamp = _file_stamp(self.path)
+
+    def save_snapshot(self):
+        """写出快照，记录对应的分区文件标记；失败不影响 JSON"""
+        try:
+            write_snapshot(self.snapshot_path, self.cases,
+                           meta={'year': self.year, 'source_stamp': list(self.stamp)})
+        except OSError as e:
+            print(f"写入索引快照失败: {e}")
+
+
+class CaseIndex:
+    """案件索引 - 当年案件常驻内存，往年案件按需加载；文件变化时自动重新加载"""
+
+    def __init__(self, base_dir, current_year=None):
+        self.base_dir = base_dir
+        self.index_dir = os.path.join(base_dir, INDEX_DIR)
+        self.manifest_file = os.path.join(self.index_dir, MANIFEST_NAME)
+        self.legacy_file = os.path.join(base_dir, LEGACY_INDEX_FILE)
+        self._current_year = str(current_year) if current_year else None
+        self._lock = threading.RLock()
+        self._manifest = None
+        self._manifest_stamp = None
+        self._partitions = {}
+        self._snapshots = {}
+        self._sorted = {}  # (排序字段, 是否倒序, 年份) -> (分区标记, 排好序的案件, {案本号: 位置})
+        self._filtered = OrderedDict()  # (排序键, 筛选条件, 文字) -> (分区标记, 符合条件的位置)
+        self._listeners = []
+
+    @property
+    def current_year(self):
+        return self._current_year or str(datetime.now().year)
+
+    @property
+    def lock(self):
+        """在外部直接替换分区文件（如同步）时持有，避免与索引同时写"""
+        return self._lock
+
+    # ---------- 清单 ----------
+
+    def _ensure_manifest(self):
+        """首次使用时迁移旧索引；清单被外部修改后重新读取；往年分区封存"""
+        if not os.path.exists(self.manifest_file) and os.path.exists(self.legacy_file):
+            self._migrate_legacy()
+
+        stamp = _file_stamp(self.manifest_file)
+        if self._manifest is None or stamp != self._manifest_stamp:
+            manifest = {'years': {}}
+            if stamp is not None:
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            self._manifest = manifest
+            self._manifest_stamp = stamp
+
+        # 跨年后上一年的分区封存一次
+        unsealed = [year for year, info in self._manifest['years'].items()
+                    if year < self.current_year and not info.get('sealed')]
+        for year in unsealed:
+            self._save_partition(self._partition(year))
+
+    def _save_manifest(self):
+        atomic_write_json(self.manifest_file, self._manifest, indent=2, snapshot=True)
+        self._manifest_stamp = _file_stamp(self.manifest_file)
+
+    def _migrate_legacy(self):
+        """把旧版单个索引文件拆分为年份分区"""
+        with open(self.legacy_file, 'r', encoding='utf-8') as f:
+            cases = json.load(f).get('cases', [])
+
+        by_year = defaultdict(list)
+        for case in cases:
+            by_year[case_year(case)].append(case)
+
+        self._manifest = {'years': {}}
+        for year, year_cases in by_year.items():
+            partition = self._new_partition(year)
+            partition.set_cases(year_cases)
+            partition.loaded = True
+            self._save_partition(partition, save_manifest=False)
+        self._save_manifest()
+
+        os.replace(self.legacy_file, self.legacy_file + ".migrated")
+        print(f"索引已按年份拆分到 {self.index_dir}")
+
+    # ---------- 分区 ----------
+
+    def _new_partition(self, year):
+        partition = _Partition(year, os.path.join(self.index_dir, f"{year}.json"))
+        self._partitions[year] = partition
+        return partition
+
+    def _partition(self, year):
+        """取得某年份的分区（需要时加载）"""
+        partition = self._partitions.get(year) or self._new_partition(year)
+        partition.load()
+        return partition
+
+    def _save_partition(self, partition, save_manifest=True):
+        os.makedirs(self.index_dir, exist_ok=True)
+        sealed = partition.year < self.current_year
+        partition.save(sealed)
+        if sealed:
+            self._close_snapshot(partition.year)  # Windows 下映射中的文件不能替换
+            partition.save_snapshot()
+        self._update_manifest(partition, sealed)
+        if save_manifest:
+            self._save_manifest()
+
+    def _update_manifest(self, partition, sealed):
+        self._manifest['years'][partition.year] = {
+            'sealed': sealed,
+            'count': len(partition.by_number),
+            'names': partition.names(),
+        }
+
+    def refresh_manifest(self, years):
+        """分区文件被外部替换（如同步）后，重新读取这些年份并更新清单和快照"""
+        with self._lock:
+            self._ensure_manifest()
+            for year in years:
+                partition = self._partition(str(year))
+                if partition.stamp is None:
+                    self._manifest['years'].pop(partition.year, None)
+                    continue
+                sealed = partition.year < self.current_year
+                if sealed:
+                    self._close_snapshot(partition.year)
+                    partition.save_snapshot()
+                self._update_manifest(partition, sealed)
+            self._save_manifest()
+
+    def _snapshot(self, year):
+        """与分区文件一致的快照（打开后缓存），没有或已过期时返回None"""
+        stamp = _file_stamp(os.path.join(self.index_dir, f"{year}.json"))
+        snapshot = self._snapshots.get(year)
+        if snapshot is not None and stamp is not None and snapshot.meta.get('source_stamp') == list(stamp):
+            return snapshot
+        self._close_snapshot(year)
+
+        path = os.path.join(self.index_dir, f"{year}{SNAPSHOT_SUFFIX}")
+        if stamp is None or not os.path.exists(path):
+            return None
+        try:
+            snapshot = Snapshot(path)
+        except (OSError, SnapshotError) as e:
+            print(f"读取索引快照失败: {e}")
+            return None
+        if snapshot.meta.get('source_stamp') != list(stamp):
+            snapshot.close()
+            return None
+        self._snapshots[year] = snapshot
+        return snapshot
+
+    def _close_snapshot(self, year):
+        snapshot = self._snapshots.pop(year, None)
+        if snapshot is not None:
+            snapshot.close()
+
+    def add_listener(self, callback):
+        """案件新增或替换后调用 callback(changes, previous_stamps)
+        changes 为 [(旧案件或None, 新案件), ...]，previous_stamps 为 {年份: 写入前的分区文件标记}
+        """
+        self._listeners.append(callback)
+
+    def partition_stamp(self, year):
+        """某年份分区文件的修改时间和大小，没有该年份时为None"""
+        stamp = _file_stamp(os.path.join(self.index_dir, f"{year}.json"))
+        return list(stamp) if stamp else None
+
+    def _all_years(self):
+        return sorted(set(self._manifest['years']) | {self.current_year}, reverse=True)
+
+    def _years_for_case_number(self, case_number):
+        """可能包含某案本号的年份：按案本号中的姓名筛选，取不到姓名时为全部年份"""
+        person_name = name_from_case_number(case_number)
+        if person_name is None:
+            return self._all_years()
+        return self._years_with_name(person_name)
+
+    def _years_with_name(self, person_name):
+        """可能包含某姓名的年份（从新到旧）：当年总是包含，往年看清单"""
+        years = [self.current_year]
+        for year in sorted(self._manifest['years'], reverse=True):
+            if year != self.current_year and person_name in self._manifest['years'][year].get('names', ()):
+                years.append(year)
+        return years
+
+    def _locate(self, case_number):
+        """案件所在的分区，找不到返回None"""
+        for year in self._years_for_case_number(case_number):
+            partition = self._partition(year)
+            if case_number in partition.by_number:
+                return partition
+        return None
+
+    # ---------- 查询 ----------
+
+    def exists(self):
+        """是否已有索引"""
+        return os.path.exists(self.manifest_file) or os.path.exists(self.legacy_file)
+
+    def years(self):
+        """有案件的全部年份（从新到旧，包含当年）"""
+        with self._lock:
+            self._ensure_manifest()
+            return self._all_years()
+
+    def cases(self, year=None):
+        """返回全部案件或指定年份的案件（列表副本）；不指定年份时会加载全部年份"""
+        with self._lock:
+            self._ensure_manifest()
+            if year is not None:
+                return list(self._partition(str(year)).cases)
+            result = []
+            for y in sorted(self._all_years()):
+                result.extend(self._partition(y).cases)
+            return result
+
+    def get(self, case_number):
+        """按案本号查找案件，找不到返回None（先查当年，再查可能包含的往年）
+        未加载的封存年份先查快照，不必加载整个分区
+        """
+        with self._lock:
+            self._ensure_manifest()
+            for year in self._years_for_case_number(case_number):
+                partition = self._partitions.get(year)
+                if year != self.current_year and not (partition and partition.loaded):
+                    snapshot = self._snapshot(year)
+                    if snapshot is not None:
+                        try:
+                            case = snapshot.get(case_number)
+                        except Exception as e:
+                            print(f"读取索引快照失败: {e}")
+                        else:
+                            if case is not None:
+                                return case
+                            continue
+                partition = self._partition(year)
+                if case_number in partition.by_number:
+                    return partition.by_number[case_number]
+            return None
+
+    def find_by_name(self, person_name):
+        """查找受伤职工同名的案件，只加载包含该姓名的年份"""
+        with self._lock:
+            self._ensure_manifest()
+            result = []
+            for year in sorted(self._years_with_name(person_name)):
+                result.extend(self._partition(year).by_name.get(person_name, {}).values())
+            return result
+
+    def find_same_person(self, person_name, id_card='', phone=''):
+        """查找同名案件并排序：身份证一致 > 电话一致 > 立案时间新"""
+        cases = self.find_by_name(person_name)
+        # 两次稳定排序：先按立案时间从新到旧，再按匹配程度
+        cases.sort(key=lambda case: (case.get('created_date', ''), case['case_number']), reverse=True)
+        cases.sort(key=lambda case: same_person_rank(case, id_card, phone))
+        return cases
+
+    def query(self, filters=None, text='', sort_key='created_date', descending=True, year=None,
+              org_index=None):
+        """按字段筛选并排序，返回 QueryResult（索引中记录的引用，不复制）
+        filters 为 {字段: 文字}，text 在 QUERY_FIELDS 任一字段中查找，都是不区分大小写的包含匹配；
+        受伤职工按姓名表、用人单位按单位反向索引（org_index）找出候选案件，不逐个比较全部案件；
+        排序结果和筛选出的位置都按分区标记缓存
+        """
+        if sort_key not in QUERY_FIELDS:
+            raise ValueError(f"不支持的排序字段: {sort_key}")
+        conditions = tuple(sorted((field, value.strip().lower()) for field, value in (filters or {}).items()
+                                  if value and value.strip()))
+        text = text.strip().lower()
+
+        # 单位反向索引计算时会读取本索引，须在加锁前查询
+        employer = dict(conditions).get('employer')
+        org_match = None
+        if org_index is not None and employer and canonical_key(employer):
+            org_match = org_index.cases_with_name(employer, 'employer', [year] if year is not None else None)
+
+        with self._lock:
+            self._ensure_manifest()
+            years = [str(year)] if year is not None else sorted(self._all_years())
+            partitions = [self._partition(y) for y in years]
+            stamps = [(p.year, p.stamp, len(p.by_number)) for p in partitions]
+
+            key = (sort_key, descending, year)
+            cached = self._sorted.get(key)
+            if cached is None or cached[0] != stamps:
+                cases = [case for p in partitions for case in p.by_number.values()]
+                # 取值相同时按案本号排列，翻页时顺序稳定
+                cases.sort(key=lambda case: (str(getattr(case, sort_key) or ''), case.case_number),
+                           reverse=descending)
+                positions = {case.case_number: i for i, case in enumerate(cases)}
+                cached = self._sorted[key] = (stamps, cases, positions)
+            _, cases, positions = cached
+
+            if not conditions and not text:
+                return QueryResult(cases)
+
+            filter_key = (key, conditions, text)
+            hit = self._filtered.get(filter_key)
+            if hit is not None and hit[0] == stamps:
+                self._filtered.move_to_end(filter_key)
+                return QueryResult(cases, hit[1])
+
+            # 候选位置：姓名只比较各个不同的姓名，单位取反向索引中写法匹配的案件
+            candidates = None
+            person_name = dict(conditions).get('person_name')
+            if person_name:
+                candidates = {positions[case_number]
+                              for p in partitions for name, by_number in p.by_name.items()
+                              if person_name in str(name or '').lower()
+                              for case_number in by_number if case_number in positions}
+            if org_match is not None:
+                case_numbers, org_stamps = org_match
+                if all(org_stamps.get(p.year) == (list(p.stamp) if p.stamp else None) for p in partitions):
+                    employer_positions = {positions[n] for n in case_numbers if n in positions}
+                    candidates = employer_positions if candidates is None else candidates & employer_positions
+
+            rows = range(len(cases)) if candidates is None else sorted(candidates)
+            result = []
+            for i in rows:
+                case = cases[i]
+                if any(value not in str(getattr(case, field) or '').lower() for field, value in conditions):
+                    continue
+                if text and not any(text in str(getattr(case, field) or '').lower() for field in QUERY_FIELDS):
+                    continue
+                result.append(i)
+
+            self._filtered[filter_key] = (stamps, result)
+            while len(self._filtered) > QUERY_CACHE_SIZE:
+                self._filtered.popitem(last=False)
+            return QueryResult(cases, result)
+
+    # ---------- 修改 ----------
+
+    def upsert(self, case_data):
+        """新增或替换一个案件，并写回文件"""
+        self.upsert_many([case_data])
+
+    def upsert_many(self, cases):
+        """批量新增或替换案件（字典或 CaseRecord），每个涉及的年份只写回一次"""
+        with self._lock:
+            self._ensure_manifest()
+            touched = {}
+            previous_stamps = {}
+            changes = []
+            for case_data in cases:
+                case_data = CaseRecord.from_dict(case_data)
+                case_number = case_data['case_number']
+                target = self._partition(case_year(case_data))
+
+                current = self._locate(case_number)
+                old_case = current.by_number[case_number] if current is not None else None
+
+                # 案件年份变化时从原年份移除
+                if current is not None and current is not target:
+                    previous_stamps.setdefault(current.year, current.stamp and list(current.stamp))
+                    current.remove(case_number)
+                    touched[current.year] = current
+
+                previous_stamps.setdefault(target.year, target.stamp and list(target.stamp))
+                target.add(case_data)
+                touched[target.year] = target
+                if old_case is case_data:
+                    # 调用方直接修改了索引中的案件，旧值已不可知，派生缓存需整年重新计算
+                    previous_stamps[target.year] = None
+                    continue
+                changes.append((old_case, case_data))
+
+            for partition in touched.values():
+                self._save_partition(partition, save_manifest=False)
+            if touched:
+                self._save_manifest()
+
+            for callback in self._listeners:
+                try:
+                    callback(changes, previous_stamps)
+                except Exception as e:
+                    print(f"索引更新通知失败: {e}")
+
+    def update_person_info(self, case_number, fields):
+        """更新某个案件 person_info 中的部分字段，找不到案件返回False"""
+        with self._lock:
+            self._ensure_manifest()
+            partition = self._locate(case_number)
+            if partition is None:
+                return False
+            person_info = partition.by_number[case_number].person_info
+            if any(person_info.get(key) != value for key, value in fields.items()):
+                person_info.update(fields)
+                self._save_partition(partition)  # 值没有变化时不重写分区
+            return True
+
+    def save(self):
+        """写回已加载的全部分区"""
+        with self._lock:
+            if self._manifest is None:
+                return
+            for partition in self._partitions.values():
+                if partition.loaded:
+                    self._save_partition(partition, save_manifest=False)
+            self._save_manifest()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+申请表批量立案 - 读取一个文件夹中的工伤认定申请表（xlsx / docx），批量建立案件
+
+- xlsx 用 openpyxl 只读模式逐行读取；docx 直接流式解析 word/document.xml，不加载整个文档
+- 两种表格写法都支持：一行一个申请的汇总表（首行为表头），以及“标签 | 内容”的申请表
+- 字段按 FIELD_LABELS 对应到 collect_form_data 的键（受伤职工、本人身份证号、用人单位……）
+- 身份证号统一校验（出生日期、校验位），与索引或本批中已有的同一身份证号跳过
+- 各文件并行解析；案本号统一分配，案件文件夹和索引条目作为一批建立，中途失败时全部撤销
+"""
+
+import os
+import re
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from lxml import etree
+
+from case_records import CaseRecord, PersonRecord
+
+
+# 表单键 -> 申请表中可能的标签（去掉空格和冒号后比较）
+FIELD_LABELS = {
+    '受伤职工': ('姓名', '职工姓名', '受伤职工', '受伤职工姓名', '受伤害职工姓名', '申请人姓名'),
+    '本人性别': ('性别',),
+    '本人身份证号': ('身份证号', '身份证号码', '公民身份号码', '居民身份证号码', '身份证'),
+    '本人电话': ('电话', '联系电话', '手机', '手机号码', '职工联系电话'),
+    '本人身份证地址': ('身份证地址', '户籍地址', '户籍所在地'),
+    '本人现住址': ('现住址', '家庭住址', '通信地址', '通讯地址', '现居住地址'),
+    '本人岗位': ('岗位', '工作岗位', '工种', '职业工种'),
+    '用人单位': ('用人单位', '用人单位名称', '单位名称'),
+    '用工单位': ('用工单位', '用工单位名称'),
+    '工作场所': ('工作场所', '事故发生地点', '受伤地点'),
+    '案件类型': ('案件类型', '申请类型'),
+}
+
+LABEL_FIELDS = {label: key for key, labels in FIELD_LABELS.items() for label in labels}
+
+# 案件类型 -> 案本号前缀
+CASE_NUMBER_PREFIXES = {
+    "普通案件": "GS",         # 普通工伤
+    "个人案件": "GR",         # 个人申请
+    "死亡案件": "GSW",        # 工亡案件（单位申请）
+    "个人申请死亡案件": "GRW",  # 个人申请工亡
+}
+
+APPLICATION_SUFFIXES = ('.xlsx', '.docx')
+
+_LABEL_STRIP = re.compile(r'[\s:：*＊]+')
+
+# 身份证校验位
+_ID_WEIGHTS = (7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2)
+_ID_CHECK_CODES = '10X98765432'
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+def case_number_prefix(case_type):
+    """案本号前缀，未知的案件类型按普通工伤"""
+    return CASE_NUMBER_PREFIXES.get(case_type, "GS")
+
+
+def normalize_id_card(value):
+    """身份证号统一写法：去空格，末位 x 大写；表格中存成数字的转为文字"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return re.sub(r'\s+', '', str(value)).upper()
+
+
+def check_id_card(id_card):
+    """校验18位身份证号，通过时返回空字符串，否则返回原因"""
+    if not id_card:
+        return "缺少身份证号"
+    if not re.fullmatch(r'\d{17}[\dX]', id_card):
+        return "身份证号应为18位"
+    try:
+        datetime.strptime(id_card[6:14], '%Y%m%d')
+    except ValueError:
+        return "身份证号中的出生日期无效"
+    total = sum(int(digit) * weight for digit, weight in zip(id_card, _ID_WEIGHTS))
+    if _ID_CHECK_CODES[total % 11] != id_card[17]:
+        return "身份证号校验位不符"
+    return ''
+
+
+def id_card_info(id_card, today=None):
+    """由有效的身份证号计算 (年龄, 性别)"""
+    today = today or datetime.now()
+    birth = datetime.strptime(id_card[6:14], '%Y%m%d')
+    age = today.year - birth.year - ((today.month, today.day) < (birth.month, birth.day))
+    gender = "男" if int(id_card[16]) % 2 == 1 else "女"
+    return age, gender
+
+
+# ---------- 解析 ----------
+
+def _cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _label_field(text):
+    """单元格是标签时返回对应的表单键"""
+    return LABEL_FIELDS.get(_LABEL_STRIP.sub('', text)) if text else None
+
+
+def _collect_pairs(cells, fields):
+    """“标签 | 内容”写法：标签右侧第一个不是标签的非空单元格为内容，同一标签只取第一次出现"""
+    for i, text in enumerate(cells):
+        key = _label_field(text)
+        if key is None:
+            continue
+        for value in cells[i + 1:]:
+            if not value:
+                continue
+            if _label_field(value) is None and not fields.get(key):
+                fields[key] = value
+            break
+
+
+def _is_header_row(cells):
+    """汇总表的表头：至少三个标签，且标签占非空单元格的一半以上（申请表一行中标签和内容各占一半）"""
+    filled = [text for text in cells if text]
+    labels = sum(1 for text in filled if _label_field(text))
+    return labels >= 3 and labels * 2 > len(filled)
+
+
+def parse_xlsx(path):
+    """读取 xlsx 申请表（只读模式逐行），返回 [(来源, {表单键: 值})]"""
+    from openpyxl import load_workbook
+
+    applications = []
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            header = None
+            form_fields = {}
+            for row_number, row in enumerate(ws.iter_rows(values_only=True), start=1):
+                cells = [_cell_text(value) for value in row]
+                if header is not None:
+                    fields = {header[i]: text for i, text in enumerate(cells)
+                              if i < len(header) and header[i] and text}
+                    if fields.get('受伤职工'):
+                        applications.append((f"{os.path.basename(path)}#{ws.title}!{row_number}", fields))
+                elif not form_fields and _is_header_row(cells):
+                    header = [_label_field(text) for text in cells]
+                else:
+                    _collect_pairs(cells, form_fields)
+            if header is None and form_fields.get('受伤职工'):
+                applications.append((os.path.basename(path), form_fields))
+    finally:
+        wb.close()
+    return applications
+
+
+def parse_docx(path):
+    """流式解析 docx 申请表的正文：表格按行配对标签和内容，正文段落按“标签：内容”读取"""
+    fields = {}
+    with zipfile.ZipFile(path) as archive:
+        with archive.open('word/document.xml') as document:
+            for _, elem in etree.iterparse(document, events=('end',), tag=(_W + 'tr', _W + 'p')):
+                if elem.tag == _W + 'tr':
+                    cells = [''.join(t.text or '' for t in tc.iter(_W + 't')).strip()
+                             for tc in elem.iterchildren(_W + 'tc')]
+                    _collect_pairs(cells, fields)
+                elif elem.getparent() is not None and elem.getparent().tag == _W + 'body':
+                    text = ''.join(t.text or '' for t in elem.iter(_W + 't'))
+                    for label, value in re.findall(r'([^\s:：]+)\s*[:：]\s*([^\s:：]+)', text):
+                        key = _label_field(label)
+                        if key and not fields.get(key):
+                            fields[key] = value
+                else:
+                    continue  # 表格中的段落随所在行一起处理
+                # 处理过的元素及其前面的兄弟元素不再需要
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+    return [(os.path.basename(path), fields)] if fields.get('受伤职工') else []
+
+
+def parse_application(path):
+    """解析一个申请表文件"""
+    if path.lower().endswith('.xlsx'):
+        return parse_xlsx(path)
+    return parse_docx(path)
+
+
+def parse_folder(folder, max_workers=4):
+    """并行解析文件夹中的全部申请表（按文件名顺序）
+    返回: ([(文件路径, 来源, {表单键: 值})], {文件名: 错误信息})
+    """
+    paths = [os.path.join(folder, name) for name in sorted(os.listdir(folder))
+             if name.lower().endswith(APPLICATION_SUFFIXES) and not name.startswith('~$')]
+    applications = []
+    errors = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [(path, executor.submit(parse_application, path)) for path in paths]
+        for path, future in futures:
+            try:
+                parsed = future.result()
+            except Exception as e:
+                errors[os.path.basename(path)] = str(e)
+                continue
+            if not parsed:
+                errors[os.path.basename(path)] = "未找到受伤职工姓名"
+            for source, fields in parsed:
+                applications.append((path, source, fields))
+
+    return applications, errors
+
+
+# ---------- 立案 ----------
+
+def application_form_data(fields, case_type='普通案件', regulation='', operator=''):
+    """申请表字段 -> 与 collect_form_data 相同结构的本人表单数据"""
+    id_card = normalize_id_card(fields.get('本人身份证号'))
+    gender = fields.get('本人性别', '')
+    age = ''
+    if not check_id_card(id_card):
+        age, gender = id_card_info(id_card)
+
+    now = datetime.now()
+    data = {
+        '案本号': '',
+        '受伤职工': fields.get('受伤职工', ''),
+        '用人单位': fields.get('用人单位', ''),
+        '用工单位': fields.get('用工单位', ''),
+        '工作场所': fields.get('工作场所', ''),
+        '人员类型': "本人",
+        '案件类型': fields.get('案件类型') if fields.get('案件类型') in CASE_NUMBER_PREFIXES else case_type,
+        '条例': regulation,
+        '操作员': operator,
+        '当前日期': now.strftime('%Y年%m月%d日'),
+        '当前时间': now.strftime('%H时%M分'),
+    }
+    data.update(PersonRecord(
+        name=data['受伤职工'],
+        gender=gender,
+        age=str(age),
+        id_card=id_card,
+        address=fields.get('本人身份证地址', ''),
+        current_address=fields.get('本人现住址', ''),
+        phone=fields.get('本人电话', ''),
+        position=fields.get('本人岗位', ''),
+    ).to_form("本人"))
+    return data
+
+
+def _next_numbers(year_folder):
+    """年份文件夹中各 (前缀, 姓名) 已用的最大序号"""
+    numbers = {}
+    names = os.listdir(year_folder) if os.path.isdir(year_folder) else []
+    for folder in names:
+        # 格式：前缀-姓名-序号
+        prefix, _, rest = folder.partition('-')
+        name, _, number = rest.rpartition('-')
+        if name and number.isdigit():
+            key = (prefix, name)
+            numbers[key] = max(numbers.get(key, 0), int(number))
+    return numbers
+
+
+def prepare_intake(base_dir, applications, case_index, case_type='普通案件', regulation='', operator=''):
+    """校验身份证号、查重并分配案本号（不修改任何文件）
+    返回 {'cases': [(文件路径, 来源, CaseRecord)], 'invalid': {来源: 原因}, 'skipped': {来源: 说明},
+          'single_files': 只含一份申请的文件路径集合}
+    """
+    plan = {'cases': [], 'invalid': {}, 'skipped': {}, 'single_files': set()}
+    counts = {}
+    for path, _, _ in applications:
+        counts[path] = counts.get(path, 0) + 1
+    plan['single_files'] = {path for path, count in counts.items() if count == 1}
+    year = datetime.now().year
+    numbers = _next_numbers(os.path.join(base_dir, str(year)))
+    seen = {}  # 本批身份证号 -> 来源
+
+    for path, source, fields in applications:
+        data = application_form_data(fields, case_type, regulation, operator)
+        name = data['受伤职工']
+        id_card = data['本人身份证号']
+
+        error = check_id_card(id_card)
+        if error:
+            plan['invalid'][source] = f"{name}: {error}"
+            continue
+        if id_card in seen:
+            plan['skipped'][source] = f"{name}: 与 {seen[id_card]} 为同一人"
+            continue
+        existing = [case for case in case_index.find_by_name(name)
+                    if case.get('person_info', {}).get('id_card', '') == id_card]
+        if existing:
+            plan['skipped'][source] = f"{name}: 已有案件 {existing[0]['case_number']}"
+            continue
+        seen[id_card] = source
+
+        prefix = case_number_prefix(data['案件类型'])
+        number = numbers.get((prefix, name), 0) + 1
+        numbers[(prefix, name)] = number
+        data['案本号'] = f"{prefix}-{name}-{number:03d}"
+
+        case = CaseRecord.from_form(data)
+        plan['cases'].append((path, source, case))
+
+    return plan
+
+
+def commit_intake(base_dir, plan, case_index, copy_sources=True):
+    """建立案件文件夹（附申请表原件）并一次写入索引；任何一步失败时删除本批建立的文件夹
+    返回建立的案本号列表
+    """
+    cases = [case for _, _, case in plan['cases']]
+    created = []
+    try:
+        for path, _, case in plan['cases']:
+            folder = os.path.join(base_dir, case.folder_path)
+            os.makedirs(folder)  # 已存在时报错（别处刚建立了同号案件）
+            created.append(folder)
+            # 一个文件只含一份申请时才复制原件（汇总表不复制到每个案件）
+            if copy_sources and path in plan['single_files']:
+                shutil.copy2(path, folder)
+        if cases:
+            case_index.upsert_many(cases)
+    except Exception:
+        for folder in reversed(created):
+            shutil.rmtree(folder, ignore_errors=True)
+        raise
+
+    return [case.case_number for case in cases]
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+案件列表模型 - 供 QListView / QTableView 分页显示案件
+"""
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QColor
+
+from case_index import case_id_card
+
+
+# 选择"新建案件"时 UserRole 返回的值
+NEW_CASE = "new"
+
+
+class SameNameCaseModel(QAbstractListModel):
+    """同名案件列表 - 第一行为"新建案件"，其余按排序结果分页加载"""
+
+    def __init__(self, cases, id_card='', page_size=50, parent=None):
+        super().__init__(parent)
+        self._cases = cases          # 已排序的全部同名案件（只保存引用）
+        self._id_card = id_card
+        self._page_size = page_size
+        self._loaded = min(page_size, len(cases))
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._loaded + 1
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self._cases)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self._page_size, len(self._cases) - self._loaded)
+        if count <= 0:
+            return
+        first = self._loaded + 1
+        self.beginInsertRows(QModelIndex(), first, first + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def total(self):
+        """同名案件总数"""
+        return len(self._cases)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row = index.row()
+        if row == 0:
+            if role == Qt.DisplayRole:
+                return "新建案件（不关联已有）"
+            if role == Qt.UserRole:
+                return NEW_CASE
+            return None
+
+        case = self._cases[row - 1]
+        case_id = case_id_card(case)
+
+        if role == Qt.DisplayRole:
+            if case_id:
+                id_display = case_id[-4:] if len(case_id) >= 4 else case_id
+            else:
+                id_display = "无"
+            text = f"{case['case_number']} (身份证:{id_display})"
+            if case.get('created_date'):
+                text += f"  {case['created_date']}"
+            return text
+
+        if role == Qt.ForegroundRole:
+            # 如果输入的身份证和案件的身份证不同，设为红色
+            if self._id_card and case_id and self._id_card != case_id:
+                return QColor(Qt.red)
+            return None
+
+        if role == Qt.UserRole:
+            return case
+
+        return None
+
+
+class CaseTableModel(QAbstractTableModel):
+    """案件浏览表格 - 筛选和排序交给 CaseIndex.query，视图只按需取出已滚动到的行
+    给出 org_index（单位反向索引）时，用人单位筛选直接从反向索引取候选案件
+    """
+
+    COLUMNS = (
+        ('case_number', "案本号"),
+        ('person_name', "受伤职工"),
+        ('employer', "用人单位"),
+        ('regulation', "条例"),
+        ('created_date', "立案日期"),
+        ('operator', "经办人"),
+    )
+
+    def __init__(self, case_index, page_size=200, org_index=None, parent=None):
+        super().__init__(parent)
+        self._case_index = case_index
+        self._org_index = org_index
+        self._page_size = page_size
+        self._cases = []      # 查询结果（QueryResult，按行取出索引中记录的引用）
+        self._loaded = 0      # 已告诉视图的行数
+        self._filters = {}
+        self._text = ''
+        self._year = None
+        self._sort_key = 'created_date'
+        self._descending = True
+
+    # ---------- 查询 ----------
+
+    def set_filter(self, text='', filters=None, year=None):
+        """修改筛选条件并重新查询"""
+        self._text = text
+        self._filters = dict(filters or {})
+        self._year = year
+        self.refresh()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """视图点击表头时调用"""
+        self._sort_key = self.COLUMNS[column][0]
+        self._descending = order == Qt.DescendingOrder
+        self.refresh()
+
+    def refresh(self):
+        """重新查询，回到第一页"""
+        self.beginResetModel()
+        self._cases = self._case_index.query(self._filters, self._text, self._sort_key,
+                                             self._descending, self._year, self._org_index)
+        self._loaded = min(self._page_size, len(self._cases))
+        self.endResetModel()
+
+    def total(self):
+        """符合条件的案件总数"""
+        return len(self._cases)
+
+    def case_at(self, row):
+        return self._cases[row] if 0 <= row < self._loaded else None
+
+    # ---------- 分页 ----------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self._cases)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self._page_size, len(self._cases) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    # ---------- 显示 ----------
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self._loaded:
+            return None
+        case = self._cases[index.row()]
+        if role == Qt.DisplayRole:
+            value = getattr(case, self.COLUMNS[index.column()][0])
+            return str(value) if value is not None else ''
+        if role == Qt.UserRole:
+            return case.case_number
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.COLUMNS[section][1]
+        return section + 1
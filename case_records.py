@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+案件记录 - 用 __slots__ 类保存案件、受伤职工、证人和法人，代替嵌套字典
+
+- 字段表 FIELDS 统一了三种写法：属性名、索引文件中的键、表单中的键（{p} 为人员类型前缀）
+- from_dict / to_dict 与索引文件格式互相转换，未知的键原样保留
+- 提供 get / [] / in / keys 只读访问，按索引文件中的键取值，旧代码无需修改
+- 取值较少的字段（案件类型、单位、经办人等）驻留为同一个字符串对象，十万级案件常驻内存时更省空间
+"""
+
+import sys
+from datetime import datetime
+
+
+class _Record:
+    """记录基类：子类定义 __slots__ 和 FIELDS = ((属性名, 索引键, 表单键), ...)"""
+
+    __slots__ = ('extra',)
+    FIELDS = ()
+    INTERNED = ()   # 需要驻留的属性名
+
+    def __init__(self, **values):
+        for attr, _, _ in self.FIELDS:
+            setattr(self, attr, values.get(attr, ''))
+        self.extra = None  # 字段表以外的键 {键: 值}，没有时为None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._BY_KEY = {key: attr for attr, key, _ in cls.FIELDS}
+
+    # ---------- 与索引格式转换 ----------
+
+    @classmethod
+    def from_dict(cls, data):
+        """由索引中的字典创建（已是记录时原样返回）"""
+        if isinstance(data, cls):
+            return data
+        record = cls.__new__(cls)
+        record.extra = None
+        for attr, key, _ in cls.FIELDS:
+            value = data.get(key, '')
+            if attr in cls.INTERNED and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(record, attr, value)
+        for key, value in data.items():
+            if key not in cls._BY_KEY:
+                record._set_extra(key, value)
+        return record
+
+    def to_dict(self):
+        """转换为索引中保存的字典"""
+        data = {key: getattr(self, attr) for attr, key, _ in self.FIELDS}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def _set_extra(self, key, value):
+        if self.extra is None:
+            self.extra = {}
+        self.extra[key] = value
+
+    def update(self, fields):
+        """按索引键更新字段"""
+        for key, value in fields.items():
+            attr = self._BY_KEY.get(key)
+            if attr is None:
+                self._set_extra(key, value)
+            else:
+                setattr(self, attr, value)
+
+    # ---------- 与表单转换 ----------
+
+    @classmethod
+    def from_form(cls, data, prefix=''):
+        """由表单数据创建"""
+        record = cls()
+        for attr, _, form_key in cls.FIELDS:
+            if form_key:
+                setattr(record, attr, data.get(form_key.format(p=prefix), ''))
+        return record
+
+    def to_form(self, prefix=''):
+        """转换为表单数据 {表单键: 值}"""
+        return {form_key.format(p=prefix): getattr(self, attr)
+                for attr, _, form_key in self.FIELDS if form_key}
+
+    # ---------- 字典式只读访问 ----------
+
+    def get(self, key, default=None):
+        attr = self._BY_KEY.get(key)
+        if attr is not None:
+            return getattr(self, attr)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        return default
+
+    def __getitem__(self, key):
+        attr = self._BY_KEY.get(key)
+        if attr is not None:
+            return getattr(self, attr)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self._BY_KEY or bool(self.extra and key in self.extra)
+
+    def keys(self):
+        keys = [key for _, key, _ in self.FIELDS]
+        if self.extra:
+            keys.extend(self.extra)
+        return keys
+
+    def copy(self):
+        record = self.__class__.__new__(self.__class__)
+        for attr, _, _ in self.FIELDS:
+            setattr(record, attr, getattr(self, attr))
+        record.extra = dict(self.extra) if self.extra else None
+        return record
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.to_dict()!r})"
+
+
+# 人员信息：(属性名, 索引键, 表单键)
+_PERSON_FIELDS = (
+    ('name', 'name', '{p}姓名'),
+    ('gender', 'gender', '{p}性别'),
+    ('age', 'age', '{p}年龄'),
+    ('phone', 'phone', '{p}电话'),
+    ('id_card', 'id_card', '{p}身份证号'),
+    ('address', 'address', '{p}身份证地址'),
+    ('current_address', 'current_address', '{p}现住址'),
+    ('position', 'position', '{p}岗位'),
+)
+
+
+class PersonRecord(_Record):
+    """人员基本信息（表单中的键以人员类型为前缀，如"证人姓名"）"""
+
+    __slots__ = tuple(attr for attr, _, _ in _PERSON_FIELDS)
+    FIELDS = _PERSON_FIELDS
+    INTERNED = ('gender',)
+
+
+class InjuredPerson(PersonRecord):
+    """受伤职工（本人），另有从笔录提取的信息"""
+
+    __slots__ = ('introduction', 'injury', 'treatment', 'conclusion')
+    FIELDS = _PERSON_FIELDS + (
+        ('introduction', '自我介绍', '自我介绍'),
+        ('injury', '受伤经过', '受伤经过'),
+        ('treatment', '就医情况', '就医情况'),
+        ('conclusion', '医疗结论', '医疗结论'),
+    )
+
+
+class WitnessRecord(PersonRecord):
+    """证人，transcript 为笔录文件名"""
+
+    __slots__ = ('transcript', 'created_date')
+    FIELDS = _PERSON_FIELDS + (
+        ('transcript', 'transcript', None),
+        ('created_date', 'created_date', None),
+    )
+
+
+class LegalPersonRecord(WitnessRecord):
+    """法人（字段与证人相同）"""
+
+    __slots__ = ()
+
+
+# 人员类型 -> 记录类和案件中的列表属性
+PERSON_KINDS = {
+    "证人": (WitnessRecord, 'witnesses'),
+    "法人": (LegalPersonRecord, 'legal_persons'),
+}
+
+
+class CaseRecord(_Record):
+    """案件"""
+
+    __slots__ = ('case_number', 'person_name', 'case_type', 'year', 'folder_path', 'created_date',
+                 'employer', 'work_unit', 'workplace', 'regulation', 'operator',
+                 'person_info', 'witnesses', 'legal_persons')
+    FIELDS = (
+        ('case_number', 'case_number', '案本号'),
+        ('person_name', 'person_name', '受伤职工'),
+        ('case_type', 'case_type', '案件类型'),
+        ('year', 'year', None),
+        ('folder_path', 'folder_path', None),
+        ('created_date', 'created_date', None),
+        ('employer', 'employer', '用人单位'),
+        ('work_unit', 'work_unit', '用工单位'),
+        ('workplace', 'workplace', '工作场所'),
+        ('regulation', 'regulation', '条例'),
+        ('operator', 'operator', '操作员'),
+    )
+    INTERNED = ('case_type', 'year', 'employer', 'work_unit', 'workplace', 'regulation', 'operator')
+
+    def __init__(self, **values):
+        super().__init__(**values)
+        self.person_info = values.get('person_info') or InjuredPerson()
+        # 没有证人/法人时用空元组，不为每个案件分配空列表
+        self.witnesses = tuple(values.get('witnesses', ()))
+        self.legal_persons = tuple(values.get('legal_persons', ()))
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        nested = {'person_info', 'witnesses', 'legal_persons'}
+        record = super().from_dict({key: value for key, value in data.items() if key not in nested})
+        record.person_info = InjuredPerson.from_dict(data.get('person_info') or {})
+        record.witnesses = tuple(WitnessRecord.from_dict(w) for w in data.get('witnesses') or ())
+        record.legal_persons = tuple(LegalPersonRecord.from_dict(p) for p in data.get('legal_persons') or ())
+        return record
+
+    def to_dict(self):
+        data = super().to_dict()
+        data['person_info'] = self.person_info.to_dict()
+        data['witnesses'] = [w.to_dict() for w in self.witnesses]
+        data['legal_persons'] = [p.to_dict() for p in self.legal_persons]
+        return data
+
+    @classmethod
+    def from_form(cls, data, prefix=''):
+        """由本人笔录的表单数据创建新案件（立案日期、年份为当天）"""
+        record = super().from_form(data)
+        now = datetime.now()
+        record.year = now.year
+        record.folder_path = f"{now.year}/{record.case_number}"
+        record.created_date = now.strftime('%Y-%m-%d')
+        record.person_info = InjuredPerson.from_form(data, "本人")
+        return record
+
+    def to_form(self, prefix=''):
+        data = super().to_form()
+        data.update(self.person_info.to_form("本人"))
+        return data
+
+    def get(self, key, default=None):
+        if key in ('person_info', 'witnesses', 'legal_persons'):
+            return getattr(self, key)
+        return super().get(key, default)
+
+    def __getitem__(self, key):
+        if key in ('person_info', 'witnesses', 'legal_persons'):
+            return getattr(self, key)
+        return super().__getitem__(key)
+
+    def __contains__(self, key):
+        return key in ('person_info', 'witnesses', 'legal_persons') or super().__contains__(key)
+
+    def keys(self):
+        return super().keys() + ['person_info', 'witnesses', 'legal_persons']
+
+    def copy(self):
+        record = super().copy()
+        record.person_info = self.person_info.copy()
+        record.witnesses = tuple(w.copy() for w in self.witnesses)
+        record.legal_persons = tuple(p.copy() for p in self.legal_persons)
+        return record
+
+    def add_person(self, person_type, person):
+        """加入证人或法人，返回记录
+        有笔录文件名时：同一份笔录重新生成则原位更新（保留原登记日期），新的笔录文件追加一条记录；
+        没有笔录文件名时：姓名相同（且身份证号不冲突）、也没有笔录的记录原位更新，否则追加
+        """
+        _, attr = PERSON_KINDS[person_type]
+        people = list(getattr(self, attr))
+        for i, existing in enumerate(people):
+            if person.transcript:
+                same = existing.transcript == person.transcript
+            else:
+                same_id = not (existing.id_card and person.id_card) or existing.id_card == person.id_card
+                same = not existing.transcript and existing.name == person.name and same_id
+            if same:
+                if existing.created_date:
+                    person.created_date = existing.created_date
+                people[i] = person
+                break
+        else:
+            people.append(person)
+        setattr(self, attr, tuple(people))
+        return person
+
+
+def person_from_form(data, person_type):
+    """表单中某类人员（本人/证人/法人）的记录"""
+    if person_type in PERSON_KINDS:
+        record = PERSON_KINDS[person_type][0].from_form(data, person_type)
+        record.created_date = datetime.now().strftime('%Y-%m-%d')
+        return record
+    return InjuredPerson.from_form(data, person_type)
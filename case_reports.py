@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+统计报表 - 按用人单位、条例、案件类型、经办人、月份统计案件数
+
+- 案件按列编码（array 保存每列的取值编号），汇总为稀疏的
+  (月份, 案件类型, 条例, 经办人, 用人单位) -> 案件数，任何统计都由它求和得到
+- 每个年份的汇总按分区文件的修改时间缓存到 report_cache.json，
+  往年（已封存）不再重新计算；当年在索引更新时增量调整
+- 导出 xlsx 使用 openpyxl 的只写模式，逐行写出
+"""
+
+from array import array
+from collections import Counter, defaultdict
+
+from atomic_io import atomic_save
+from partition_cache import PartitionCache
+from transcript_content import REGULATION_MAP
+
+
+# (字段, 显示名)
+DIMENSIONS = (
+    ('month', '月份'),
+    ('case_type', '案件类型'),
+    ('regulation', '条例'),
+    ('operator', '经办人'),
+    ('employer', '用人单位'),
+)
+DIMENSION_NAMES = [name for name, _ in DIMENSIONS]
+DIMENSION_TITLES = dict(DIMENSIONS)
+
+EMPTY_VALUE = "未填写"
+
+
+def case_cell(case):
+    """一个案件在各统计维度上的取值"""
+    regulation = case.get('regulation', '')
+    return (
+        case.get('created_date', '')[:7] or EMPTY_VALUE,
+        case.get('case_type', '') or EMPTY_VALUE,
+        REGULATION_MAP.get(regulation, regulation) or EMPTY_VALUE,
+        case.get('operator', '') or EMPTY_VALUE,
+        (case.get('employer', '') or '').strip() or EMPTY_VALUE,
+    )
+
+
+class CaseColumns:
+    """按列保存的案件维度：每列为取值表 + 编号数组"""
+
+    def __init__(self, cases):
+        self.values = [[] for _ in DIMENSIONS]
+        self.codes = [array('I') for _ in DIMENSIONS]
+        lookup = [{} for _ in DIMENSIONS]
+
+        for case in cases:
+            for i, value in enumerate(case_cell(case)):
+                code = lookup[i].get(value)
+                if code is None:
+                    code = lookup[i][value] = len(self.values[i])
+                    self.values[i].append(value)
+                self.codes[i].append(code)
+
+    def cells(self):
+        """各维度取值组合 -> 案件数"""
+        counts = Counter(zip(*self.codes))
+        return Counter({
+            tuple(self.values[i][code] for i, code in enumerate(key)): n
+            for key, n in counts.items()
+        })
+
+
+class ReportEngine(PartitionCache):
+    """统计引擎 - 按年份缓存汇总，索引更新时增量调整"""
+
+    def build_year(self, cases):
+        return CaseColumns(cases).cells()
+
+    def apply_case(self, cells, case, delta):
+        key = case_cell(case)
+        cells[key] += delta
+        if cells[key] <= 0:
+            del cells[key]
+
+    def dump_year(self, cells):
+        return [list(key) + [n] for key, n in cells.items()]
+
+    def load_year(self, rows):
+        return Counter({tuple(row[:-1]): row[-1] for row in rows})
+
+    def cells(self, years=None):
+        """指定年份（默认全部）的汇总合计"""
+        total = Counter()
+        for _, cells in self.year_data(years):
+            total.update(cells)
+        return total
+
+    # ---------- 统计 ----------
+
+    def totals(self, dimension, years=None):
+        """按一个维度统计：取值 -> 案件数（从多到少）"""
+        i = DIMENSION_NAMES.index(dimension)
+        counts = Counter()
+        for key, n in self.cells(years).items():
+            counts[key[i]] += n
+        return dict(counts.most_common())
+
+    def crosstab(self, row_dimension, column_dimension, years=None):
+        """两个维度交叉统计：{行取值: {列取值: 案件数}}"""
+        r = DIMENSION_NAMES.index(row_dimension)
+        c = DIMENSION_NAMES.index(column_dimension)
+        table = defaultdict(Counter)
+        for key, n in self.cells(years).items():
+            table[key[r]][key[c]] += n
+        return {row: dict(table[row]) for row in sorted(table)}
+
+    def monthly(self, dimension=None, years=None):
+        """按月统计：不指定维度时为 {月份: 案件数}，否则为 {月份: {取值: 案件数}}"""
+        if dimension is None:
+            return dict(sorted(self.totals('month', years).items()))
+        return self.crosstab('month', dimension, years)
+
+    # ---------- 导出 ----------
+
+    def export_xlsx(self, filepath, years=None):
+        """导出统计表（只写模式，逐行写出）"""
+        from openpyxl import Workbook
+
+        cells = self.cells(years)
+        wb = Workbook(write_only=True)
+
+        for dimension, title in DIMENSIONS:
+            ws = wb.create_sheet(f"按{title}")
+            ws.append([title, "案件数"])
+            i = DIMENSION_NAMES.index(dimension)
+            counts = Counter()
+            for key, n in cells.items():
+                counts[key[i]] += n
+            rows = sorted(counts.items()) if dimension == 'month' else counts.most_common()
+            for value, n in rows:
+                ws.append([value, n])
+            ws.append(["合计", sum(counts.values())])
+
+        # 月份 x 案件类型 / 条例
+        for dimension in ('case_type', 'regulation'):
+            title = DIMENSION_TITLES[dimension]
+            i = DIMENSION_NAMES.index(dimension)
+            table = defaultdict(Counter)
+            for key, n in cells.items():
+                table[key[0]][key[i]] += n
+            columns = sorted({value for row in table.values() for value in row})
+
+            ws = wb.create_sheet(f"月度-{title}")
+            ws.append(["月份"] + columns + ["合计"])
+            for month in sorted(table):
+                row = table[month]
+                ws.append([month] + [row.get(column, 0) for column in columns] + [sum(row.values())])
+
+        atomic_save(wb, filepath)
+        return filepath
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+案件快照 - 紧凑的二进制索引格式，可按案本号直接读取单个案件
+
+文件结构（小端）:
+    文件头     'CSNP' 版本 标志 案件数 段数
+    段目录     每段 (名称, 偏移, 长度)
+    strings    字符串表：去重后的全部取值（偏移数组 + UTF-8 数据），每个取值只存一次
+    col.<序号> 每个字段一列（字段顺序见 meta），每个案件一个 uint32 字符串编号（最高位表示取值为 JSON 编码的非字符串）
+    lookup     按案本号排序的行号，二分查找即可定位案件
+    rest       证人、法人和字段表以外的键（每行一段 JSON，没有时为空）
+    meta       JSON：年份、来源 JSON 文件的标记等
+
+- 未压缩的快照用 mmap 打开，读取单个案件只读取用到的几段数据，不解析整个文件
+- compress=True 时各段分别用 zlib 压缩，体积更小，但读取时需要先解压用到的段
+- JSON 仍是可读的原始格式，快照可随时由 JSON 重新生成，也可转换回 JSON 便于排查
+"""
+
+import io
+import os
+import sys
+import json
+import mmap
+import time
+import zlib
+import struct
+from array import array
+
+from atomic_io import atomic_write
+from case_records import CaseRecord, InjuredPerson, LegalPersonRecord, WitnessRecord
+
+
+MAGIC = b'CSNP'
+VERSION = 1
+FLAG_COMPRESSED = 0x01
+
+SNAPSHOT_SUFFIX = ".snap"
+
+_HEADER = struct.Struct('<4sHHII')
+_SECTION = struct.Struct('<24sQQ')
+_NON_STRING = 0x80000000
+
+CASE_KEYS = [key for _, key, _ in CaseRecord.FIELDS]
+PERSON_KEYS = [key for _, key, _ in InjuredPerson.FIELDS]
+PERSON_PREFIX = 'person_info.'
+COLUMNS = CASE_KEYS + [PERSON_PREFIX + key for key in PERSON_KEYS]
+_COLUMN_SECTIONS = {column: f'col.{i}' for i, column in enumerate(COLUMNS)}
+
+
+def _uint32_bytes(values):
+    data = array('I', values)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data.tobytes()
+
+
+def _uint32_view(buffer):
+    """uint32 数组视图（小端机器上不复制）"""
+    if sys.byteorder == 'little':
+        return memoryview(buffer).cast('I')
+    data = array('I', bytes(buffer))
+    data.byteswap()
+    return data
+
+
+class _StringTable:
+    """写入时的字符串表：相同的取值只保存一次"""
+
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def add(self, value):
+        if isinstance(value, str):
+            key, text, flag = value, value, 0
+        else:
+            text = json.dumps(value, ensure_ascii=False)
+            key, flag = ('\0json', text), _NON_STRING
+        string_id = self.ids.get(key)
+        if string_id is None:
+            string_id = self.ids[key] = len(self.values)
+            self.values.append(text)
+        return string_id | flag
+
+    def sections(self):
+        encoded = [value.encode('utf-8') for value in self.values]
+        offsets = [0]
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+        return _uint32_bytes(offsets), b''.join(encoded)
+
+
+def _rest_of(case):
+    """列以外的内容：证人、法人、未知的键"""
+    rest = {}
+    if case.witnesses:
+        rest['witnesses'] = [w.to_dict() for w in case.witnesses]
+    if case.legal_persons:
+        rest['legal_persons'] = [p.to_dict() for p in case.legal_persons]
+    if case.extra:
+        rest['extra'] = case.extra
+    if case.person_info.extra:
+        rest['person_extra'] = case.person_info.extra
+    return json.dumps(rest, ensure_ascii=False).encode('utf-8') if rest else b''
+
+
+def encode_snapshot(cases, meta=None, compress=False):
+    """把案件（字典或 CaseRecord）编码为快照内容"""
+    cases = [CaseRecord.from_dict(case) for case in cases]
+    strings = _StringTable()
+
+    columns = {}
+    for _, key, _ in CaseRecord.FIELDS:
+        attr = CaseRecord._BY_KEY[key]
+        columns[key] = [strings.add(getattr(case, attr)) for case in cases]
+    for attr, key, _ in InjuredPerson.FIELDS:
+        columns[PERSON_PREFIX + key] = [strings.add(getattr(case.person_info, attr)) for case in cases]
+
+    rest = [_rest_of(case) for case in cases]
+    rest_offsets = [0]
+    for data in rest:
+        rest_offsets.append(rest_offsets[-1] + len(data))
+
+    lookup = sorted(range(len(cases)), key=lambda row: cases[row].case_number)
+    string_offsets, string_data = strings.sections()
+
+    sections = [
+        ('meta', json.dumps(dict(meta or {}, columns=COLUMNS), ensure_ascii=False).encode('utf-8')),
+        ('strings.offsets', string_offsets),
+        ('strings.data', string_data),
+        ('lookup', _uint32_bytes(lookup)),
+        ('rest.offsets', _uint32_bytes(rest_offsets)),
+        ('rest.data', b''.join(rest)),
+    ]
+    sections.extend((_COLUMN_SECTIONS[key], _uint32_bytes(columns[key])) for key in COLUMNS)
+
+    flags = FLAG_COMPRESSED if compress else 0
+    if compress:
+        sections = [(name, zlib.compress(data, 6)) for name, data in sections]
+
+    out = io.BytesIO()
+    out.write(_HEADER.pack(MAGIC, VERSION, flags, len(cases), len(sections)))
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    for name, data in sections:
+        out.write(_SECTION.pack(name.encode('utf-8'), offset, len(data)))
+        offset += len(data)
+    for _, data in sections:
+        out.write(data)
+    return out.getvalue()
+
+
+def write_snapshot(path, cases, meta=None, compress=False):
+    """原子写入快照文件"""
+    content = encode_snapshot(cases, meta, compress)
+    atomic_write(path, lambda f: f.write(content))
+    return len(content)
+
+
+class SnapshotError(Exception):
+    """快照文件损坏或版本不支持"""
+
+
+class Snapshot:
+    """只读快照：未压缩时 mmap 打开，按需读取各段"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # 空文件不能 mmap
+            self._file.close()
+            raise SnapshotError(f"快照为空: {path}")
+
+        self._cache = {}
+        try:
+            magic, version, self.flags, self.count, section_count = _HEADER.unpack_from(self._buffer, 0)
+            if magic != MAGIC:
+                raise SnapshotError(f"不是案件快照: {path}")
+            if version != VERSION:
+                raise SnapshotError(f"不支持的快照版本 {version}: {path}")
+            self._sections = {}
+            for i in range(section_count):
+                name, offset, length = _SECTION.unpack_from(self._buffer, _HEADER.size + _SECTION.size * i)
+                if offset + length > len(self._buffer):
+                    raise SnapshotError(f"快照不完整: {path}")
+                self._sections[name.rstrip(b'\0').decode('utf-8')] = (offset, length)
+            self.meta = json.loads(bytes(self._section('meta')))
+            if self.meta.get('columns') != COLUMNS:
+                raise SnapshotError(f"快照字段与当前版本不一致: {path}")
+        except SnapshotError:
+            self.close()
+            raise
+        except Exception as e:
+            self.close()
+            raise SnapshotError(f"快照损坏: {path}: {e}")
+
+    def close(self):
+        # 先释放 mmap 上的视图（数组视图在前），否则 mmap 无法关闭
+        cache = getattr(self, '_cache', {})
+        for key in sorted(cache, key=lambda key: not isinstance(key, tuple)):
+            if isinstance(cache[key], memoryview):
+                cache[key].release()
+        self._cache = {}
+        if getattr(self, '_buffer', None) is not None:
+            self._buffer.close()
+            self._buffer = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    # ---------- 段 ----------
+
+    def _section(self, name):
+        """段内容：未压缩时为 mmap 上的视图，压缩时解压一次后缓存"""
+        cached = self._cache.get(name)
+        if cached is not None:
+            return cached
+        offset, length = self._sections[name]
+        data = memoryview(self._buffer)[offset:offset + length]
+        if self.flags & FLAG_COMPRESSED:
+            data = zlib.decompress(data)
+        self._cache[name] = data
+        return data
+
+    def _uint32(self, name):
+        key = ('uint32', name)
+        view = self._cache.get(key)
+        if view is None:
+            view = self._cache[key] = _uint32_view(self._section(name))
+        return view
+
+    def _string(self, string_id):
+        offsets = self._uint32('strings.offsets')
+        index = string_id & ~_NON_STRING
+        text = bytes(self._section('strings.data')[offsets[index]:offsets[index + 1]]).decode('utf-8')
+        return json.loads(text) if string_id & _NON_STRING else text
+
+    def _value(self, column, row):
+        return self._string(self._uint32(_COLUMN_SECTIONS[column])[row])
+
+    def _rest(self, row):
+        offsets = self._uint32('rest.offsets')
+        data = self._section('rest.data')[offsets[row]:offsets[row + 1]]
+        return json.loads(bytes(data)) if len(data) else {}
+
+    # ---------- 读取 ----------
+
+    def _record(self, values, rest):
+        """由各列取值组成 CaseRecord"""
+        data = {key: values[key] for key in CASE_KEYS}
+        data.update(rest.get('extra', {}))
+        person = {key: values[PERSON_PREFIX + key] for key in PERSON_KEYS}
+        person.update(rest.get('person_extra', {}))
+        data['person_info'] = person
+        data['witnesses'] = rest.get('witnesses', ())
+        data['legal_persons'] = rest.get('legal_persons', ())
+        return CaseRecord.from_dict(data)
+
+    def row(self, row):
+        """读取一行（只读取该行用到的数据）"""
+        values = {column: self._value(column, row) for column in COLUMNS}
+        return self._record(values, self._rest(row))
+
+    def find_row(self, case_number):
+        """按案本号二分查找行号，找不到返回None"""
+        lookup = self._uint32('lookup')
+        numbers = self._uint32(_COLUMN_SECTIONS['case_number'])
+        lo, hi = 0, len(lookup)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._string(numbers[lookup[mid]]) < case_number:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(lookup) and self._string(numbers[lookup[lo]]) == case_number:
+            return lookup[lo]
+        return None
+
+    def get(self, case_number):
+        """按案本号读取一个案件，找不到返回None"""
+        row = self.find_row(case_number)
+        return None if row is None else self.row(row)
+
+    def cases(self):
+        """读取全部案件"""
+        offsets = self._uint32('strings.offsets')
+        data = bytes(self._section('strings.data'))
+        strings = [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+        def decode(string_id):
+            if string_id & _NON_STRING:
+                return json.loads(strings[string_id & ~_NON_STRING])
+            return strings[string_id]
+
+        # 按列直接写入记录的属性，相同取值共用同一个字符串对象
+        cases = [CaseRecord.__new__(CaseRecord) for _ in range(self.count)]
+        people = [InjuredPerson.__new__(InjuredPerson) for _ in range(self.count)]
+        for records, fields, prefix in ((cases, CaseRecord.FIELDS, ''), (people, InjuredPerson.FIELDS, PERSON_PREFIX)):
+            for attr, key, _ in fields:
+                values = [decode(i) for i in self._uint32(_COLUMN_SECTIONS[prefix + key])]
+                for record, value in zip(records, values):
+                    setattr(record, attr, value)
+
+        rest_offsets = self._uint32('rest.offsets')
+        for row, (case, person) in enumerate(zip(cases, people)):
+            case.extra = person.extra = None
+            case.person_info = person
+            case.witnesses = case.legal_persons = ()
+            if rest_offsets[row] != rest_offsets[row + 1]:
+                rest = self._rest(row)
+                case.witnesses = tuple(WitnessRecord.from_dict(w) for w in rest.get('witnesses', ()))
+                case.legal_persons = tuple(LegalPersonRecord.from_dict(p) for p in rest.get('legal_persons', ()))
+                case.extra = rest.get('extra') or None
+                person.extra = rest.get('person_extra') or None
+        return cases
+
+
+# ---------- 与 JSON 互转 ----------
+
+def json_to_snapshot(json_path, snapshot_path, compress=False):
+    """把分区 JSON（或旧版 cases_index.json）转换为快照，返回案件数"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        content = json.load(f)
+    meta = {key: value for key, value in content.items() if key != 'cases'}
+    cases = content.get('cases', [])
+    write_snapshot(snapshot_path, cases, meta, compress)
+    return len(cases)
+
+
+def snapshot_to_json(snapshot_path, json_path):
+    """把快照转换回可读的 JSON（格式化），返回案件数"""
+    from atomic_io import atomic_write_json
+
+    with Snapshot(snapshot_path) as snapshot:
+        cases = [case.to_dict() for case in snapshot.cases()]
+        content = {key: value for key, value in snapshot.meta.items()
+                   if key not in ('columns', 'source_stamp')}
+    content['cases'] = cases
+    atomic_write_json(json_path, content, indent=2)
+    return len(cases)
+
+
+# ---------- 性能测试 ----------
+
+def sample_cases(count):
+    """生成用于性能测试的案件"""
+    import random
+
+    rng = random.Random(0)
+    surnames = "赵钱孙李周吴郑王冯陈褚卫蒋沈韩杨朱秦尤许何吕施张"
+    case_types = ["普通案件", "个人案件", "死亡案件"]
+    regulations = ["第十四条第一款第一项（普通工伤案件）", "第十四条第一款第六项（上下班时案件）"]
+    employers = [f"温州市{n}建设有限公司" for n in range(800)]
+    cases = []
+    for i in range(count):
+        name = rng.choice(surnames) + rng.choice(surnames) + str(i)
+        number = f"GS-{name}-{i % 3 + 1:03d}"
+        month = rng.randint(1, 12)
+        cases.append({
+            'case_number': number, 'person_name': name, 'case_type': rng.choice(case_types),
+            'year': 2024, 'folder_path': f"2024/{number}", 'created_date': f"2024-{month:02d}-{rng.randint(1, 28):02d}",
+            'employer': rng.choice(employers), 'work_unit': '', 'workplace': '',
+            'regulation': rng.choice(regulations), 'operator': rng.choice(["王", "李", "陈"]),
+            'person_info': {
+                'name': name, 'gender': rng.choice("男女"), 'age': str(rng.randint(20, 60)),
+                'phone': f"138{rng.randint(0, 99999999):08d}", 'id_card': f"330302{rng.randint(0, 10 ** 12):012d}",
+                'address': "浙江省温州市鹿城区", 'current_address': "浙江省温州市", 'position': "木工",
+                '自我介绍': f"答：我是{name}。", '受伤经过': "搬运材料时砸伤左脚。", '就医情况': "送温州市人民医院。", '医疗结论': "骨折",
+            },
+            'witnesses': [], 'legal_persons': [],
+        })
+    return cases
+
+
+def benchmark(count=100000, directory=None, report=print):
+    """比较 JSON 与快照的文件大小、全部加载和单个读取的耗时"""
+    import tempfile
+    from atomic_io import atomic_write_json
+
+    directory = directory or tempfile.mkdtemp(prefix="snapshot_bench_")
+    cases = sample_cases(count)
+    targets = cases[::max(1, count // 100)]
+    paths = {
+        'JSON（格式化）': os.path.join(directory, "pretty.json"),
+        'JSON（紧凑）': os.path.join(directory, "compact.json"),
+        '快照': os.path.join(directory, "plain" + SNAPSHOT_SUFFIX),
+        '快照（压缩）': os.path.join(directory, "compressed" + SNAPSHOT_SUFFIX),
+    }
+    atomic_write_json(paths['JSON（格式化）'], {'cases': cases}, indent=2)
+    atomic_write_json(paths['JSON（紧凑）'], {'cases': cases}, compact=True)
+    write_snapshot(paths['快照'], cases)
+    write_snapshot(paths['快照（压缩）'], cases, compress=True)
+    del cases
+
+    report(f"{count} 个案件")
+    for label, path in paths.items():
+        start = time.perf_counter()
+        if path.endswith('.json'):
+            with open(path, 'r', encoding='utf-8') as f:
+                loaded = [CaseRecord.from_dict(case) for case in json.load(f)['cases']]
+            load_time = time.perf_counter() - start
+            # JSON 读取单个案件也要解析整个文件
+            get_time = load_time
+        else:
+            with Snapshot(path) as snapshot:
+                loaded = snapshot.cases()
+            load_time = time.perf_counter() - start
+            start = time.perf_counter()
+            for case in targets:
+                with Snapshot(path) as snapshot:
+                    assert snapshot.get(case['case_number']).case_number == case['case_number']
+            get_time = (time.perf_counter() - start) / len(targets)
+        assert len(loaded) == count
+        report(f"  {label}: {os.path.getsize(path) / 1024 / 1024:.1f} MB，"
+               f"全部加载 {load_time:.2f} 秒，读取单个案件 {get_time * 1000:.2f} 毫秒")
+    return directory
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令行工具 - 不启动界面执行批量任务
+
+用法:
+    python main.py regenerate-stale [--year 2025] [--dry-run] [--force]
+    python main.py export (--year 2025 | --cases 案本号 ...) -o 2025.zip [--restart]
+    python main.py import 2025.zip [--overwrite]
+    python main.py dedup [--reclaim] [--dry-run]
+    python main.py report [--year 2025 ...] [--by 案件类型] [-o 统计.xlsx]
+    python main.py employers [--min 2] [--year 2025 ...] [--role 用工单位] [-o 重复单位.xlsx]
+    python main.py dedup-names [--list 用工单位 ...] [--threshold 0.8] [--merge]
+    python main.py snapshot convert cases_index/2024.json 2024.snap [--compress]
+    python main.py snapshot dump 2024.snap -o 2024.json
+    python main.py snapshot bench [--count 100000]
+    python main.py sync [--local D:/工伤案件] [--share //server/工伤案件] [--save]
+    python main.py intake 申请表文件夹 [--case-type 普通案件] [--operator 张三] [--dry-run]
+
+读写案件数据的命令默认使用与界面相同的数据目录（配置了本地副本时为本地副本），可用 --base-dir 指定
+"""
+
+import os
+import sys
+import argparse
+
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def resolve_data_dir(args):
+    """数据目录：--base-dir 指定的目录；否则与界面相同，配置了本地副本时读写本地副本"""
+    if args.base_dir:
+        return os.path.abspath(args.base_dir)
+    from config_manager import ConfigManager
+    from replica_sync import resolve_data_root
+
+    base_dir, _ = resolve_data_root(ConfigManager().load_sync_config(), APP_DIR)
+    return base_dir
+
+
+def cmd_regenerate_stale(args):
+    """重新生成过期文书"""
+    from case_index import CaseIndex
+    from render_tracker import create_tracked_renderer, regenerate_stale
+
+    case_index = CaseIndex(args.base_dir)
+    renderer = create_tracked_renderer(args.base_dir)
+
+    result = regenerate_stale(renderer, case_index, year=args.year,
+                              force=args.force, dry_run=args.dry_run)
+
+    for item in result['stale']:
+        flag = "（已手工修改）" if item['edited'] else ""
+        print(f"{item['path']}: {item['reason']}{flag}")
+
+    print(f"过期 {len(result['stale'])} 份，重新生成 {len(result['regenerated'])} 份，"
+          f"跳过 {len(result['skipped'])} 份，失败 {len(result['errors'])} 份")
+    for path, error in result['errors'].items():
+        print(f"失败 {path}: {error}")
+
+    return 1 if result['errors'] else 0
+
+
+def print_progress(done, total, case_number):
+    if case_number:
+        print(f"[{done + 1}/{total}] {case_number}")
+
+
+def cmd_export(args):
+    """导出案件归档包"""
+    from case_index import CaseIndex
+    from case_archive import export_cases, select_year_cases
+    from review_bundle import select_cases
+
+    case_index = CaseIndex(args.base_dir)
+    if args.cases:
+        cases = select_cases(case_index, case_numbers=args.cases)
+    else:
+        cases = select_year_cases(case_index, args.year)
+
+    if not cases:
+        print("没有符合条件的案件")
+        return 1
+
+    manifest = export_cases(args.base_dir, cases, args.output, progress=print_progress, resume=not args.restart)
+    print(f"已导出 {len(manifest['cases'])} 个案件、{len(manifest['files'])} 个文件到 {args.output}")
+    return 0
+
+
+def cmd_import(args):
+    """导入案件归档包"""
+    from case_index import CaseIndex
+    from case_archive import import_bundle
+
+    result = import_bundle(args.base_dir, args.bundle, CaseIndex(args.base_dir),
+                           overwrite=args.overwrite, progress=print_progress)
+
+    print(f"导入 {len(result['imported'])} 个案件，跳过已有案件 {len(result['skipped'])} 个，"
+          f"失败 {len(result['errors'])} 个")
+    for path in result['conflicts']:
+        print(f"本地文件与归档包不同，已保留本地文件: {path}")
+    for case_number, error in result['errors'].items():
+        print(f"失败 {case_number}: {error}")
+
+    return 1 if result['errors'] else 0
+
+
+def cmd_dedup(args):
+    """统计并回收重复文件占用的空间"""
+    from dedup_store import DedupStore, format_size
+
+    store = DedupStore(args.base_dir)
+
+    if args.reclaim:
+        result = store.reclaim(dry_run=args.dry_run)
+        action = "可合并" if args.dry_run else "已合并"
+        print(f"{action} {result['linked']} 个文件，回收 {format_size(result['reclaimed_bytes'])}")
+        for path, error in result['errors'].items():
+            print(f"失败 {path}: {error}")
+        return 1 if result['errors'] else 0
+
+    report = store.report()
+    print(f"文件 {report['files']} 个，合计 {format_size(report['apparent_bytes'])}，"
+          f"实际占用 {format_size(report['disk_bytes'])}")
+    print(f"重复内容 {report['duplicate_groups']} 组，可回收 {format_size(report['reclaimable_bytes'])}")
+    if args.verbose:
+        for sha, files in report['groups'].items():
+            print(f"{sha[:12]} {format_size(files[0][1].st_size)}")
+            for path, _ in files:
+                print(f"    {os.path.relpath(path, args.base_dir)}")
+    return 0
+
+
+def cmd_report(args):
+    """按月统计案件数，可导出Excel"""
+    from case_index import CaseIndex
+    from case_reports import DIMENSIONS, ReportEngine
+
+    engine = ReportEngine(CaseIndex(args.base_dir), os.path.join(args.base_dir, "report_cache.json"))
+    dimensions = {title: name for name, title in DIMENSIONS}
+
+    if args.by:
+        dimension = dimensions[args.by]
+        for value, count in engine.totals(dimension, args.year).items():
+            print(f"{value}\t{count}")
+    else:
+        for month, count in engine.monthly(years=args.year).items():
+            print(f"{month}\t{count}")
+
+    if args.output:
+        engine.export_xlsx(args.output, args.year)
+        print(f"已导出: {args.output}")
+    return 0
+
+
+def cmd_employers(args):
+    """列出涉及多个案件的单位"""
+    from case_index import CaseIndex
+    from org_index import OrgIndex, ROLES
+
+    org_index = OrgIndex(CaseIndex(args.base_dir), os.path.join(args.base_dir, "org_index_cache.json"))
+    role = {title: name for name, title in ROLES}[args.role]
+    rows = org_index.repeat_orgs(min_cases=args.min, years=args.year, role=role)
+
+    for item in rows:
+        print(f"{item['name']}\t{item['count']}\t{item['first_date']} ~ {item['last_date']}\t{','.join(item['years'])}")
+    print(f"共 {len(rows)} 个{args.role}涉及 {args.min} 个及以上案件")
+
+    if args.output:
+        from openpyxl import Workbook
+        from atomic_io import atomic_save
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(args.role)
+        ws.append([args.role, "案件数", "最早立案", "最近立案", "年份"])
+        for item in rows:
+            ws.append([item['name'], item['count'], item['first_date'], item['last_date'], ','.join(item['years'])])
+        atomic_save(wb, args.output)
+        print(f"已导出: {args.output}")
+    return 0
+
+
+def cmd_dedup_names(args):
+    """名称汇总表查重与合并"""
+    from org_names import NAME_LISTS, find_duplicate_groups, read_name_list, merge_name_list
+
+    for header, filename in NAME_LISTS:
+        if args.list and header not in args.list:
+            continue
+        filepath = os.path.join(args.base_dir, filename)
+        if not os.path.exists(filepath):
+            continue
+
+        names = read_name_list(filepath, header)
+        groups = find_duplicate_groups(names, args.threshold)
+        print(f"{filename}: {len(names)} 个名称，{len(groups)} 组疑似重复")
+        for group in groups:
+            print(f"  保留 {group[0]}  <-  {'；'.join(group[1:])}")
+
+        if args.merge and groups:
+            removed = merge_name_list(filepath, header, groups)
+            print(f"  已合并，删除 {removed} 行（原文件备份为 {filename}.bak）")
+    return 0
+
+
+def cmd_snapshot(args):
+    """案件快照与 JSON 互相转换、性能测试"""
+    from case_snapshot import SnapshotError, benchmark, json_to_snapshot, snapshot_to_json
+
+    try:
+        if args.action == 'convert':
+            count = json_to_snapshot(args.source, args.target, compress=args.compress)
+            print(f"已写入 {count} 个案件: {args.target}")
+        elif args.action == 'dump':
+            count = snapshot_to_json(args.source, args.output)
+            print(f"已导出 {count} 个案件: {args.output}")
+        else:
+            import shutil
+            directory = benchmark(args.count)
+            shutil.rmtree(directory, ignore_errors=True)
+    except SnapshotError as e:
+        print(e)
+        return 1
+    return 0
+
+
+def cmd_sync(args):
+    """本地副本与共享目录同步一次"""
+    from config_manager import ConfigManager
+    from replica_sync import SyncEngine
+
+    config = ConfigManager()
+    sync_config = config.load_sync_config()
+    local_root = args.local or sync_config['local_root']
+    share_root = args.share or sync_config['share_root'] or APP_DIR
+    if not local_root:
+        print("未设置本地副本目录，请用 --local 指定")
+        return 1
+    if args.save:
+        config.save_sync_config(share_root, local_root, sync_config['interval'])
+        print(f"已启用本地副本: {local_root}（共享目录 {share_root}）")
+
+    os.makedirs(local_root, exist_ok=True)
+    result = SyncEngine(local_root, share_root).sync()
+    print(f"下载 {len(result['pulled'])}，上传 {len(result['pushed'])}，合并 {len(result['merged'])}，"
+          f"删除 {len(result['deleted'])}，稍后重试 {len(result['skipped'])}")
+    for path, note in result['conflicts']:
+        print(f"冲突 {path}: {note}")
+    for path, error in result['errors'].items():
+        print(f"失败 {path}: {error}")
+    return 1 if result['errors'] else 0
+
+
+def cmd_intake(args):
+    """从申请表文件夹批量立案"""
+    from case_index import CaseIndex
+    from case_intake import parse_folder, prepare_intake, commit_intake
+
+    case_index = CaseIndex(args.base_dir)
+    applications, parse_errors = parse_folder(args.folder)
+    plan = prepare_intake(args.base_dir, applications, case_index, case_type=args.case_type,
+                          regulation=args.regulation, operator=args.operator)
+
+    for _, source, case in plan['cases']:
+        print(f"{'待立案' if args.dry_run else '立案'} {case.case_number}: {source}")
+    for source, reason in plan['invalid'].items():
+        print(f"身份证号有误 {source}: {reason}")
+    for source, reason in plan['skipped'].items():
+        print(f"跳过 {source}: {reason}")
+    for name, error in parse_errors.items():
+        print(f"无法读取 {name}: {error}")
+
+    if not args.dry_run and plan['cases']:
+        try:
+            created = commit_intake(args.base_dir, plan, case_index)
+        except Exception as e:
+            print(f"批量立案失败，本批未建立任何案件: {e}")
+            return 1
+        print(f"已立案 {len(created)} 个")
+    return 1 if plan['invalid'] or parse_errors else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py", description="工伤案件管理系统命令行工具")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    # 读写案件数据的命令共用
+    data = argparse.ArgumentParser(add_help=False)
+    data.add_argument('--base-dir', help="数据目录（默认与界面相同：本地副本或共享目录）")
+
+    p = subparsers.add_parser('regenerate-stale', parents=[data], help="只重新生成模板或案件数据已变化的文书")
+    p.add_argument('--year', help="只处理指定年份")
+    p.add_argument('--dry-run', action='store_true', help="只列出过期文书，不生成")
+    p.add_argument('--force', action='store_true', help="覆盖生成后被手工修改过的文件")
+    p.set_defaults(func=cmd_regenerate_stale)
+
+    p = subparsers.add_parser('export', parents=[data], help="把一年或指定案件导出为一个 zip/tar 归档包")
+    group = p.add_mutually_exclusive_group(required=True)
+    group.add_argument('--year', help="导出指定年份的全部案件")
+    group.add_argument('--cases', nargs='+', metavar='案本号', help="导出指定案件")
+    p.add_argument('-o', '--output', required=True, help="归档包路径（.zip 或 .tar）")
+    p.add_argument('--restart', action='store_true', help="不从上次中断处继续，重新导出")
+    p.set_defaults(func=cmd_export)
+
+    p = subparsers.add_parser('import', parents=[data], help="导入归档包，校验文件哈希并合并索引")
+    p.add_argument('bundle', help="归档包路径")
+    p.add_argument('--overwrite', action='store_true', help="覆盖本地已有的案件")
+    p.set_defaults(func=cmd_import)
+
+    p = subparsers.add_parser('dedup', parents=[data], help="统计内容完全相同的文件；--reclaim 合并为硬链接回收空间")
+    p.add_argument('--reclaim', action='store_true', help="把内容相同的文件合并为硬链接")
+    p.add_argument('--dry-run', action='store_true', help="与 --reclaim 一起使用，只统计不修改")
+    p.add_argument('-v', '--verbose', action='store_true', help="列出每组重复文件")
+    p.set_defaults(func=cmd_dedup)
+
+    p = subparsers.add_parser('report', parents=[data], help="统计案件数（默认按月份）")
+    p.add_argument('--year', nargs='+', help="只统计指定年份")
+    p.add_argument('--by', choices=['案件类型', '条例', '经办人', '用人单位'], help="按指定项目统计")
+    p.add_argument('-o', '--output', help="导出统计表（.xlsx）")
+    p.set_defaults(func=cmd_report)
+
+    p = subparsers.add_parser('employers', parents=[data], help="列出涉及多个案件的单位")
+    p.add_argument('--min', type=int, default=2, help="最少案件数（默认2）")
+    p.add_argument('--year', nargs='+', help="只统计指定年份")
+    p.add_argument('--role', choices=['用人单位', '用工单位', '工作场所'], default='用人单位', help="单位身份")
+    p.add_argument('-o', '--output', help="导出为 .xlsx")
+    p.set_defaults(func=cmd_employers)
+
+    p = subparsers.add_parser('dedup-names', parents=[data], help="名称汇总表查重，可合并同一单位的不同写法")
+    p.add_argument('--list', nargs='+', choices=['用人单位', '用工单位', '工作场所'], help="只处理指定汇总表")
+    p.add_argument('--threshold', type=float, default=0.8, help="相似度阈值（默认0.8）")
+    p.add_argument('--merge', action='store_true', help="合并重复名称，每组保留第一个写法")
+    p.set_defaults(func=cmd_dedup_names)
+
+    p = subparsers.add_parser('snapshot', help="案件索引的二进制快照：转换、导出为 JSON、性能测试")
+    actions = p.add_subparsers(dest='action', required=True)
+    a = actions.add_parser('convert', help="把索引 JSON 转换为快照")
+    a.add_argument('source', help="索引 JSON 文件")
+    a.add_argument('target', help="快照文件（.snap）")
+    a.add_argument('--compress', action='store_true', help="压缩各段（文件更小，但不能按需读取）")
+    a = actions.add_parser('dump', help="把快照导出为可读的 JSON")
+    a.add_argument('source', help="快照文件")
+    a.add_argument('-o', '--output', required=True, help="JSON 文件")
+    a = actions.add_parser('bench', help="比较 JSON 与快照的大小和读取耗时")
+    a.add_argument('--count', type=int, default=100000, help="测试案件数（默认100000）")
+    p.set_defaults(func=cmd_snapshot)
+
+    p = subparsers.add_parser('sync', help="本地副本与共享目录双向同步一次")
+    p.add_argument('--local', help="本地副本目录（默认取配置）")
+    p.add_argument('--share', help="共享目录（默认取配置，未配置时为程序所在目录）")
+    p.add_argument('--save', action='store_true', help="保存为配置，此后程序启动时使用本地副本")
+    p.set_defaults(func=cmd_sync)
+
+    p = subparsers.add_parser('intake', parents=[data], help="从工伤认定申请表（xlsx/docx）批量立案")
+    p.add_argument('folder', help="申请表所在文件夹")
+    p.add_argument('--case-type', default='普通案件', choices=['普通案件', '个人案件', '死亡案件', '个人申请死亡案件'],
+                   help="申请表中没有案件类型时使用（默认普通案件）")
+    p.add_argument('--regulation', default='', help="条例")
+    p.add_argument('--operator', default='', help="经办人")
+    p.add_argument('--dry-run', action='store_true', help="只解析和校验，不立案")
+    p.set_defaults(func=cmd_intake)
+
+    return parser
+
+
+# 命令名 -> 由 main.py 判断是否进入命令行模式
+COMMANDS = {'regenerate-stale', 'export', 'import', 'dedup', 'report', 'employers', 'dedup-names', 'snapshot', 'sync', 'intake'}
+
+
+def run(argv):
+    args = build_parser().parse_args(argv)
+    if hasattr(args, 'base_dir'):
+        args.base_dir = resolve_data_dir(args)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(run(sys.argv[1:]))
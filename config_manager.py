@@ -34,7 +34,7 @@ class ConfigManager:
     def load_config(self):
         """
         加载配置
-        返回: dict {operator, api_url, api_key, remember}
+        返回: dict {operator, api_url, api_key, api_model, remember}
         """
         # 检查是否记住
         remember = self.settings.value("remember", False, type=bool)
@@ -53,13 +53,42 @@ class ConfigManager:
                 except:
                     api_key = ""
 
+        # 模型名称（界面上没有输入框，需要时在配置中手动设置）
+        api_model = self.settings.value("api_model", "", type=str)
+
         return {
             "operator": operator,
             "api_url": api_url,
             "api_key": api_key,
+            "api_model": api_model,
             "remember": remember
         }
 
+    def save_sync_config(self, share_root="", local_root="", interval=5):
+        """
+        保存本地副本配置：local_root 为空时直接在共享目录上工作
+        """
+        self.settings.setValue("share_root", share_root)
+        self.settings.setValue("local_root", local_root)
+        self.settings.setValue("sync_interval", interval)
+
+    def load_sync_config(self):
+        """
+        加载本地副本配置
+        返回: dict {share_root, local_root, interval(分钟)}
+        """
+        return {
+            "share_root": self.settings.value("share_root", "", type=str),
+            "local_root": self.settings.value("local_root", "", type=str),
+            "interval": self.settings.value("sync_interval", 5, type=int),
+        }
+
+    def load_resident(self):
+        """
+        关闭窗口时是否驻留托盘（默认是）
+        """
+        return self.settings.value("resident", True, type=bool)
+
     def clear_config(self):
         """清除所有配置"""
         self.settings.remove("operator")
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重复文件合并 - 把案件文件夹和模板中逐字节相同的文件合并为硬链接
+
+- 只处理完全相同的副本（重复导入的附件、扫描件、复制的模板等）；
+  生成的笔录、文书各自内容不同，不会被合并，也不计入可回收空间
+- 内容存放在 .store/objects/<前两位>/<sha256>，案件文件夹中的文件是它的硬链接，
+  Word 仍可直接打开
+- 合并后各副本共用同一份内容：本程序写文件时先写临时文件再替换，写入后该文件自动脱离共享；
+  直接改写文件本身的程序会同时改变所有副本，这类文件不要合并
+- 只处理数据目录内的普通文件：符号链接、解析后位于数据目录外的文件跳过，
+  存储目录不在数据目录内时不合并
+- 不支持硬链接的磁盘（部分网络共享）会跳过并报告
+"""
+
+import os
+import json
+from collections import defaultdict
+
+from atomic_io import atomic_write_json
+from render_tracker import sha256_file
+
+
+STORE_DIR = '.store'
+
+# 不参与合并的文件
+SKIP_PREFIXES = ('~$',)
+SKIP_SUFFIXES = ('.tmp', '.part', '.atomic', '.importing', '.dedup')
+
+
+def iter_store_roots(base_dir):
+    """参与合并的目录：年份文件夹和模板目录（不含指向别处的符号链接）"""
+    for name in sorted(os.listdir(base_dir)):
+        path = os.path.join(base_dir, name)
+        if os.path.islink(path):
+            continue
+        if os.path.isdir(path) and (name.isdigit() and len(name) == 4 or name == 'templates'):
+            yield path
+
+
+def inside(base_dir, path):
+    """path 解析符号链接后是否位于 base_dir 内"""
+    root = os.path.realpath(base_dir)
+    return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+
+def iter_files(base_dir):
+    """数据目录内的普通文件（跳过符号链接，os.walk 也不进入链接的目录）"""
+    for root in iter_store_roots(base_dir):
+        for dirpath, dirs, files in os.walk(root):
+            dirs.sort()
+            for filename in sorted(files):
+                if filename.startswith(SKIP_PREFIXES) or filename.endswith(SKIP_SUFFIXES):
+                    continue
+                path = os.path.join(dirpath, filename)
+                if os.path.islink(path) or not inside(base_dir, path):
+                    continue
+                yield path
+
+
+def format_size(size):
+    """字节数转换为便于阅读的文字"""
+    if size < 1024:
+        return f"{size} B"
+    for unit in ('KB', 'MB', 'GB'):
+        size /= 1024
+        if size < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}"
+
+
+class DedupStore:
+    """内容寻址存储"""
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.store_dir = os.path.join(base_dir, STORE_DIR)
+        self.objects_dir = os.path.join(self.store_dir, 'objects')
+        self.hash_cache_file = os.path.join(self.store_dir, 'hashes.json')
+        self._hash_cache = None
+
+    def object_path(self, sha):
+        return os.path.join(self.objects_dir, sha[:2], sha)
+
+    def _load_hash_cache(self):
+        if self._hash_cache is None:
+            self._hash_cache = {}
+            if os.path.exists(self.hash_cache_file):
+                try:
+                    with open(self.hash_cache_file, 'r', encoding='utf-8') as f:
+                        self._hash_cache = json.load(f)
+                except Exception as e:
+                    print(f"读取哈希缓存失败: {e}")
+        return self._hash_cache
+
+    def _save_hash_cache(self):
+        if self._hash_cache is None:
+            return
+        atomic_write_json(self.hash_cache_file, self._hash_cache)
+
+    def file_hash(self, path, stat=None):
+        """文件的 sha256，按 (inode, 修改时间, 大小) 缓存，避免重复读取大文件"""
+        stat = stat or os.stat(path)
+        stamp = [stat.st_ino, stat.st_mtime_ns, stat.st_size]
+        cache = self._load_hash_cache()
+        rel_path = os.path.relpath(path, self.base_dir).replace(os.sep, '/')
+        cached = cache.get(rel_path)
+        if cached and cached[:3] == stamp:
+            return cached[3]
+        sha = sha256_file(path)
+        cache[rel_path] = stamp + [sha]
+        return sha
+
+    def scan(self):
+        """找出内容相同的文件组
+        返回 {sha256: [(路径, stat), ...]}，只包含至少两个不同 inode 的组
+        """
+        by_size = defaultdict(list)
+        for path in iter_files(self.base_dir):
+            try:
+                stat = os.lstat(path)
+            except OSError:
+                continue
+            if stat.st_size:
+                by_size[stat.st_size].append((path, stat))
+
+        groups = {}
+        for size, files in by_size.items():
+            # 大小不同的文件不可能相同，只对大小重复的文件计算哈希
+            if len({stat.st_ino for _, stat in files}) < 2:
+                continue
+            by_hash = defaultdict(list)
+            for path, stat in files:
+                by_hash[self.file_hash(path, stat)].append((path, stat))
+            for sha, same in by_hash.items():
+                if len({stat.st_ino for _, stat in same}) > 1:
+                    groups[sha] = same
+
+        self._save_hash_cache()
+        return groups
+
+    def report(self):
+        """统计完全相同的文件可回收的空间"""
+        total_files = 0
+        total_bytes = 0
+        inodes = {}
+        for path in iter_files(self.base_dir):
+            try:
+                stat = os.lstat(path)
+            except OSError:
+                continue
+            total_files += 1
+            total_bytes += stat.st_size
+            # 已合并的硬链接只算一次
+            inodes.setdefault((stat.st_dev, stat.st_ino), stat.st_size)
+
+        groups = self.scan()
+        reclaimable = 0
+        for sha, files in groups.items():
+            distinct = {stat.st_ino for _, stat in files}
+            reclaimable += (len(distinct) - 1) * files[0][1].st_size
+
+        return {
+            'files': total_files,
+            'apparent_bytes': total_bytes,
+            'disk_bytes': sum(inodes.values()),
+            'duplicate_groups': len(groups),
+            'reclaimable_bytes': reclaimable,
+            'groups': groups,
+        }
+
+    def _link_into_place(self, source, path):
+        """把 path 替换为 source 的硬链接"""
+        temp_path = path + ".dedup"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        os.link(source, temp_path)
+        os.replace(temp_path, path)
+
+    def reclaim(self, dry_run=False):
+        """把重复文件合并为同一内容的硬链接，返回 {linked, reclaimed_bytes, errors}"""
+        result = {'linked': 0, 'reclaimed_bytes': 0, 'errors': {}}
+
+        # 存储目录被换成指向别处的链接时，硬链接会把内容带出数据目录
+        if os.path.lexists(self.store_dir) and (os.path.islink(self.store_dir)
+                                                or not inside(self.base_dir, self.store_dir)):
+            result['errors'][self.store_dir] = "存储目录不在数据目录内，不合并"
+            return result
+
+        for sha, files in self.scan().items():
+            obj = self.object_path(sha)
+            size = files[0][1].st_size
+            if dry_run:
+                result['linked'] += len({stat.st_ino for _, stat in files}) - 1
+                result['reclaimed_bytes'] += (len({stat.st_ino for _, stat in files}) - 1) * size
+                continue
+
+            try:
+                if not os.path.exists(obj):
+                    os.makedirs(os.path.dirname(obj), exist_ok=True)
+                    os.link(files[0][0], obj)
+                obj_stat = os.stat(obj)
+            except OSError as e:
+                result['errors'][files[0][0]] = f"无法建立硬链接: {e}"
+                continue
+
+            replaced = set()
+            for path, stat in files:
+                if stat.st_ino == obj_stat.st_ino:
+                    continue
+                try:
+                    # 扫描后文件被修改或换成链接则跳过
+                    current = os.lstat(path)
+                    if (current.st_mtime_ns, current.st_size) != (stat.st_mtime_ns, stat.st_size) \
+                            or os.path.islink(path):
+                        continue
+                    self._link_into_place(obj, path)
+                    rel_path = os.path.relpath(path, self.base_dir).replace(os.sep, '/')
+                    self._hash_cache[rel_path] = [obj_stat.st_ino, obj_stat.st_mtime_ns, size, sha]
+                    result['linked'] += 1
+                    if stat.st_ino not in replaced:
+                        replaced.add(stat.st_ino)
+                        result['reclaimed_bytes'] += size
+                except OSError as e:
+                    result['errors'][path] = str(e)
+
+        self._save_hash_cache()
+        if not dry_run:
+            self.prune()
+        return result
+
+    def prune(self):
+        """删除已没有案件文件引用的内容，返回删除数量"""
+        removed = 0
+        if not os.path.isdir(self.objects_dir):
+            return removed
+        for dirpath, dirs, files in os.walk(self.objects_dir):
+            for filename in files:
+                path = os.path.join(dirpath, filename)
+                try:
+                    if os.stat(path).st_nlink <= 1:
+                        os.remove(path)
+                        removed += 1
+                except OSError as e:
+                    print(f"清理失败 {path}: {e}")
+        return removed
+
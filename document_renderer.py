@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文书生成 - 模板缓存、占位符替换和案件文书渲染
+"""
+
+import io
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from docx import Document
+from docx.oxml.ns import qn
+from docx.text.paragraph import Paragraph
+
+from atomic_io import atomic_save, atomic_write
+from case_records import CaseRecord
+from docx_writer import write_docx
+from transcript_content import transcript_content, insert_description, add_questions
+
+
+# 案件文书：文书名称 -> (模板文件名, 输出文件名后缀)
+CASE_DOCUMENTS = {
+    "案件审批表": ("工伤案件审批表（模板）.docx", "案件审批表"),
+    "工伤告知书": ("工伤告知书（模板）.docx", "工伤告知书"),
+    "谈话通知书": ("谈话通知书（模板）.docx", "谈话通知书"),
+    "案审会材料": ("案审会材料（模板）.docx", "案审会材料"),
+}
+
+
+class TemplateCache:
+    """模板缓存 - 模板文件只读一次，每次生成从内存副本打开"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache = {}  # 路径 -> (修改时间, 大小, 文件内容, 内容哈希)
+
+    def _get(self, template_path):
+        """读取模板内容，文件未变化时直接返回缓存"""
+        stat = os.stat(template_path)
+        with self._lock:
+            cached = self._cache.get(template_path)
+            if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                return cached
+
+        with open(template_path, 'rb') as f:
+            content = f.read()
+
+        cached = (stat.st_mtime_ns, stat.st_size, content, hashlib.sha256(content).hexdigest())
+        with self._lock:
+            self._cache[template_path] = cached
+        return cached
+
+    def get_bytes(self, template_path):
+        """模板文件内容"""
+        return self._get(template_path)[2]
+
+    def get_hash(self, template_path):
+        """模板文件内容的 sha256"""
+        return self._get(template_path)[3]
+
+    def open(self, template_path):
+        """打开模板，返回新的 Document 对象"""
+        return Document(io.BytesIO(self.get_bytes(template_path)))
+
+
+def iter_paragraphs(doc):
+    """遍历正文段落和表格（含嵌套表格）里的段落
+    直接遍历XML中的 w:p，合并单元格只会出现一次
+    """
+    for p in doc.element.body.iter(qn('w:p')):
+        yield Paragraph(p, doc)
+
+
+def replace_placeholders(doc, values):
+    """替换文档中的 {键} 占位符，values 的键不带花括号"""
+    placeholders = [(f"{{{key}}}", str(value)) for key, value in values.items()]
+
+    for paragraph in iter_paragraphs(doc):
+        text = paragraph.text
+        if '{' not in text:
+            continue
+
+        new_text = text
+        for key, value in placeholders:
+            if key in new_text:
+                new_text = new_text.replace(key, value)
+
+        # 只有内容变化时才重写段落，避免丢失其他段落的格式
+        if new_text != text:
+            paragraph.text = new_text
+
+    return doc
+
+
+def build_case_placeholders(case_data):
+    """根据索引中的案件数据（字典或 CaseRecord）生成占位符"""
+    case = CaseRecord.from_dict(case_data)
+    person = case.person_info
+
+    return {
+        '案本号': case.case_number,
+        '受伤职工': case.person_name,
+        '性别': person.gender,
+        '年龄': person.age,
+        '身份证号': person.id_card,
+        '身份证地址': person.address,
+        '现住址': person.current_address,
+        '联系电话': person.phone,
+        '岗位': person.position,
+        '自我介绍': person.introduction,
+        '受伤经过': person.injury,
+        '就医情况': person.treatment,
+        '医疗结论': person.conclusion,
+        '用人单位': case.employer,
+        '用工单位': case.work_unit,
+        '工作场所': case.workplace,
+        '条例': case.regulation,
+        '案件类型': case.case_type,
+        '操作员': case.operator,
+        '当前日期': datetime.now().strftime('%Y年%m月%d日'),
+    }
+
+
+def save_document(doc, filepath, template_bytes=None):
+    """原子保存：先写临时文件再替换，不会改写与其他文件共享的硬链接内容
+    给出模板内容时只重写正文部件，其余部件从模板原样复制
+    """
+    if template_bytes is None:
+        atomic_save(doc, filepath)
+    else:
+        atomic_write(filepath, lambda f: write_docx(doc, template_bytes, f))
+
+
+class DocumentRenderer:
+    """文书渲染器 - 所有文书共用一个模板缓存和占位符引擎"""
+
+    def __init__(self, base_dir, template_cache=None, tracker=None):
+        self.base_dir = base_dir
+        self.template_dir = os.path.join(base_dir, "templates")
+        self.templates = template_cache or TemplateCache()
+        self.tracker = tracker  # 可选的生成记录（render_tracker.RenderTracker）
+
+    def template_path(self, template_name):
+        """模板文件完整路径"""
+        return os.path.join(self.template_dir, template_name)
+
+    def open_template(self, template_name):
+        """打开模板，不存在时抛出 FileNotFoundError"""
+        template_path = self.template_path(template_name)
+        if not os.path.exists(template_path):
+            raise FileNotFoundError(f"模板不存在: {template_name}")
+        return self.templates.open(template_path)
+
+    def template_bytes(self, template_name):
+        """模板文件内容（缓存）"""
+        return self.templates.get_bytes(self.template_path(template_name))
+
+    def case_folder(self, case_data):
+        """案件文件夹完整路径"""
+        return os.path.join(self.base_dir, case_data.get('folder_path', ''))
+
+    def render_case_document(self, doc_type, case_data, filepath=None, record=True):
+        """生成一份案件文书，返回文件路径"""
+        template_name, suffix = CASE_DOCUMENTS[doc_type]
+        doc = self.open_template(template_name)
+        replace_placeholders(doc, build_case_placeholders(case_data))
+
+        if not filepath:
+            case_folder = self.case_folder(case_data)
+            os.makedirs(case_folder, exist_ok=True)
+            filepath = os.path.join(case_folder, f"{case_data['case_number']}_{suffix}.docx")
+        save_document(doc, filepath, self.template_bytes(template_name))
+
+        if self.tracker and record:
+            self.tracker.record_case_document(filepath, doc_type, case_data)
+        return filepath
+
+    def render_transcript(self, template_name, data, filepath, record=True):
+        """生成笔录：插入自我介绍（本人）、替换占位符、添加问答句"""
+        doc = self.open_template(template_name)
+        placeholders, description, questions = transcript_content(data)
+
+        if description:
+            insert_description(doc, description)
+        replace_placeholders(doc, placeholders)
+        add_questions(doc, questions)
+
+        save_document(doc, filepath, self.template_bytes(template_name))
+
+        if self.tracker and record:
+            self.tracker.record_transcript(filepath, template_name, data)
+        return filepath
+
+    def render_all(self, case_data, doc_types=None, max_workers=4):
+        """并行生成本案全部文书，生成记录一次写入
+        返回: (已生成的文件路径列表, {文书名称: 错误信息})
+        """
+        def render(doc_type):
+            filepath = self.render_case_document(doc_type, case_data, record=False)
+            entry = self.tracker.case_document_entry(doc_type, case_data) if self.tracker else None
+            return filepath, entry
+
+        doc_types = list(doc_types or CASE_DOCUMENTS)
+        generated = []
+        records = []
+        errors = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {doc_type: executor.submit(render, doc_type) for doc_type in doc_types}
+            for doc_type, future in futures.items():
+                try:
+                    filepath, entry = future.result()
+                except Exception as e:
+                    errors[doc_type] = str(e)
+                    continue
+                generated.append(filepath)
+                if entry is not None:
+                    records.append((filepath, entry))
+
+        if records:
+            self.tracker.record_many(records)
+        return generated, errors
+
+    def render_transcripts(self, jobs, max_workers=4):
+        """并行生成多份笔录，同一模板只读取一次，生成记录一次写入
+        jobs: [(模板名称, 表单数据, 文件路径)]
+        返回: (已生成的文件路径列表, {文件路径: 错误信息})
+        """
+        def render(template_name, data, filepath):
+            self.render_transcript(template_name, data, filepath, record=False)
+            entry = self.tracker.transcript_entry(template_name, data) if self.tracker else None
+            return filepath, entry
+
+        # 先把用到的模板读入缓存，各线程共用同一份
+        for template_name in {job[0] for job in jobs}:
+            try:
+                self.template_bytes(template_name)
+            except OSError:
+                pass  # 模板不存在，由各份笔录分别报错
+
+        generated = []
+        records = []
+        errors = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [(job[2], executor.submit(render, *job)) for job in jobs]
+            for filepath, future in futures:
+                try:
+                    _, entry = future.result()
+                except Exception as e:
+                    errors[filepath] = str(e)
+                    continue
+                generated.append(filepath)
+                if entry is not None:
+                    records.append((filepath, entry))
+
+        if records:
+            self.tracker.record_many(records)
+        return generated, errors
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文书预览 - 不启动 Word，直接把 docx 正文转换为富文本（HTML）在程序内查看
+
+- 流式解析 word/document.xml：正文段落、表格逐个转换，处理完即释放
+- 保留对齐、粗体、斜体、下划线、字号、制表符、换行和分页；表格保留合并单元格
+- 文中残留的 {…} 内容（多为未填写的占位符）高亮显示并单独列出，便于核对
+- 转换结果按文件内容的 sha256 缓存；文件未变化（修改时间、大小相同）时不重新读取
+"""
+
+import io
+import os
+import html
+import zipfile
+from collections import OrderedDict
+
+from lxml import etree
+
+from render_tracker import PLACEHOLDER_PATTERN, sha256_bytes
+
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+_ALIGN = {'center': 'center', 'right': 'right', 'end': 'right', 'both': 'justify', 'distribute': 'justify'}
+
+_MARK = '<span style="background-color:#ffe08a">{}</span>'
+
+
+def _val(elem, tag):
+    """子元素的 w:val 属性；子元素存在但没有 w:val 时为 'true'"""
+    child = elem.find(_W + tag) if elem is not None else None
+    if child is None:
+        return None
+    return child.get(_W + 'val', 'true')
+
+
+def _is_on(value):
+    return value is not None and value not in ('0', 'false', 'none')
+
+
+def _mark_placeholders(text):
+    """转义文字，{…} 内容高亮"""
+    parts = []
+    last = 0
+    for match in PLACEHOLDER_PATTERN.finditer(text):
+        parts.append(html.escape(text[last:match.start()]))
+        parts.append(_MARK.format(html.escape(match.group(0))))
+        last = match.end()
+    parts.append(html.escape(text[last:]))
+    return ''.join(parts)
+
+
+def _run_html(run):
+    props = run.find(_W + 'rPr')
+    pieces = []
+    for child in run:
+        if child.tag == _W + 't':
+            pieces.append(_mark_placeholders(child.text or ''))
+        elif child.tag == _W + 'tab':
+            pieces.append('&emsp;&emsp;')
+        elif child.tag in (_W + 'br', _W + 'cr'):
+            pieces.append('<hr/>' if child.get(_W + 'type') == 'page' else '<br/>')
+    text = ''.join(pieces)
+    if not text or props is None:
+        return text
+
+    styles = []
+    size = _val(props, 'sz')
+    if size and size.isdigit():
+        styles.append(f"font-size:{int(size) / 2:g}pt")
+    color = _val(props, 'color')
+    if color and color not in ('auto', 'true'):
+        styles.append(f"color:#{color}")
+    if styles:
+        text = f'<span style="{";".join(styles)}">{text}</span>'
+    if _is_on(_val(props, 'b')):
+        text = f"<b>{text}</b>"
+    if _is_on(_val(props, 'i')):
+        text = f"<i>{text}</i>"
+    if _is_on(_val(props, 'u')):
+        text = f"<u>{text}</u>"
+    return text
+
+
+def _paragraph_html(paragraph):
+    runs = []
+    for run in paragraph.iter(_W + 'r'):
+        runs.append(_run_html(run))
+    align = _ALIGN.get(_val(paragraph.find(_W + 'pPr'), 'jc'))
+    style = f' align="{align}"' if align else ''
+    return f"<p{style}>{''.join(runs) or '&nbsp;'}</p>"
+
+
+def _table_html(table):
+    rows = []
+    for row in table.iterchildren(_W + 'tr'):
+        cells = []
+        for cell in row.iterchildren(_W + 'tc'):
+            props = cell.find(_W + 'tcPr')
+            span = _val(props, 'gridSpan')
+            merge = _val(props, 'vMerge')
+            if merge is not None and merge != 'restart':
+                continue  # 纵向合并的后续单元格
+            content = []
+            for child in cell:
+                if child.tag == _W + 'p':
+                    content.append(_paragraph_html(child))
+                elif child.tag == _W + 'tbl':
+                    content.append(_table_html(child))
+            attrs = f' colspan="{span}"' if span and span.isdigit() and int(span) > 1 else ''
+            if merge == 'restart':
+                attrs += f' rowspan="{_row_span(row, cell)}"'
+            cells.append(f"<td{attrs}>{''.join(content)}</td>")
+        rows.append(f"<tr>{''.join(cells)}</tr>")
+    return f'<table border="1" cellspacing="0" cellpadding="4" width="100%">{"".join(rows)}</table>'
+
+
+def _grid_column(row, cell):
+    """单元格在表格网格中的起始列"""
+    column = 0
+    for other in row.iterchildren(_W + 'tc'):
+        if other is cell:
+            return column
+        span = _val(other.find(_W + 'tcPr'), 'gridSpan')
+        column += int(span) if span and span.isdigit() else 1
+    return column
+
+
+def _row_span(row, cell):
+    """纵向合并起始单元格跨越的行数"""
+    column = _grid_column(row, cell)
+    span = 1
+    for next_row in row.itersiblings(_W + 'tr'):
+        for other in next_row.iterchildren(_W + 'tc'):
+            if _grid_column(next_row, other) == column:
+                merge = _val(other.find(_W + 'tcPr'), 'vMerge')
+                if merge is None or merge == 'restart':
+                    return span
+                span += 1
+                break
+        else:
+            return span
+    return span
+
+
+def docx_to_html(source):
+    """docx（路径、文件对象或字节）-> (HTML, 文中 {…} 内容列表)"""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+
+    body_tag = _W + 'body'
+    parts = []
+    placeholders = {}
+    with zipfile.ZipFile(source) as archive:
+        with archive.open('word/document.xml') as document:
+            for _, elem in etree.iterparse(document, events=('end',), tag=(_W + 'p', _W + 'tbl')):
+                parent = elem.getparent()
+                if parent is None or parent.tag != body_tag:
+                    continue  # 表格中的内容随表格一起转换
+                if elem.tag == _W + 'p':
+                    parts.append(_paragraph_html(elem))
+                else:
+                    parts.append(_table_html(elem))
+                # 占位符可能被拆在几个文字块中，按整段文字查找
+                for paragraph in elem.iter(_W + 'p'):
+                    text = ''.join(t.text or '' for t in paragraph.iter(_W + 't'))
+                    placeholders.update(dict.fromkeys(PLACEHOLDER_PATTERN.findall(text)))
+                # 转换过的元素及其前面的兄弟元素不再需要
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del parent[0]
+
+    return f"<html><body>{''.join(parts)}</body></html>", list(placeholders)
+
+
+class PreviewCache:
+    """预览缓存：文件路径 -> 内容哈希（按修改时间、大小），内容哈希 -> 转换结果"""
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._hashes = {}            # 路径 -> (修改时间, 大小, sha256)
+        self._pages = OrderedDict()  # sha256 -> (HTML, {…} 内容列表)
+
+    def get(self, filepath):
+        """返回 (HTML, 文中 {…} 内容列表)，文件不存在时抛出 FileNotFoundError"""
+        stat = os.stat(filepath)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        cached = self._hashes.get(filepath)
+        if cached is not None and cached[:2] == stamp and cached[2] in self._pages:
+            self._pages.move_to_end(cached[2])
+            return self._pages[cached[2]]
+
+        with open(filepath, 'rb') as f:
+            content = f.read()
+        digest = sha256_bytes(content)
+        self._hashes[filepath] = stamp + (digest,)
+
+        page = self._pages.get(digest)
+        if page is None:
+            page = docx_to_html(content)
+            self._pages[digest] = page
+            while len(self._pages) > self.maxsize:
+                self._pages.popitem(last=False)
+        self._pages.move_to_end(digest)
+        return page
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+docx 快速写出 - 由模板生成的文档只重写正文部件，其余部件原样复制
+
+python-docx 保存时会把样式、编号、主题、字体、图片等全部部件重新序列化并重新压缩，
+而生成文书时只有 word/document.xml 有变化。这里直接从模板 zip 中按压缩后的
+原始字节复制其他部件（不解压、不重新压缩），只压缩写出新的正文。
+文档新增了部件或关系（如插入图片）时回退为 python-docx 保存。
+"""
+
+import io
+import re
+import copy
+import struct
+import zipfile
+
+from docx.opc.oxml import serialize_part_xml
+
+
+_LOCAL_HEADER = struct.Struct('<4s2B4HL2L2H')
+_LOCAL_SIGNATURE = b'PK\x03\x04'
+_DATA_DESCRIPTOR_FLAG = 0x08
+
+_RELATIONSHIP_ID = re.compile(rb'\bId="([^"]+)"')
+
+
+def copy_member_raw(source, info, output):
+    """把 source 中的一个部件按压缩后的原始字节复制到 output"""
+    fp = source.fp
+    fp.seek(info.header_offset)
+    header = fp.read(_LOCAL_HEADER.size)
+    fields = _LOCAL_HEADER.unpack(header)
+    if fields[0] != _LOCAL_SIGNATURE:
+        raise zipfile.BadZipFile(f"部件头损坏: {info.filename}")
+    name_length, extra_length = fields[-2], fields[-1]
+    fp.seek(info.header_offset + _LOCAL_HEADER.size + name_length + extra_length)
+    raw = fp.read(info.compress_size)
+
+    zinfo = copy.copy(info)
+    # 大小和校验值直接写在部件头里，不再需要数据描述符
+    zinfo.flag_bits &= ~_DATA_DESCRIPTOR_FLAG
+    zinfo.header_offset = output.fp.tell()
+    output.fp.write(zinfo.FileHeader())
+    output.fp.write(raw)
+
+    output.filelist.append(zinfo)
+    output.NameToInfo[zinfo.filename] = zinfo
+    output.start_dir = output.fp.tell()
+    output._didModify = True
+
+
+def _relationship_ids(source, partname):
+    folder, _, filename = partname.rpartition('/')
+    rels_name = f"{folder}/_rels/{filename}.rels" if folder else f"_rels/{filename}.rels"
+    try:
+        return {rid.decode('utf-8') for rid in _RELATIONSHIP_ID.findall(source.read(rels_name))}
+    except KeyError:
+        return set()
+
+
+def can_copy_parts(doc, source):
+    """文档的部件和正文关系与模板一致时才能只重写正文"""
+    names = set(source.namelist())
+    for part in doc.part.package.iter_parts():
+        if part.partname.lstrip('/') not in names:
+            return False
+    return set(doc.part.rels) == _relationship_ids(source, doc.part.partname.lstrip('/'))
+
+
+def write_docx(doc, template_bytes, f):
+    """把由 template_bytes 打开并修改过的文档写入文件对象 f"""
+    document_part = doc.part.partname.lstrip('/')
+
+    with zipfile.ZipFile(io.BytesIO(template_bytes)) as source:
+        if not can_copy_parts(doc, source):
+            doc.save(f)
+            return
+
+        with zipfile.ZipFile(f, 'w') as output:
+            for info in source.infolist():
+                if info.filename == document_part:
+                    zinfo = zipfile.ZipInfo(info.filename, info.date_time)
+                    zinfo.compress_type = zipfile.ZIP_DEFLATED
+                    output.writestr(zinfo, serialize_part_xml(doc.part.element))
+                else:
+                    copy_member_raw(source, info, output)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件系统元数据缓存 - 缓存年份文件夹、案件文件夹的目录列表
+
+- 一次 scandir 得到目录下全部名称和是否为目录，exists / isdir 由上级目录的列表判断，不再逐个 stat
+- 有监视器（QFileSystemWatcher）时，目录变化即失效，另有较长的兜底有效期；
+  没有监视器或目录无法监视时按较短的有效期重新读取
+- 本程序自己新建的文件和文件夹用 added() 直接记入缓存，不必重新列目录
+- 只缓存最近用过的若干个目录（同时也是监视的目录），避免监视句柄过多
+"""
+
+import os
+import time
+from collections import OrderedDict
+
+
+class FsCache:
+    """目录列表缓存（只在界面线程中使用）"""
+
+    def __init__(self, ttl=2.0, watched_ttl=60.0, maxsize=64, watcher=None):
+        self.ttl = ttl                   # 没有监视器时的有效期（秒）
+        self.watched_ttl = watched_ttl   # 有监视器时的兜底有效期（网络共享上的通知可能丢失）
+        self.maxsize = maxsize
+        self.watcher = watcher
+        self._listings = OrderedDict()   # 目录 -> (读取时间, {规范化名称: (名称, 是否目录)} 或 None, 是否监视中)
+        self._mtimes = {}                # 路径 -> (读取时间, 修改时间, 所在目录是否监视中)
+        if watcher is not None:
+            watcher.directoryChanged.connect(self.invalidate)
+
+    def _key(self, path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def _fresh(self, read_at, watched=False):
+        return time.monotonic() - read_at < (self.watched_ttl if watched else self.ttl)
+
+    def _listing(self, dirpath):
+        """目录列表，目录不存在时为None"""
+        key = self._key(dirpath)
+        cached = self._listings.get(key)
+        if cached is not None and self._fresh(cached[0], cached[2]):
+            self._listings.move_to_end(key)
+            return cached[1]
+
+        read_at = time.monotonic()
+        try:
+            with os.scandir(dirpath) as entries:
+                names = {os.path.normcase(entry.name): (entry.name, entry.is_dir()) for entry in entries}
+        except (FileNotFoundError, NotADirectoryError):
+            names = None
+
+        watched = cached is not None and cached[2] and names is not None
+        if self.watcher is not None and names is not None and not watched:
+            watched = self.watcher.addPath(key)  # 通知中的路径与缓存的键一致
+        self._listings[key] = (read_at, names, watched)
+        self._listings.move_to_end(key)
+        while len(self._listings) > self.maxsize:
+            old_key, (_, _, old_watched) = self._listings.popitem(last=False)
+            self._drop_mtimes(old_key)
+            if old_watched:
+                self.watcher.removePath(old_key)
+        return names
+
+    def _lookup(self, path):
+        """(名称, 是否目录)，不存在时为None"""
+        parent, name = os.path.split(os.path.abspath(path))
+        if not name:
+            return (path, True) if os.path.isdir(path) else None
+        names = self._listing(parent)
+        return names.get(os.path.normcase(name)) if names else None
+
+    # ---------- 查询 ----------
+
+    def listdir(self, dirpath):
+        """目录下的名称（排序），目录不存在时为空列表"""
+        names = self._listing(dirpath)
+        return sorted(name for name, _ in names.values()) if names else []
+
+    def exists(self, path):
+        return self._lookup(path) is not None
+
+    def isdir(self, path):
+        entry = self._lookup(path)
+        return entry is not None and entry[1]
+
+    def mtime(self, path):
+        """修改时间，与所在目录的列表一起失效；不存在时为None"""
+        if not self.exists(path):
+            return None
+        key = self._key(path)
+        cached = self._mtimes.get(key)
+        if cached is not None and self._fresh(cached[0], cached[2]):
+            return cached[1]
+        read_at = time.monotonic()
+        try:
+            value = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return None
+        parent = self._listings.get(self._key(os.path.dirname(os.path.abspath(path))))
+        self._mtimes[key] = (read_at, value, bool(parent and parent[2]))
+        return value
+
+    # ---------- 修改 ----------
+
+    def makedirs(self, dirpath):
+        """确保文件夹存在：缓存中已有时不访问磁盘"""
+        if self.isdir(dirpath):
+            return
+        os.makedirs(dirpath, exist_ok=True)
+        # 记入上级目录的列表；上级目录原先也不存在时改为过期，逐级向上
+        # （新建的文件夹本身不记为空：可能是别处刚建的）
+        path = os.path.abspath(dirpath)
+        while True:
+            parent, name = os.path.split(path)
+            cached = self._listings.get(self._key(parent))
+            if not name or cached is None:
+                break
+            if cached[1] is not None:
+                self.added(path, is_dir=True)
+                break
+            self.invalidate(parent)
+            path = parent
+
+    def added(self, path, is_dir=False):
+        """本程序新建了文件或文件夹：上级目录的列表在缓存中时直接记入"""
+        parent, name = os.path.split(os.path.abspath(path))
+        cached = self._listings.get(self._key(parent))
+        if cached is not None and cached[1] is not None and self._fresh(cached[0], cached[2]):
+            cached[1][os.path.normcase(name)] = (name, is_dir)
+        self._mtimes.pop(self._key(path), None)
+
+    def invalidate(self, path=None):
+        """目录内容有变化（监视器通知或外部修改）：下次重新读取；不指定时全部失效"""
+        if path is None:
+            if self.watcher is not None and self.watcher.directories():
+                self.watcher.removePaths(self.watcher.directories())
+            self._listings.clear()
+            self._mtimes.clear()
+            return
+        key = self._key(path)
+        cached = self._listings.get(key)
+        if cached is not None:
+            self._listings[key] = (float('-inf'),) + cached[1:]  # 保留位置和监视，只标记过期
+        self._drop_mtimes(key)
+
+    def _drop_mtimes(self, dir_key):
+        for key in [key for key in self._mtimes if os.path.dirname(key) == dir_key]:
+            del self._mtimes[key]
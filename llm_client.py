@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI起草 - 调用配置的大模型接口（OpenAI兼容的 chat/completions）起草笔录答复
+
+- asyncio 调度，HTTP 连接池复用长连接，多个请求并发发送
+- 按模型和提示词缓存（内存LRU + 磁盘），相同请求不重复调用
+- 未配置接口地址时 is_configured() 为 False，调用方应跳过
+"""
+
+import os
+import json
+import asyncio
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+from memo_cache import MemoCache, make_key
+
+
+SYSTEM_PROMPT = "你是工伤认定调查笔录的记录员，请根据提供的资料，用被调查人第一人称、简洁平实的口语起草答复，不要编造资料中没有的事实。"
+
+# 起草类型 -> 问题
+DRAFT_QUESTIONS = {
+    '自我介绍': "请介绍一下你的姓名、住址、工作单位以及从事的工作？",
+    '受伤经过': "你是在什么时间、什么地点、因什么工作原因受的伤？请详细的描述一下事故发生的具体经过。",
+}
+
+# 作为参考的历史笔录最多截取的字数
+MAX_TRANSCRIPT_CHARS = 3000
+
+
+class DraftError(Exception):
+    """起草接口调用失败"""
+
+
+def build_prompt(kind, data, previous_transcripts=()):
+    """根据表单数据和已有笔录生成提示词"""
+    person_type = data.get('人员类型', '本人')
+
+    lines = [f"被调查人身份：{person_type}"]
+    for key in ('受伤职工', '用人单位', '用工单位', '工作场所', '条例', '案件类型'):
+        if data.get(key):
+            lines.append(f"{key}：{data[key]}")
+    for suffix in ('姓名', '性别', '年龄', '身份证地址', '现住址', '岗位'):
+        value = data.get(f'{person_type}{suffix}')
+        if value:
+            lines.append(f"{suffix}：{value}")
+
+    remaining = MAX_TRANSCRIPT_CHARS
+    for text in previous_transcripts:
+        if remaining <= 0:
+            break
+        excerpt = text[:remaining]
+        remaining -= len(excerpt)
+        lines.append(f"已有笔录摘录：\n{excerpt}")
+
+    lines.append(f"问：{DRAFT_QUESTIONS[kind]}")
+    lines.append("请只输出“答：”后面的内容。")
+    return "\n".join(lines)
+
+
+def load_case_transcripts(case_folder):
+    """读取案件文件夹中已有笔录的文字，作为起草参考"""
+    from docx import Document
+
+    texts = []
+    if not case_folder or not os.path.isdir(case_folder):
+        return texts
+
+    for filename in sorted(os.listdir(case_folder)):
+        # 本人笔录为 案本号_笔录.docx，证人/法人笔录为 姓名_证人01_姓名.docx
+        is_transcript = any(word in filename for word in ('笔录', '_证人', '_法人'))
+        if filename.endswith('.docx') and is_transcript and not filename.startswith('~$'):
+            try:
+                doc = Document(os.path.join(case_folder, filename))
+                texts.append("\n".join(p.text for p in doc.paragraphs if p.text.strip()))
+            except Exception as e:
+                print(f"读取笔录失败 {filename}: {e}")
+    return texts
+
+
+def prompt_key(model, prompt):
+    """起草结果的缓存键"""
+    return make_key('draft', model, SYSTEM_PROMPT, prompt)
+
+
+_response_caches = {}
+_response_caches_lock = threading.Lock()
+
+
+def response_cache(cache_dir):
+    """同一缓存目录共用一个缓存，客户端重建后内存中的结果仍然有效"""
+    with _response_caches_lock:
+        cache = _response_caches.get(cache_dir)
+        if cache is None:
+            cache = _response_caches[cache_dir] = MemoCache(maxsize=256, cache_dir=cache_dir)
+        return cache
+
+
+class ConnectionPool:
+    """HTTP 长连接池 - 连接在请求之间复用"""
+
+    def __init__(self, url, size=4, timeout=60):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise DraftError(f"不支持的接口地址: {url}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or '/'
+        if parts.query:
+            self.path += '?' + parts.query
+        self.size = size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._idle = []
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def release(self, conn):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+def completion_url(api_url):
+    """接口地址可以是完整的 chat/completions 地址，也可以只写到 /v1"""
+    api_url = api_url.strip().rstrip('/')
+    if api_url.endswith('/chat/completions'):
+        return api_url
+    return api_url + '/chat/completions'
+
+
+class DraftClient:
+    """起草客户端"""
+
+    def __init__(self, api_url, api_key="", cache_dir=None, model="",
+                 max_connections=4, timeout=60):
+        self.api_url = (api_url or "").strip()
+        self.api_key = (api_key or "").strip()
+        self.model = (model or "").strip()  # 未配置时不在请求中指定，由接口使用其默认模型
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.cache = response_cache(cache_dir)
+
+    def is_configured(self):
+        """是否配置了接口地址"""
+        return bool(self.api_url)
+
+    def _post(self, pool, body):
+        """在线程池中执行的阻塞请求，连接出错时换新连接重试一次"""
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = f"Bearer {self.api_key}"
+
+        for attempt in range(2):
+            conn = pool.acquire()
+            try:
+                conn.request('POST', pool.path, body=payload, headers=headers)
+                response = conn.getresponse()
+                content = response.read()
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                if attempt == 0:
+                    continue
+                raise DraftError(f"接口连接失败: {e}")
+
+            if response.getheader('Connection', '').lower() == 'close':
+                conn.close()
+            else:
+                pool.release(conn)
+
+            if response.status != 200:
+                raise DraftError(f"接口返回错误 {response.status}: {content[:200].decode('utf-8', 'replace')}")
+            try:
+                return json.loads(content.decode('utf-8'))
+            except ValueError:
+                raise DraftError("接口返回的不是JSON")
+
+    async def _complete(self, pool, semaphore, prompt):
+        key = prompt_key(self.model, prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        body = {
+            'messages': [
+                {'role': 'system', 'content': SYSTEM_PROMPT},
+                {'role': 'user', 'content': prompt},
+            ],
+            'temperature': 0.3,
+        }
+        if self.model:
+            body['model'] = self.model
+
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(None, self._post, pool, body)
+
+        try:
+            answer = result['choices'][0]['message']['content'].strip()
+        except (KeyError, IndexError, TypeError):
+            raise DraftError("接口返回格式不正确")
+
+        if answer.startswith('答：'):
+            answer = answer[2:].strip()
+
+        self.cache.set(key, answer)
+        return answer
+
+    async def draft_many_async(self, prompts):
+        """并发起草多个提示词，返回与输入顺序一致的结果，失败项为 DraftError"""
+        if not self.is_configured():
+            raise DraftError("未配置API地址")
+
+        # 同一批中相同的提示词只请求一次
+        unique_prompts = list(dict.fromkeys(prompts))
+
+        pool = ConnectionPool(completion_url(self.api_url), self.max_connections, self.timeout)
+        semaphore = asyncio.Semaphore(self.max_connections)
+        try:
+            results = await asyncio.gather(
+                *(self._complete(pool, semaphore, prompt) for prompt in unique_prompts),
+                return_exceptions=True
+            )
+        finally:
+            pool.close()
+
+        by_prompt = dict(zip(unique_prompts, results))
+        return [by_prompt[prompt] for prompt in prompts]
+
+    def draft_many(self, prompts):
+        """同步入口：在当前线程运行事件循环（应在后台线程调用）"""
+        return asyncio.run(self.draft_many_async(list(prompts)))
@@ -8,16 +8,80 @@ import sys
 from datetime import datetime
 from PyQt5.QtWidgets import QApplication, QMainWindow, QMessageBox
 from PyQt5.uic import loadUi
-from PyQt5.QtCore import QSettings, Qt
-from openpyxl import load_workbook
+from PyQt5.QtCore import QSettings, Qt, QThread, pyqtSignal, QFileSystemWatcher
+from openpyxl import Workbook, load_workbook
+from atomic_io import atomic_save, check_integrity
 from config_manager import ConfigManager
+from fs_cache import FsCache
+from docx_preview import PreviewCache
+from case_index import CaseIndex, case_id_card
+from case_intake import case_number_prefix
+from case_records import CaseRecord, InjuredPerson, PersonRecord, person_from_form
+from render_tracker import create_tracked_renderer
+from case_reports import ReportEngine
+from org_index import OrgIndex, ROLE_TITLES
+from transcript_content import (build_description, build_case_questions, insert_description, add_questions,
+                                regulation_name)
+
+
+class DraftWorker(QThread):
+    """后台线程执行AI起草，避免阻塞界面"""
+
+    # [(标签, 起草类型, 结果文字或错误信息, 是否成功)]
+    drafted = pyqtSignal(list)
+
+    def __init__(self, client, jobs, case_folder, parent=None):
+        super().__init__(parent)
+        self.client = client
+        self.jobs = jobs  # [(标签, 起草类型, 表单数据)]
+        self.case_folder = case_folder
+
+    def run(self):
+        from llm_client import build_prompt, load_case_transcripts
+
+        try:
+            transcripts = load_case_transcripts(self.case_folder)
+            prompts = [build_prompt(kind, data, transcripts) for _, kind, data in self.jobs]
+            results = self.client.draft_many(prompts)
+        except Exception as e:
+            results = [e] * len(self.jobs)
+
+        output = []
+        for (label, kind, _), result in zip(self.jobs, results):
+            if isinstance(result, Exception):
+                output.append((label, kind, str(result), False))
+            else:
+                output.append((label, kind, result, True))
+        self.drafted.emit(output)
+
+
+class SyncWorker(QThread):
+    """后台线程与共享目录同步一次"""
+
+    synced = pyqtSignal(dict)
+
+    def __init__(self, engine, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+
+    def run(self):
+        try:
+            result = self.engine.sync()
+        except Exception as e:
+            result = {'errors': {self.engine.remote_root: str(e)}}
+        self.synced.emit(result)
 
 
 class MainWindow(QMainWindow):
 
-    def __init__(self):
+    def __init__(self, base_dir=None, sync_engine=None):
         super().__init__()
 
+        # 数据目录：共享目录，或启用本地副本时的本地目录
+        self.base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+        # 年份、案件文件夹的列表缓存，文件夹变化时由监视器通知失效
+        self.fs = FsCache(watcher=QFileSystemWatcher(self))
+
         # 1. 加载界面
         loadUi("main_window.ui", self)
         self.setWindowTitle("工伤案件管理系统")
@@ -25,6 +89,24 @@ class MainWindow(QMainWindow):
         # 2. 初始化配置管理器
         self.config = ConfigManager()
 
+        # 2.1 案件索引和文书渲染器（共用模板缓存）
+        self.case_index = CaseIndex(self.base_dir)
+        self.renderer = create_tracked_renderer(self.base_dir)
+        self.reports = ReportEngine(self.case_index, os.path.join(self.base_dir, "report_cache.json"))
+        self.name_sets = {}  # ComboBox名 -> NameSet
+        self.org_index = OrgIndex(self.case_index, os.path.join(self.base_dir, "org_index_cache.json"))
+        # 文书预览（按文件内容哈希缓存），不必每次启动Word
+        self.preview_cache = PreviewCache()
+        self.preview_dialog = None
+
+        # 2.2 本地副本与共享目录的后台同步
+        self.sync_engine = sync_engine
+        self.sync_worker = None
+        self.setup_sync()
+
+        # 2.3 托盘图标（关闭窗口时驻留）
+        self.setup_tray()
+
         # 3. 加载Excel数据到ComboBox
         self.load_excel_to_combobox()
 
@@ -43,6 +125,7 @@ class MainWindow(QMainWindow):
         # 5. 连接信号
         self.checkBox_remember.stateChanged.connect(self.on_remember_changed)
         self.btn_generate_record.clicked.connect(self.on_generate_record)
+        self.btn_batch_entry.clicked.connect(self.show_batch_entry_dialog)
         # 身份证号框失去焦点
         self.lineEdit_id_card.editingFinished.connect(self.auto_calculate_id_info)
 
@@ -60,6 +143,179 @@ class MainWindow(QMainWindow):
         self.current_case_number = None  # 当前使用的案本号
         self.current_folder_path = None  # 当前使用的文件夹路径
 
+    def setup_tray(self):
+        """托盘图标：关闭窗口时只隐藏，再次启动程序即可立即显示；从托盘菜单退出"""
+        from PyQt5.QtWidgets import QSystemTrayIcon, QMenu, QStyle
+
+        self.tray = None
+        self.quitting = False
+        self.tray_hint_shown = False
+        if not self.config.load_resident() or not QSystemTrayIcon.isSystemTrayAvailable():
+            return
+
+        self.tray = QSystemTrayIcon(self.style().standardIcon(QStyle.SP_ComputerIcon), self)
+        self.tray.setToolTip("工伤案件管理系统")
+        menu = QMenu(self)
+        menu.addAction("显示主窗口", self.show_from_tray)
+        menu.addAction("退出", self.quit_app)
+        self.tray.setContextMenu(menu)
+        self.tray.activated.connect(self.on_tray_activated)
+        self.tray.show()
+
+        app = QApplication.instance()
+        app.setQuitOnLastWindowClosed(False)
+        # 注销或关机时不能只隐藏窗口
+        app.commitDataRequest.connect(lambda manager: setattr(self, 'quitting', True))
+
+    def on_tray_activated(self, reason):
+        from PyQt5.QtWidgets import QSystemTrayIcon
+        if reason in (QSystemTrayIcon.Trigger, QSystemTrayIcon.DoubleClick):
+            self.show_from_tray()
+
+    def show_from_tray(self):
+        """显示并激活主窗口"""
+        self.showNormal()
+        self.raise_()
+        self.activateWindow()
+
+    def quit_app(self):
+        """真正退出（托盘菜单）"""
+        self.quitting = True
+        self.close()
+        QApplication.instance().quit()
+
+    def handle_launch_args(self, args):
+        """处理启动参数（本次启动的，或再次启动时交来的）
+        --minimized 只驻留托盘，其余参数为要关联的案本号
+        """
+        case_numbers = [arg for arg in args if not arg.startswith('--')]
+        if '--minimized' not in args or case_numbers or self.tray is None:
+            self.show_from_tray()
+        for case_number in case_numbers:
+            self.open_case(case_number)
+
+    def setup_sync(self):
+        """启用本地副本时定时在后台同步"""
+        if self.sync_engine is None:
+            return
+        from PyQt5.QtCore import QTimer
+
+        self.sync_engine.local_index = self.case_index
+        interval = self.config.load_sync_config()['interval']
+        self.sync_timer = QTimer(self)
+        self.sync_timer.timeout.connect(self.start_sync)
+        self.sync_timer.start(max(1, interval) * 60 * 1000)
+        self.start_sync()
+
+    def start_sync(self):
+        """开始一次后台同步（上一次还没结束时跳过）"""
+        if self.sync_worker is not None and self.sync_worker.isRunning():
+            return
+        self.sync_worker = SyncWorker(self.sync_engine, self)
+        self.sync_worker.synced.connect(self.on_synced)
+        self.sync_worker.start()
+
+    def on_synced(self, result):
+        """同步完成：冲突和错误显示在状态栏，详情见 .sync/conflicts.log"""
+        for path, error in result.get('errors', {}).items():
+            print(f"同步失败 {path}: {error}")
+        conflicts = result.get('conflicts', [])
+        if conflicts:
+            self.statusBar().showMessage(f"同步完成，有 {len(conflicts)} 处冲突，详见 .sync/conflicts.log", 5000)
+        elif result.get('errors'):
+            self.statusBar().showMessage("同步未完成，稍后重试", 3000)
+        elif result.get('pulled') or result.get('pushed') or result.get('merged'):
+            self.statusBar().showMessage(
+                f"已同步：下载 {len(result['pulled'])}，上传 {len(result['pushed'])}，合并 {len(result['merged'])}", 3000)
+
+    def open_external(self, path):
+        """用系统默认程序打开文件或文件夹（Word、资源管理器等）"""
+        if hasattr(os, 'startfile'):
+            os.startfile(path)
+            return
+        from PyQt5.QtCore import QUrl
+        from PyQt5.QtGui import QDesktopServices
+        if not QDesktopServices.openUrl(QUrl.fromLocalFile(path)):
+            self.statusBar().showMessage(f"无法打开: {path}", 3000)
+
+    def preview_document(self, filepath, on_external=None):
+        """在程序内预览文书（只读），需要修改时再点“在外部编辑器中打开”
+        on_external: 在外部编辑器中打开后调用，如关闭Word后提取笔录信息
+        """
+        try:
+            page, leftovers = self.preview_cache.get(filepath)
+        except Exception as e:
+            print(f"预览失败: {e}")
+            self.statusBar().showMessage(f"预览失败: {e}", 3000)
+            return
+
+        dialog = self.preview_dialog or self.create_preview_dialog()
+        dialog.filepath = filepath
+        dialog.on_external = on_external
+        dialog.setWindowTitle(f"预览 - {os.path.basename(filepath)}")
+        dialog.browser.setHtml(page)
+        if leftovers:
+            dialog.label_leftovers.setText("文中仍有花括号内容（可能是未填写的占位符）：" + "、".join(leftovers))
+        else:
+            dialog.label_leftovers.setText("占位符均已填写")
+        dialog.btn_external.setText("在Word中修改" if on_external else "在外部编辑器中打开")
+        dialog.show()
+        dialog.raise_()
+        dialog.activateWindow()
+
+    def create_preview_dialog(self):
+        """预览窗口（非模态，各次预览共用）"""
+        from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QTextBrowser
+
+        dialog = QDialog(self)
+        dialog.resize(800, 900)
+        layout = QVBoxLayout()
+
+        dialog.label_leftovers = QLabel()
+        dialog.label_leftovers.setWordWrap(True)
+        layout.addWidget(dialog.label_leftovers)
+
+        dialog.browser = QTextBrowser()
+        dialog.browser.setOpenLinks(False)
+        layout.addWidget(dialog.browser)
+
+        def find():
+            from PyQt5.QtGui import QTextCursor
+            text = line_find.text()
+            if text and not dialog.browser.find(text):
+                # 到末尾后从头查找
+                dialog.browser.moveCursor(QTextCursor.Start)
+                dialog.browser.find(text)
+
+        def open_external():
+            self.open_external(dialog.filepath)
+            callback, dialog.on_external = dialog.on_external, None
+            dialog.btn_external.setText("在外部编辑器中打开")
+            if callback:
+                callback()
+
+        btn_layout = QHBoxLayout()
+        line_find = QLineEdit()
+        line_find.setPlaceholderText("查找（回车查找下一个）")
+        line_find.setClearButtonEnabled(True)
+        line_find.returnPressed.connect(find)
+        dialog.btn_external = QPushButton("在外部编辑器中打开")
+        btn_folder = QPushButton("打开所在文件夹")
+        btn_close = QPushButton("关闭")
+        dialog.btn_external.clicked.connect(open_external)
+        btn_folder.clicked.connect(lambda: self.open_external(os.path.dirname(dialog.filepath)))
+        btn_close.clicked.connect(dialog.close)
+        btn_layout.addWidget(line_find)
+        btn_layout.addStretch()
+        btn_layout.addWidget(dialog.btn_external)
+        btn_layout.addWidget(btn_folder)
+        btn_layout.addWidget(btn_close)
+        layout.addLayout(btn_layout)
+
+        dialog.setLayout(layout)
+        self.preview_dialog = dialog
+        return dialog
+
     def setup_document_buttons(self):
         """连接各类文书生成按钮"""
         # 案件审批表
@@ -74,122 +330,424 @@ class MainWindow(QMainWindow):
         # 案审会材料
         self.btn_review_materials.clicked.connect(self.generate_review_materials)
 
+        # 本案全部文书
+        self.btn_all_documents.clicked.connect(self.generate_all_documents)
+
+        # 重新生成过期文书
+        self.btn_regenerate_stale.clicked.connect(self.regenerate_stale_documents)
+
+        # AI起草
+        self.btn_ai_draft.clicked.connect(self.on_ai_draft)
+
+        # 统计报表
+        self.btn_reports.clicked.connect(self.show_reports_dialog)
+
+        # 案件浏览
+        self.btn_case_browser.clicked.connect(self.show_case_browser)
+
     def generate_case_approval(self):
         """生成案件审批表"""
-        if not self.current_case_number:
-            QMessageBox.warning(self, "错误", "请先生成本人案本或关联已有案本")
+        self.generate_case_document("案件审批表")
+
+    def generate_injury_notice(self):
+        """生成工伤告知书"""
+        self.generate_case_document("工伤告知书")
+
+    def generate_interview_notice(self):
+        """生成谈话通知书"""
+        self.generate_case_document("谈话通知书")
+
+    def generate_review_materials(self):
+        """生成案审会材料（当前案本，或多个案件合订成一份）"""
+        options = self.show_review_bundle_dialog()
+        if not options:
             return
 
-        try:
-            import json
-            from docx import Document
-            from datetime import datetime
-
-            # 读取索引文件
-            index_file = os.path.join(os.path.dirname(__file__), "cases_index.json")
-            with open(index_file, 'r', encoding='utf-8') as f:
-                index_data = json.load(f)
-
-            # 查找当前案本
-            case_data = None
-            for case in index_data.get('cases', []):
-                if case['case_number'] == self.current_case_number:
-                    case_data = case
-                    break
+        if options['mode'] == "current":
+            self.generate_case_document("案审会材料")
+            return
 
-            if not case_data:
-                QMessageBox.warning(self, "错误", f"未找到案本 {self.current_case_number} 的数据")
+        from PyQt5.QtWidgets import QFileDialog, QProgressDialog
+        from review_bundle import select_cases, write_bundle, convert_to_pdf
+
+        try:
+            cases = select_cases(
+                self.case_index,
+                start_date=options.get('start_date'),
+                end_date=options.get('end_date'),
+                case_numbers=options.get('case_numbers'),
+            )
+            if not cases:
+                QMessageBox.information(self, "提示", "没有符合条件的案件")
                 return
 
-            # 获取模板
-            template_path = os.path.join(os.path.dirname(__file__), "templates", "工伤案件审批表（模板）.docx")
-            if not os.path.exists(template_path):
-                QMessageBox.warning(self, "错误", "模板不存在")
+            default_name = f"案审会材料合订_{datetime.now().strftime('%Y%m%d')}.docx"
+            output_path, _ = QFileDialog.getSaveFileName(
+                self, "保存合订材料", os.path.join(self.base_dir, default_name),
+                "Word 文档 (*.docx)"
+            )
+            if not output_path:
                 return
 
-            doc = Document(template_path)
-            person_info = case_data.get('person_info', {})
-
-            # 替换数据
-            replace_data = {
-                '{案本号}': case_data.get('case_number', ''),
-                '{受伤职工}': case_data.get('person_name', ''),
-                '{性别}': person_info.get('gender', ''),
-                '{年龄}': person_info.get('age', ''),
-                '{身份证号}': person_info.get('id_card', ''),
-                '{身份证地址}': person_info.get('address', ''),
-                '{现住址}': person_info.get('current_address', ''),
-                '{联系电话}': person_info.get('phone', ''),
-                '{岗位}': person_info.get('position', ''),
-                '{自我介绍}': person_info.get('自我介绍', ''),
-                '{受伤经过}': person_info.get('受伤经过', ''),
-                '{就医情况}': person_info.get('就医情况', ''),
-                '{医疗结论}': person_info.get('医疗结论', ''),
-                '{用人单位}': case_data.get('employer', ''),
-                '{用工单位}': case_data.get('work_unit', ''),
-                '{工作场所}': case_data.get('workplace', ''),
-                '{条例}': case_data.get('regulation', ''),
-                '{案件类型}': case_data.get('case_type', ''),
-                '{操作员}': case_data.get('operator', ''),
-                '{当前日期}': datetime.now().strftime('%Y年%m月%d日'),
-            }
+            progress_dialog = QProgressDialog("正在生成案审会材料...", None, 0, len(cases), self)
+            progress_dialog.setWindowModality(Qt.WindowModal)
+            progress_dialog.setMinimumDuration(0)
 
-            # 替换所有占位符
-            for paragraph in doc.paragraphs:
-                for key, value in replace_data.items():
-                    if key in paragraph.text:
-                        paragraph.text = paragraph.text.replace(key, value)
-
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        for paragraph in cell.paragraphs:
-                            for key, value in replace_data.items():
-                                if key in paragraph.text:
-                                    paragraph.text = paragraph.text.replace(key, value)
-
-            # 保存并打开
-            case_folder = os.path.join(os.path.dirname(__file__), case_data.get('folder_path', ''))
-            filename = f"{self.current_case_number}_案件审批表.docx"
-            filepath = os.path.join(case_folder, filename)
+            def on_progress(done, total):
+                progress_dialog.setValue(done)
+                QApplication.processEvents()
 
-            doc.save(filepath)
-            os.startfile(filepath)
+            count = write_bundle(self.renderer, cases, output_path, progress=on_progress)
+            progress_dialog.close()
+
+            message = f"已合订 {count} 个案件: {os.path.basename(output_path)}"
+            if options.get('pdf'):
+                pdf_path = convert_to_pdf(output_path)
+                if pdf_path:
+                    message += f"，PDF: {os.path.basename(pdf_path)}"
+                else:
+                    message += "，未找到LibreOffice，未导出PDF"
 
-            self.statusBar().showMessage(f"已生成案件审批表: {filename}", 3000)
+            self.preview_document(output_path)
+            self.statusBar().showMessage(message, 5000)
 
+        except FileNotFoundError as e:
+            QMessageBox.warning(self, "错误", str(e))
         except Exception as e:
             QMessageBox.critical(self, "错误", f"生成失败: {str(e)}")
 
-    def generate_injury_notice(self):
-        """生成工伤告知书"""
-        if not self.current_case_number:
-            QMessageBox.warning(self, "错误", "请先生成本人案本或关联已有案本")
-            return
+    def show_review_bundle_dialog(self):
+        """案审会材料选项对话框
+        返回: dict {mode, start_date, end_date, case_numbers, pdf}，取消返回None
+        """
+        from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QRadioButton,
+                                     QDateEdit, QPlainTextEdit, QCheckBox, QPushButton)
+        from PyQt5.QtCore import QDate
 
-        # TODO: 实现工伤告知书生成逻辑
-        print("生成工伤告知书")
-        self.statusBar().showMessage("生成工伤告知书功能开发中", 2000)
+        dialog = QDialog(self)
+        dialog.setWindowTitle("案审会材料")
+        dialog.resize(420, 380)
 
-    def generate_interview_notice(self):
-        """生成谈话通知书"""
-        if not self.current_case_number:
-            QMessageBox.warning(self, "错误", "请先生成本人案本或关联已有案本")
-            return
+        layout = QVBoxLayout()
 
-        # TODO: 实现谈话通知书生成逻辑
-        print("生成谈话通知书")
-        self.statusBar().showMessage("生成谈话通知书功能开发中", 2000)
+        radio_current = QRadioButton("当前案本")
+        radio_dates = QRadioButton("按立案日期合订")
+        radio_numbers = QRadioButton("按案本号合订（每行一个）")
+        if self.current_case_number:
+            radio_current.setChecked(True)
+        else:
+            radio_current.setEnabled(False)
+            radio_dates.setChecked(True)
+
+        # 默认本周一到今天
+        today = QDate.currentDate()
+        date_start = QDateEdit(today.addDays(1 - today.dayOfWeek()))
+        date_end = QDateEdit(today)
+        for date_edit in (date_start, date_end):
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat("yyyy-MM-dd")
+
+        date_layout = QHBoxLayout()
+        date_layout.addWidget(date_start)
+        date_layout.addWidget(QLabel("至"))
+        date_layout.addWidget(date_end)
+
+        numbers_edit = QPlainTextEdit()
+        checkbox_pdf = QCheckBox("同时导出PDF")
+
+        layout.addWidget(radio_current)
+        layout.addWidget(radio_dates)
+        layout.addLayout(date_layout)
+        layout.addWidget(radio_numbers)
+        layout.addWidget(numbers_edit)
+        layout.addWidget(checkbox_pdf)
 
-    def generate_review_materials(self):
-        """生成案审会材料"""
+        # 按钮区域
+        btn_layout = QHBoxLayout()
+        btn_ok = QPushButton("确定")
+        btn_cancel = QPushButton("取消")
+        btn_ok.clicked.connect(dialog.accept)
+        btn_cancel.clicked.connect(dialog.reject)
+        btn_layout.addWidget(btn_ok)
+        btn_layout.addWidget(btn_cancel)
+        layout.addLayout(btn_layout)
+
+        dialog.setLayout(layout)
+
+        if dialog.exec_() != QDialog.Accepted:
+            return None
+
+        if radio_current.isChecked():
+            return {'mode': "current"}
+
+        options = {'mode': "bundle", 'pdf': checkbox_pdf.isChecked()}
+        if radio_dates.isChecked():
+            options['start_date'] = date_start.date().toString("yyyy-MM-dd")
+            options['end_date'] = date_end.date().toString("yyyy-MM-dd")
+        else:
+            lines = numbers_edit.toPlainText().splitlines()
+            options['case_numbers'] = [line.strip() for line in lines if line.strip()]
+        return options
+
+    def get_current_case_data(self):
+        """查找当前案本的索引数据，找不到时提示并返回None"""
         if not self.current_case_number:
             QMessageBox.warning(self, "错误", "请先生成本人案本或关联已有案本")
+            return None
+
+        case_data = self.case_index.get(self.current_case_number)
+        if not case_data:
+            QMessageBox.warning(self, "错误", f"未找到案本 {self.current_case_number} 的数据")
+            return None
+
+        return case_data
+
+    def generate_case_document(self, doc_type):
+        """按文书名称生成当前案本的文书"""
+        try:
+            case_data = self.get_current_case_data()
+            if not case_data:
+                return
+
+            filepath = self.renderer.render_case_document(doc_type, case_data)
+            self.preview_document(filepath)
+
+            self.statusBar().showMessage(f"已生成{doc_type}: {os.path.basename(filepath)}", 3000)
+
+        except FileNotFoundError as e:
+            QMessageBox.warning(self, "错误", str(e))
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"生成失败: {str(e)}")
+
+    def generate_all_documents(self):
+        """并行生成当前案本的全部文书"""
+        try:
+            case_data = self.get_current_case_data()
+            if not case_data:
+                return
+
+            generated, errors = self.renderer.render_all(case_data)
+
+            if errors:
+                details = "\n".join(f"{doc_type}: {error}" for doc_type, error in errors.items())
+                QMessageBox.warning(self, "部分文书未生成",
+                                    f"已生成 {len(generated)} 份文书\n\n未生成:\n{details}")
+
+            if generated:
+                self.open_external(os.path.dirname(generated[0]))
+            self.statusBar().showMessage(f"已生成 {len(generated)} 份文书", 3000)
+
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"生成失败: {str(e)}")
+
+    def regenerate_stale_documents(self):
+        """检查并重新生成模板或案件数据已变化的文书"""
+        from render_tracker import regenerate_stale
+
+        try:
+            check = regenerate_stale(self.renderer, self.case_index, dry_run=True)
+            stale = check['stale']
+            if not stale:
+                QMessageBox.information(self, "提示", "所有已生成文书都是最新的")
+                return
+
+            edited = [item for item in stale if item['edited']]
+            lines = [f"{item['path']}: {item['reason']}" for item in stale[:20]]
+            if len(stale) > 20:
+                lines.append(f"... 共 {len(stale)} 份")
+
+            message = f"发现 {len(stale)} 份过期文书:\n\n" + "\n".join(lines)
+            if edited:
+                message += f"\n\n其中 {len(edited)} 份生成后已手工修改，将跳过"
+            message += "\n\n是否重新生成？"
+
+            reply = QMessageBox.question(self, "重新生成过期文书", message,
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+            if reply != QMessageBox.Yes:
+                return
+
+            result = regenerate_stale(self.renderer, self.case_index)
+
+            if result['errors']:
+                details = "\n".join(f"{path}: {error}" for path, error in result['errors'].items())
+                QMessageBox.warning(self, "部分文书未生成", details)
+
+            self.statusBar().showMessage(
+                f"已重新生成 {len(result['regenerated'])} 份，跳过 {len(result['skipped'])} 份", 5000)
+
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"重新生成失败: {str(e)}")
+
+    def show_reports_dialog(self):
+        """统计报表：按月份和案件类型/条例/经办人/用人单位统计，可导出Excel"""
+        from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QComboBox, QLabel,
+                                     QPushButton, QTableWidget, QTableWidgetItem, QFileDialog)
+        from case_reports import DIMENSIONS
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("统计报表")
+        dialog.resize(760, 520)
+        layout = QVBoxLayout()
+
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("年份:"))
+        combo_year = QComboBox()
+        combo_year.addItem("全部年份", None)
+        for year in self.case_index.years():
+            combo_year.addItem(year, year)
+        filter_layout.addWidget(combo_year)
+
+        filter_layout.addWidget(QLabel("统计项:"))
+        combo_dimension = QComboBox()
+        for dimension, title in DIMENSIONS[1:]:
+            combo_dimension.addItem(title, dimension)
+        filter_layout.addWidget(combo_dimension)
+        filter_layout.addStretch()
+        layout.addLayout(filter_layout)
+
+        table = QTableWidget()
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(table)
+
+        def refresh():
+            year = combo_year.currentData()
+            years = [year] if year else None
+            monthly = self.reports.monthly(combo_dimension.currentData(), years)
+            columns = sorted({value for row in monthly.values() for value in row})
+
+            table.clear()
+            table.setRowCount(len(monthly))
+            table.setColumnCount(len(columns) + 1)
+            table.setHorizontalHeaderLabels(columns + ["合计"])
+            table.setVerticalHeaderLabels(list(monthly))
+            for r, row in enumerate(monthly.values()):
+                for c, column in enumerate(columns):
+                    table.setItem(r, c, QTableWidgetItem(str(row.get(column, 0))))
+                table.setItem(r, len(columns), QTableWidgetItem(str(sum(row.values()))))
+
+        def export():
+            filepath, _ = QFileDialog.getSaveFileName(dialog, "导出统计表", "案件统计.xlsx", "Excel 文件 (*.xlsx)")
+            if not filepath:
+                return
+            year = combo_year.currentData()
+            try:
+                self.reports.export_xlsx(filepath, [year] if year else None)
+                self.statusBar().showMessage(f"已导出: {filepath}", 3000)
+            except Exception as e:
+                QMessageBox.warning(dialog, "导出失败", str(e))
+
+        combo_year.currentIndexChanged.connect(refresh)
+        combo_dimension.currentIndexChanged.connect(refresh)
+
+        btn_layout = QHBoxLayout()
+        btn_export = QPushButton("导出Excel")
+        btn_close = QPushButton("关闭")
+        btn_export.clicked.connect(export)
+        btn_close.clicked.connect(dialog.accept)
+        btn_layout.addStretch()
+        btn_layout.addWidget(btn_export)
+        btn_layout.addWidget(btn_close)
+        layout.addLayout(btn_layout)
+
+        dialog.setLayout(layout)
+        refresh()
+        dialog.exec_()
+
+    def create_draft_client(self):
+        """按界面上的接口配置创建起草客户端"""
+        from llm_client import DraftClient
+
+        return DraftClient(
+            self.lineEdit_api_url.text().strip(),
+            self.lineEdit_api_key.text().strip(),
+            cache_dir=os.path.join(self.base_dir, "llm_cache"),
+            model=self.config.load_config().get('api_model', ''),
+        )
+
+    def on_ai_draft(self):
+        """AI起草当前人员（及本案已有证人）的自我介绍和受伤经过"""
+        if getattr(self, '_draft_worker', None) and self._draft_worker.isRunning():
+            self.statusBar().showMessage("AI起草进行中，请稍候", 2000)
             return
 
-        # TODO: 实现案审会材料生成逻辑
-        print("生成案审会材料")
-        self.statusBar().showMessage("生成案审会材料功能开发中", 2000)
+        client = self.create_draft_client()
+        if not client.is_configured():
+            self.statusBar().showMessage("未配置API地址，AI起草不可用", 3000)
+            return
+
+        data = self.collect_form_data()
+        person_type = data['人员类型']
+        jobs = []
+
+        def add_person(person_data):
+            label = f"{person_data['人员类型']} {person_data.get(person_data['人员类型'] + '姓名', '')}"
+            for kind in ('自我介绍', '受伤经过'):
+                jobs.append((label, kind, person_data))
+
+        add_person(data)
+
+        # 本案已生成笔录的证人一起批量起草
+        case_folder = None
+        if self.current_case_number:
+            case_data = self.case_index.get(self.current_case_number)
+            if case_data:
+                case_folder = os.path.join(self.base_dir, case_data.get('folder_path', ''))
+
+            drafted_names = {data.get(f'{person_type}姓名', '')} if person_type == "证人" else set()
+            for entry in self.renderer.tracker.entries().values():
+                entry_data = entry.get('data', {})
+                if (entry.get('case_number') == self.current_case_number
+                        and entry_data.get('人员类型') == "证人"
+                        and entry_data.get('证人姓名') not in drafted_names):
+                    drafted_names.add(entry_data.get('证人姓名'))
+                    add_person(entry_data)
+
+        self._draft_worker = DraftWorker(client, jobs, case_folder, self)
+        self._draft_worker.drafted.connect(lambda results: self.on_drafts_ready(results, data))
+        self._draft_worker.start()
+        self.statusBar().showMessage(f"正在AI起草（{len(jobs)} 项）...")
+
+    def on_drafts_ready(self, results, data):
+        """显示起草结果，本人结果可写入案本"""
+        from PyQt5.QtWidgets import QDialog, QVBoxLayout, QPlainTextEdit, QPushButton, QHBoxLayout
+
+        failed = [r for r in results if not r[3]]
+        self.statusBar().showMessage(f"AI起草完成，成功 {len(results) - len(failed)} 项，失败 {len(failed)} 项", 3000)
+
+        lines = []
+        for label, kind, text, ok in results:
+            lines.append(f"【{label}】{kind}")
+            lines.append(f"答：{text}" if ok else f"（起草失败：{text}）")
+            lines.append("")
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("AI起草结果")
+        dialog.resize(560, 480)
+        layout = QVBoxLayout()
+
+        text_edit = QPlainTextEdit("\n".join(lines))
+        layout.addWidget(text_edit)
+
+        btn_layout = QHBoxLayout()
+        own_results = {kind: text for label, kind, text, ok in results[:2] if ok}
+        can_save = data['人员类型'] == "本人" and self.current_case_number and own_results
+        btn_save = QPushButton("写入案本")
+        btn_save.setEnabled(bool(can_save))
+        btn_close = QPushButton("关闭")
+
+        def save_to_case():
+            self.case_index.update_person_info(self.current_case_number, own_results)
+            self.statusBar().showMessage(f"已写入案本 {self.current_case_number}", 3000)
+            dialog.accept()
+
+        btn_save.clicked.connect(save_to_case)
+        btn_close.clicked.connect(dialog.reject)
+        btn_layout.addWidget(btn_save)
+        btn_layout.addWidget(btn_close)
+        layout.addLayout(btn_layout)
+
+        dialog.setLayout(layout)
+        dialog.exec_()
 
     def auto_fill_injured_worker(self):
         """本人姓名输入完成时自动填入受伤职工"""
@@ -230,6 +788,207 @@ class MainWindow(QMainWindow):
         self.btn_delete_workplace.clicked.connect(
             lambda: self.delete_from_excel('comboBox_workplace', self.workplace_list, "工作场所名称汇总.xlsx", "工作场所")
         )
+        self.btn_employer_cases.clicked.connect(self.show_employer_cases)
+
+    def show_case_browser(self):
+        """案件浏览：按列筛选、排序（在索引中完成），滚动时分页加载；双击打开案件文件夹"""
+        from PyQt5.QtCore import QTimer
+        from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QComboBox, QLabel, QLineEdit,
+                                     QPushButton, QTableView, QAbstractItemView, QHeaderView)
+        from case_models import CaseTableModel
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("案件浏览")
+        dialog.resize(900, 600)
+        layout = QVBoxLayout()
+
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("年份:"))
+        combo_year = QComboBox()
+        combo_year.addItem("全部年份", None)
+        for year in self.case_index.years():
+            combo_year.addItem(year, year)
+        filter_layout.addWidget(combo_year)
+
+        filter_layout.addWidget(QLabel("查找:"))
+        combo_column = QComboBox()
+        combo_column.addItem("全部列", None)
+        for field, title in CaseTableModel.COLUMNS:
+            combo_column.addItem(title, field)
+        filter_layout.addWidget(combo_column)
+        line_filter = QLineEdit()
+        line_filter.setPlaceholderText("输入要查找的文字")
+        line_filter.setClearButtonEnabled(True)
+        filter_layout.addWidget(line_filter)
+        label_total = QLabel()
+        filter_layout.addWidget(label_total)
+        layout.addLayout(filter_layout)
+
+        model = CaseTableModel(self.case_index, org_index=self.org_index, parent=dialog)
+        table = QTableView()
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        table.setWordWrap(False)
+        # 固定行高，视图不必逐行计算高度
+        table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        table.verticalHeader().setDefaultSectionSize(22)
+        table.setModel(model)
+        header = table.horizontalHeader()
+        for column, width in enumerate((180, 80, 220, 200, 90, 70)):
+            header.resizeSection(column, width)
+        header.setStretchLastSection(True)
+        layout.addWidget(table)
+
+        def apply_filter():
+            text = line_filter.text()
+            field = combo_column.currentData()
+            try:
+                if field:
+                    model.set_filter(filters={field: text}, year=combo_year.currentData())
+                else:
+                    model.set_filter(text=text, year=combo_year.currentData())
+            except Exception as e:
+                print(f"查询案件失败: {e}")
+
+        # 输入时稍等再查询，避免每个字都查一遍
+        timer = QTimer(dialog)
+        timer.setSingleShot(True)
+        timer.setInterval(300)
+        timer.timeout.connect(apply_filter)
+        line_filter.textChanged.connect(timer.start)
+        combo_column.currentIndexChanged.connect(apply_filter)
+        combo_year.currentIndexChanged.connect(apply_filter)
+        model.modelReset.connect(lambda: label_total.setText(f"共 {model.total()} 个案件"))
+
+        def open_case(index):
+            case = model.case_at(index.row())
+            if case is None:
+                return
+            folder = os.path.join(self.base_dir, case.folder_path)
+            if os.path.isdir(folder):
+                self.open_external(folder)
+            else:
+                self.statusBar().showMessage(f"案件文件夹不存在: {case.folder_path}", 3000)
+
+        table.doubleClicked.connect(open_case)
+
+        def intake():
+            if self.intake_applications(dialog):
+                apply_filter()
+
+        btn_layout = QHBoxLayout()
+        btn_intake = QPushButton("导入申请表")
+        btn_intake.setToolTip("从一个文件夹中的工伤认定申请表（xlsx/docx）批量立案")
+        btn_refresh = QPushButton("刷新")
+        btn_close = QPushButton("关闭")
+        btn_intake.clicked.connect(intake)
+        btn_refresh.clicked.connect(apply_filter)
+        btn_close.clicked.connect(dialog.accept)
+        btn_layout.addWidget(btn_intake)
+        btn_layout.addStretch()
+        btn_layout.addWidget(btn_refresh)
+        btn_layout.addWidget(btn_close)
+        layout.addLayout(btn_layout)
+
+        dialog.setLayout(layout)
+        # 默认按立案日期从新到旧；开启排序时视图会调用 model.sort 完成第一次查询
+        header.setSortIndicator(4, Qt.DescendingOrder)
+        table.setSortingEnabled(True)
+        dialog.exec_()
+
+    def intake_applications(self, parent=None):
+        """选择申请表文件夹，解析、校验后确认，批量立案；返回是否建立了案件"""
+        from PyQt5.QtWidgets import QFileDialog
+        from case_intake import parse_folder, prepare_intake, commit_intake
+
+        parent = parent or self
+        folder = QFileDialog.getExistingDirectory(parent, "选择申请表所在文件夹")
+        if not folder:
+            return False
+
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            applications, parse_errors = parse_folder(folder)
+            plan = prepare_intake(self.base_dir, applications, self.case_index,
+                                  case_type=self.check_case_type(),
+                                  regulation=self.comboBox_regulations.currentText().strip(),
+                                  operator=self.lineEdit_operator.text().strip())
+        except Exception as e:
+            print(f"读取申请表失败: {e}")
+            QMessageBox.warning(parent, "错误", f"读取申请表失败: {e}")
+            return False
+        finally:
+            QApplication.restoreOverrideCursor()
+
+        lines = [f"可立案 {len(plan['cases'])} 个："]
+        lines += [f"  {case.case_number}（{source}）" for _, source, case in plan['cases'][:20]]
+        if len(plan['cases']) > 20:
+            lines.append(f"  ……共 {len(plan['cases'])} 个")
+        for title, problems in (("身份证号有误", plan['invalid']), ("跳过", plan['skipped']),
+                                ("无法读取", parse_errors)):
+            if problems:
+                lines.append(f"\n{title} {len(problems)} 个：")
+                lines += [f"  {source}: {reason}" for source, reason in list(problems.items())[:20]]
+
+        if not plan['cases']:
+            QMessageBox.information(parent, "导入申请表", "\n".join(lines))
+            return False
+        reply = QMessageBox.question(parent, "导入申请表", "\n".join(lines) + "\n\n是否立案？",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+        if reply != QMessageBox.Yes:
+            return False
+
+        try:
+            created = commit_intake(self.base_dir, plan, self.case_index)
+        except Exception as e:
+            print(f"批量立案失败: {e}")
+            QMessageBox.warning(parent, "错误", f"批量立案失败，本批未建立任何案件: {e}")
+            return False
+        finally:
+            self.fs.invalidate(os.path.join(self.base_dir, str(datetime.now().year)))
+
+        self.statusBar().showMessage(f"已批量立案 {len(created)} 个", 5000)
+        return True
+
+    def show_employer_cases(self):
+        """列出当前用人单位涉及的全部案件（含作为用工单位、工作场所）"""
+        from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QPushButton, QTableWidget, QTableWidgetItem
+
+        name = self.comboBox_employer.currentText().strip()
+        if not name:
+            self.statusBar().showMessage("请先选择用人单位", 2000)
+            return
+
+        entries = self.org_index.cases_for(name)
+        if not entries:
+            self.statusBar().showMessage(f"没有涉及 {name} 的案件", 3000)
+            return
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f"{name} - 相关案件")
+        dialog.resize(640, 400)
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(f"共 {len(entries)} 个案件"))
+
+        headers = ["案本号", "受伤职工", "案件类型", "立案日期", "单位身份"]
+        table = QTableWidget(len(entries), len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.setSelectionBehavior(QTableWidget.SelectRows)
+        for row, entry in enumerate(entries):
+            roles = "、".join(ROLE_TITLES[role] for role in entry['roles'])
+            values = [entry['case_number'], entry['person_name'], entry['case_type'], entry['created_date'], roles]
+            for column, value in enumerate(values):
+                table.setItem(row, column, QTableWidgetItem(value))
+        table.resizeColumnsToContents()
+        layout.addWidget(table)
+
+        btn_close = QPushButton("关闭")
+        btn_close.clicked.connect(dialog.accept)
+        layout.addWidget(btn_close)
+
+        dialog.setLayout(layout)
+        dialog.exec_()
 
     def delete_from_excel(self, combobox_name, data_list, filename, column_name):
         """从Excel删除当前选中的项目"""
@@ -258,6 +1017,7 @@ class MainWindow(QMainWindow):
             # 1. 从内存列表中删除
             if selected_text in data_list:
                 data_list.remove(selected_text)
+            self.name_sets.pop(combobox_name, None)
 
             # 2. 从ComboBox中删除
             index = combobox.findText(selected_text)
@@ -265,7 +1025,7 @@ class MainWindow(QMainWindow):
                 combobox.removeItem(index)
 
             # 3. 从Excel文件中删除
-            current_dir = os.path.dirname(os.path.abspath(__file__))
+            current_dir = self.base_dir
             filepath = os.path.join(current_dir, filename)
 
             if os.path.exists(filepath):
@@ -283,7 +1043,7 @@ class MainWindow(QMainWindow):
                 # 删除行
                 if row_to_delete:
                     ws.delete_rows(row_to_delete)
-                    wb.save(filepath)
+                    atomic_save(wb, filepath, snapshot=True)
                     self.statusBar().showMessage(f'已删除: {selected_text}', 3000)
                 else:
                     self.statusBar().showMessage("未在Excel中找到该项目", 3000)
@@ -339,8 +1099,13 @@ class MainWindow(QMainWindow):
         if not user_input:
             return  # 如果输入为空，不处理
 
-        # 检查是否已经在列表中
-        if user_input in current_list:
+        # 检查是否已经在列表中（全半角、空格、组织形式不同的写法视为同一单位）
+        name_set = self.get_name_set(combobox_name, current_list)
+        existing = name_set.existing(user_input)
+        if existing is not None:
+            if existing != user_input:
+                combobox.setCurrentText(existing)
+                self.statusBar().showMessage(f"已有同一单位: {existing}，使用已有写法", 3000)
             return  # 如果已经在列表中，不重复添加
 
         # 如果不在列表中，保存到Excel
@@ -348,11 +1113,20 @@ class MainWindow(QMainWindow):
 
         # 添加到内存列表和ComboBox
         current_list.append(user_input)
+        name_set.add(user_input)
         combobox.addItem(user_input)
 
         # 保持用户输入的内容显示在界面上
         combobox.setCurrentText(user_input)
 
+    def get_name_set(self, combobox_name, current_list):
+        """名称汇总的查重集合（首次使用时建立）"""
+        from org_names import NameSet
+
+        if combobox_name not in self.name_sets:
+            self.name_sets[combobox_name] = NameSet(current_list)
+        return self.name_sets[combobox_name]
+
     def save_to_excel(self, combobox_name, new_item, current_list):
         """保存新项目到对应的Excel文件"""
         # 确定文件名和列名
@@ -367,7 +1141,7 @@ class MainWindow(QMainWindow):
             column_name = "工作场所"
 
         try:
-            current_dir = os.path.dirname(os.path.abspath(__file__))
+            current_dir = self.base_dir
             filepath = os.path.join(current_dir, filename)
 
             # 如果文件存在，追加数据
@@ -382,15 +1156,15 @@ class MainWindow(QMainWindow):
 
                 # 写入新数据
                 ws.cell(row=row, column=1, value=new_item)
-                wb.save(filepath)
+                atomic_save(wb, filepath, snapshot=True)
             else:
                 # 文件不存在，创建新文件
-                wb = load_workbook()
+                wb = Workbook()
                 ws = wb.active
                 ws.title = "汇总表"
                 ws.cell(row=1, column=1, value=column_name)
                 ws.cell(row=2, column=1, value=new_item)
-                wb.save(filepath)
+                atomic_save(wb, filepath, snapshot=True)
 
         except Exception as e:
             print(f"保存到Excel失败: {e}")
@@ -407,7 +1181,7 @@ class MainWindow(QMainWindow):
 
     def load_excel_to_combobox(self):
         """从Excel文件加载数据到ComboBox"""
-        current_dir = os.path.dirname(os.path.abspath(__file__))
+        current_dir = self.base_dir
 
         # 加载用人单位 - 确保属性存在
         self.employer_list = self.load_excel_data(os.path.join(current_dir, "用人单位名称汇总.xlsx"))
@@ -551,32 +1325,13 @@ class MainWindow(QMainWindow):
             self.handle_legal_case(data)
 
     def handle_person_case(self, data):
-        # 1. 生成自我介绍
-        description = self.generate_description(data)
-        print(description)
-
-        # 2. 根据案件类型生成问答句（仅用于显示）
         case_type = data['案件类型']
-        if case_type != "普通案件":
-            questions = self.generate_case_questions(case_type, data)
-            if questions:
-                print(f"\n=== {case_type}问答句 ===")
-                for q in questions:
-                    print(q)
 
         # ========== 检查是否已有案本 ==========
-        import json
-        index_file = os.path.join(os.path.dirname(__file__), "cases_index.json")
-
-        if os.path.exists(index_file):
-            with open(index_file, 'r', encoding='utf-8') as f:
-                index_data = json.load(f)
-
-            # 搜索同名案件
-            same_person_cases = []
-            for case in index_data.get('cases', []):
-                if case['person_name'] == data['受伤职工']:
-                    same_person_cases.append(case)
+        if self.case_index.exists():
+            # 搜索同名案件（身份证一致 > 电话一致 > 立案时间新）
+            same_person_cases = self.case_index.find_same_person(
+                data['受伤职工'], data['本人身份证号'], data['本人电话'])
 
             if same_person_cases:
                 selected_case = self.show_case_selection_dialog(
@@ -588,22 +1343,14 @@ class MainWindow(QMainWindow):
                 if selected_case == "new":
                     pass
                 elif selected_case:
-                    self.current_case_number = selected_case['case_number']
-                    self.current_folder_path = selected_case['folder_path']
-
-                    person_info = selected_case.get('person_info', {})
-                    self.lineEdit_name.setText(person_info.get('name', ''))
-                    self.lineEdit_id_card.setText(selected_case.get('id_card', ''))
-                    self.lineEdit_phone.setText(person_info.get('phone', ''))
-                    if selected_case.get('id_card'):
-                        self.auto_calculate_id_info()
-
-                    self.statusBar().showMessage(f"已关联案本: {selected_case['case_number']}", 3000)
+                    self.link_case(selected_case)
 
                     if "死亡" in case_type:
                         QMessageBox.information(self, "提示",
                                                 f"已关联死亡职工案本：{selected_case['case_number']}\n\n请继续输入证人笔录信息",
                                                 QMessageBox.Ok)
+                    else:
+                        self.handle_existing_transcript(selected_case)
                     return
                 else:
                     return
@@ -613,14 +1360,14 @@ class MainWindow(QMainWindow):
         data['案本号'] = case_number
         year_folder = self.get_current_year_folder()
         case_folder = os.path.join(year_folder, case_number)
-        os.makedirs(case_folder, exist_ok=True)
+        self.fs.makedirs(case_folder)
 
         # 保存当前使用的案本信息
         self.current_case_number = case_number
         self.current_folder_path = f"{datetime.now().year}/{case_number}"
 
         # 在数据中添加自我介绍
-        data['自我介绍'] = description
+        data['自我介绍'] = self.generate_description(data)
 
         # 预留三个字段，等待后续提取
         data['受伤经过'] = ''
@@ -640,18 +1387,6 @@ class MainWindow(QMainWindow):
             self.generate_transcript(case_folder, template_name, data)
 
     def handle_witness_case(self, data):
-        # 1. 生成自我介绍
-        description = self.generate_description(data)
-        print(description)
-
-        # 2. 根据案件类型生成问答句
-        case_type = data['案件类型']
-        if case_type != "普通案件":
-            questions = self.generate_case_questions(case_type, data)
-            if questions:
-                print(f"\n=== {case_type}问答句（证人版）===")
-                for q in questions:
-                    print(q)
         """处理证人案件"""
         # ===== 强制检查是否有当前案本号 =====
         if not self.current_case_number:
@@ -663,19 +1398,13 @@ class MainWindow(QMainWindow):
         case_number = self.current_case_number
         data['案本号'] = case_number
 
-        year_folder = self.get_current_year_folder()
-        case_folder = os.path.join(year_folder, case_number)
-
-        # 确保文件夹存在
-        if not os.path.exists(case_folder):
-            os.makedirs(case_folder, exist_ok=True)
+        case_folder = self.case_folder_for(case_number)
 
         # ===== 查找该文件夹下所有证人笔录 =====
         witness_files = []
-        if os.path.exists(case_folder):
-            for file in os.listdir(case_folder):
-                if file.endswith('.docx') and '证人' in file:
-                    witness_files.append(file)
+        for file in self.fs.listdir(case_folder):
+            if file.endswith('.docx') and '证人' in file:
+                witness_files.append(file)
 
         if not witness_files:
             # ========== 情况2.1：没有证人笔录，直接生成第一个 ==========
@@ -716,7 +1445,7 @@ class MainWindow(QMainWindow):
             )
 
             if reply == QMessageBox.Yes:
-                os.startfile(existing_file)
+                self.preview_document(existing_file)
                 self.statusBar().showMessage(f"已打开证人笔录", 3000)
             else:
                 # 新建另一份（编号+1）
@@ -739,55 +1468,20 @@ class MainWindow(QMainWindow):
         filename = f"{injured_name}_证人{witness_number:02d}_{witness_name}.docx"
         filepath = os.path.join(case_folder, filename)
 
-        # 使用传入的模板名
-        template_path = os.path.join(os.path.dirname(__file__), "templates", template_name)
-
-        if not os.path.exists(template_path):
+        # 使用传入的模板名，替换占位符并插入问答句
+        try:
+            self.renderer.render_transcript(template_name, data, filepath)
+        except FileNotFoundError:
             self.statusBar().showMessage(f"模板不存在: {template_name}", 3000)
             return False
+        self.fs.added(filepath)
 
-        from docx import Document
-        doc = Document(template_path)
-
-        # 替换占位符
-        placeholders = {
-            '受伤职工': injured_name,
-            '证人姓名': witness_name,
-            '证人身份证': data.get('证人身份证号', ''),
-            '证人电话': data.get('证人电话', ''),
-            '当前日期': datetime.now().strftime('%Y年%m月%d日'),
-            '当前时间': datetime.now().strftime('%H时%M分'),
-        }
-
-        for paragraph in doc.paragraphs:
-            text = paragraph.text
-            for key, value in placeholders.items():
-                if f"{{{key}}}" in text:
-                    text = text.replace(f"{{{key}}}", value)
-            paragraph.text = text
-
-            # ===== 在这里插入问答句 =====
-        doc = self.add_questions_to_doc(doc, data)
-
-        doc.save(filepath)
-        os.startfile(filepath)
-        self.update_case_index(data['案本号'], data['受伤职工'], data)
+        self.preview_document(filepath)
+        self.update_case_index(data['案本号'], data['受伤职工'], data, transcript=filename)
         self.statusBar().showMessage(f"证人笔录已生成: {filename}", 3000)
         return True
 
     def handle_legal_case(self, data):
-        # 1. 生成自我介绍
-        description = self.generate_description(data)
-        print(description)
-
-        # 2. 根据案件类型生成问答句
-        case_type = data['案件类型']
-        if case_type != "普通案件":
-            questions = self.generate_case_questions(case_type, data)
-            if questions:
-                print(f"\n=== {case_type}问答句（法人版）===")
-                for q in questions:
-                    print(q)
         """处理法人案件"""
         # ===== 强制检查是否有当前案本号 =====
         if not self.current_case_number:
@@ -802,19 +1496,13 @@ class MainWindow(QMainWindow):
             case_number = self.current_case_number
             data['案本号'] = case_number
 
-            year_folder = self.get_current_year_folder()
-            case_folder = os.path.join(year_folder, case_number)
-
-            # 确保文件夹存在
-            if not os.path.exists(case_folder):
-                os.makedirs(case_folder, exist_ok=True)
+            case_folder = self.case_folder_for(case_number)
 
             # ===== 查找该文件夹下所有法人笔录 =====
             legal_files = []
-            if os.path.exists(case_folder):
-                for file in os.listdir(case_folder):
-                    if file.endswith('.docx') and '法人' in file:
-                        legal_files.append(file)
+            for file in self.fs.listdir(case_folder):
+                if file.endswith('.docx') and '法人' in file:
+                    legal_files.append(file)
 
             if not legal_files:
                 # ===== 没有法人笔录，直接生成第一个 =====
@@ -850,7 +1538,7 @@ class MainWindow(QMainWindow):
                 )
 
                 if reply == QMessageBox.Yes:
-                    os.startfile(existing_file)
+                    self.preview_document(existing_file)
                     self.statusBar().showMessage(f"已打开法人笔录", 3000)
                 else:
                     # 新建另一份（编号+1）
@@ -873,36 +1561,7 @@ class MainWindow(QMainWindow):
 
     def generate_case_questions(self, case_type, data):
         """根据案件类型生成对应的问答句"""
-
-        if case_type == "个人案件":
-            return [
-                "问：你是个人申请工伤认定吗？",
-                "答：是的，我是个人申请。",
-                "问：单位为什么没有为你申请？",
-                "答：单位说让我自己申请。",
-                # ... 更多个人案件专用问题
-            ]
-
-        elif case_type == "死亡案件":
-            return [
-                "问：你是死亡职工的家属吗？",
-                "答：是的，我是他的家属。",
-                "问：死亡时间和原因是什么？",
-                "答：...",
-                # ... 更多死亡案件专用问题
-            ]
-
-        elif case_type == "个人申请死亡案件":
-            return [
-                "问：你是以家属身份个人申请工亡吗？",
-                "答：是的。",
-                "问：单位没有为死者申报吗？",
-                "答：没有。",
-                # ... 综合问题
-            ]
-
-        else:  # 普通案件
-            return []  # 返回空列表
+        return build_case_questions(case_type, data)
 
     def create_legal_transcript(self, case_folder, data, legal_number, template_name):
         """生成法人笔录"""
@@ -913,117 +1572,234 @@ class MainWindow(QMainWindow):
         filename = f"{injured_name}_法人{legal_number:02d}_{legal_name}.docx"
         filepath = os.path.join(case_folder, filename)
 
-        # 使用传入的模板名
-        template_path = os.path.join(os.path.dirname(__file__), "templates", template_name)
-
-        if not os.path.exists(template_path):
-            self.statusBar().showMessage(f"模板不存在: {template_name}", 3000)
-            return False
-
         try:
-            from docx import Document
-            doc = Document(template_path)
-
-            # 替换占位符
-            placeholders = {
-                '受伤职工': injured_name,
-                '法人姓名': legal_name,
-                '法人身份证': data.get('法人身份证号', ''),
-                '法人电话': data.get('法人电话', ''),
-                '法人岗位': data.get('法人岗位', ''),
-                '当前日期': datetime.now().strftime('%Y年%m月%d日'),
-                '当前时间': datetime.now().strftime('%H时%M分'),
-            }
-
-            for paragraph in doc.paragraphs:
-                text = paragraph.text
-                for key, value in placeholders.items():
-                    if f"{{{key}}}" in text:
-                        text = text.replace(f"{{{key}}}", value)
-                paragraph.text = text
-
-                # ===== 在这里插入问答句 =====
-            doc = self.add_questions_to_doc(doc, data)
+            # 使用传入的模板名，替换占位符并插入问答句
+            self.renderer.render_transcript(template_name, data, filepath)
+            self.fs.added(filepath)
 
-            doc.save(filepath)
-            os.startfile(filepath)
-            self.update_case_index(data['案本号'], data['受伤职工'], data)
+            self.preview_document(filepath)
+            self.update_case_index(data['案本号'], data['受伤职工'], data, transcript=filename)
             self.statusBar().showMessage(f"法人笔录已生成: {filename}", 3000)
             return True
 
+        except FileNotFoundError:
+            self.statusBar().showMessage(f"模板不存在: {template_name}", 3000)
+            return False
         except Exception as e:
             self.statusBar().showMessage(f"生成失败: {str(e)}", 3000)
             return False
 
+    def existing_transcripts(self, case_folder, person_type):
+        """案件文件夹中已有的证人或法人笔录
+        返回: (最大编号, {姓名: 文件名})
+        """
+        import re
+        pattern = re.compile(person_type + r'(\d+)_(.+?)\.docx$')
+        max_number = 0
+        files = {}
+        for file in self.fs.listdir(case_folder):
+            # 文件名格式：受伤职工姓名_证人XX_证人姓名.docx
+            match = pattern.search(file)
+            if match:
+                max_number = max(max_number, int(match.group(1)))
+                files.setdefault(match.group(2), file)
+        return max_number, files
+
+    def show_batch_entry_dialog(self):
+        """批量录入证人、法人：一次录入多人，全部生成笔录"""
+        from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox,
+                                     QTableWidget, QTableWidgetItem, QHeaderView)
+
+        if not self.current_case_number:
+            QMessageBox.warning(self, "错误", "请先生成本人案本或关联已有案本")
+            return
+
+        columns = ["类型", "姓名", "身份证号", "性别", "年龄", "电话", "身份证地址", "现住址", "岗位"]
+        default_type = "法人" if self.radio_legal_entity.isChecked() else "证人"
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f"批量录入 - {self.current_case_number}")
+        dialog.resize(1000, 400)
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("受伤职工、单位、条例等沿用主界面的内容；身份证号填写后自动计算性别和年龄"))
+
+        table = QTableWidget(0, len(columns))
+        table.setHorizontalHeaderLabels(columns)
+        header = table.horizontalHeader()
+        for column, width in enumerate((70, 80, 170, 50, 50, 110, 180, 180)):
+            header.resizeSection(column, width)
+        header.setStretchLastSection(True)
+        header.setSectionResizeMode(0, QHeaderView.Fixed)
+        layout.addWidget(table)
+
+        def add_row():
+            row = table.rowCount()
+            table.insertRow(row)
+            combo_type = QComboBox()
+            combo_type.addItems(["证人", "法人"])
+            combo_type.setCurrentText(default_type)
+            table.setCellWidget(row, 0, combo_type)
+            for column in range(1, len(columns)):
+                table.setItem(row, column, QTableWidgetItem(""))
+
+        def remove_rows():
+            for row in sorted({index.row() for index in table.selectedIndexes()}, reverse=True):
+                table.removeRow(row)
+
+        def on_cell_changed(row, column):
+            if column != 2:
+                return
+            id_card = table.item(row, 2).text().strip()
+            _, age, gender = self.calculate_id_info(id_card) if len(id_card) == 18 else (id_card, None, None)
+            if age is not None:
+                table.item(row, 3).setText(gender)
+                table.item(row, 4).setText(str(age))
+
+        def collect_rows():
+            rows = []
+            for row in range(table.rowCount()):
+                values = [table.item(row, column).text().strip() for column in range(1, len(columns))]
+                if values[0]:
+                    rows.append((row, table.cellWidget(row, 0).currentText(), PersonRecord(
+                        name=values[0], id_card=values[1], gender=values[2], age=values[3], phone=values[4],
+                        address=values[5], current_address=values[6], position=values[7])))
+            return rows
+
+        def generate_all():
+            rows = collect_rows()
+            if not rows:
+                QMessageBox.warning(dialog, "提示", "请至少填写一个人员的姓名")
+                return
+            done_rows = self.generate_batch_transcripts([(person_type, person) for _, person_type, person in rows])
+            if done_rows is None:
+                return
+            for index in sorted((rows[i][0] for i in done_rows), reverse=True):
+                table.removeRow(index)
+            if table.rowCount() == 0:
+                dialog.accept()
+
+        table.cellChanged.connect(on_cell_changed)
+        for _ in range(3):
+            add_row()
+
+        btn_layout = QHBoxLayout()
+        btn_add = QPushButton("添加一行")
+        btn_remove = QPushButton("删除选中行")
+        btn_generate = QPushButton("全部生成")
+        btn_close = QPushButton("关闭")
+        btn_add.clicked.connect(add_row)
+        btn_remove.clicked.connect(remove_rows)
+        btn_generate.clicked.connect(generate_all)
+        btn_close.clicked.connect(dialog.reject)
+        btn_layout.addWidget(btn_add)
+        btn_layout.addWidget(btn_remove)
+        btn_layout.addStretch()
+        btn_layout.addWidget(btn_generate)
+        btn_layout.addWidget(btn_close)
+        layout.addLayout(btn_layout)
+
+        dialog.setLayout(layout)
+        dialog.exec_()
+
+    def generate_batch_transcripts(self, people):
+        """为多名证人、法人一次生成笔录：先统一分配编号，再并行生成，最后一次写入索引
+        people: [(人员类型, PersonRecord)]
+        返回: 已生成的人员序号列表，取消时返回None
+        """
+        case_number = self.current_case_number
+        base = self.collect_form_data()
+        # 主界面当前人员的字段不带入批量数据
+        for key in PersonRecord().to_form(base['人员类型']):
+            base.pop(key, None)
+        base['案本号'] = case_number
+
+        case_folder = self.case_folder_for(case_number)
+
+        # 一次列出已有笔录，同名的人员统一询问
+        existing = {person_type: self.existing_transcripts(case_folder, person_type)
+                    for person_type in ("证人", "法人")}
+        duplicates = [f"{person_type} {person.name}" for person_type, person in people
+                      if person.name in existing[person_type][1]]
+        skip_existing = False
+        if duplicates:
+            reply = QMessageBox.question(
+                self, '人员已有笔录',
+                "以下人员已有笔录：\n" + "\n".join(duplicates) +
+                "\n\n选“是”=仍为他们新建另一份\n选“否”=跳过这些人员",
+                QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel,
+                QMessageBox.No
+            )
+            if reply == QMessageBox.Cancel:
+                return None
+            skip_existing = reply == QMessageBox.No
+
+        # 统一分配编号
+        next_numbers = {person_type: existing[person_type][0] + 1 for person_type in existing}
+        jobs = []
+        entries = {}  # 文件路径 -> (人员序号, 表单数据, 文件名)
+        for i, (person_type, person) in enumerate(people):
+            if skip_existing and person.name in existing[person_type][1]:
+                continue
+            data = dict(base, 人员类型=person_type)
+            data.update(person.to_form(person_type))
+            filename = f"{data['受伤职工']}_{person_type}{next_numbers[person_type]:02d}_{person.name}.docx"
+            next_numbers[person_type] += 1
+            filepath = os.path.join(case_folder, filename)
+            jobs.append((self.get_template_name(data), data, filepath))
+            entries[filepath] = (i, data, filename)
+
+        if not jobs:
+            self.statusBar().showMessage("没有需要生成的笔录", 3000)
+            return []
+
+        generated, errors = self.renderer.render_transcripts(jobs)
+        for filepath in generated:
+            self.fs.added(filepath)
+
+        self.update_case_index_batch(case_number, base['受伤职工'],
+                                     [entries[filepath][1:] for filepath in generated])
+
+        if errors:
+            QMessageBox.warning(self, "部分笔录生成失败", "\n".join(
+                f"{entries[filepath][2]}: {error}" for filepath, error in errors.items()))
+        self.statusBar().showMessage(f"已生成 {len(generated)} 份笔录: {case_number}", 5000)
+        return [entries[filepath][0] for filepath in generated]
+
     def search_same_name_cases(self, name, id_card):
         """搜索同名案件"""
         cases = []
 
-        # 读取索引文件
-        index_file = os.path.join(os.path.dirname(__file__), "cases_index.json")
+        try:
+            for case in self.case_index.find_same_person(name, id_card):
+                case = dict(case)
+                # 检查身份证号（如果有）
+                case_id = case_id_card(case)
+                if id_card and case_id:
+                    # 有身份证输入，进行比对
+                    if id_card == case_id:
+                        case['match_type'] = '身份证完全匹配'
+                    else:
+                        case['match_type'] = '姓名匹配(身份证不同)'
+                else:
+                    case['match_type'] = '姓名匹配'
 
-        if os.path.exists(index_file):
-            try:
-                import json
-                with open(index_file, 'r', encoding='utf-8') as f:
-                    index_data = json.load(f)
-
-                for case in index_data.get('cases', []):
-                    if case['person_name'] == name:
-                        # 检查身份证号（如果有）
-                        case_id = case.get('id_card', '')
-                        if id_card and case_id:
-                            # 有身份证输入，进行比对
-                            if id_card == case_id:
-                                case['match_type'] = '身份证完全匹配'
-                            else:
-                                case['match_type'] = '姓名匹配(身份证不同)'
-                        else:
-                            case['match_type'] = '姓名匹配'
-
-                        cases.append(case)
+                cases.append(case)
 
-            except Exception as e:
-                print(f"读取索引文件失败: {e}")
+        except Exception as e:
+            print(f"读取索引文件失败: {e}")
 
         return cases
 
     def generate_description(self, data):
         """根据人员类型和单位情况生成描述语句"""
-        person_type = data['人员类型']  # 本人/证人/法人
-        has_employer = bool(data.get('用人单位', ''))
-        has_work_unit = bool(data.get('用工单位', ''))
-        has_workplace = bool(data.get('工作场所', ''))
-
-        # 获取姓名（根据人员类型不同，键名不同）
-        if person_type == "本人":
-            name = data.get('本人姓名', '')
-        elif person_type == "证人":
-            name = data.get('证人姓名', '')
-        else:  # 法人
-            name = data.get('法人姓名', '')
-
-        employer = data.get('用人单位', '')
-        work_unit = data.get('用工单位', '')
-        workplace = data.get('工作场所', '')
-        position = data.get(f'{person_type}岗位', '')
-
-        # 生成描述语句
-        if has_employer and has_work_unit and has_workplace:
-            description = f"我是{name}，系{employer}的职工，被指派到{work_unit}的{workplace}工作。从事{position}工作。"
-        elif has_employer and has_work_unit:
-            description = f"我是{name}，系{employer}的职工，被指派到{work_unit}工作。从事{position}工作。"
-        elif has_employer:
-            description = f"我是{name}，系{employer}的职工。从事{position}工作。"
-        else:
-            description = f"我是{name}。从事{position}工作。"
-
-        return f"答：{description}"
+        return build_description(data)
 
     def show_case_selection_dialog(self, name, cases, id_card):
-        """显示案件选择对话框（支持红色显示身份证不同的案件）"""
-        from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QRadioButton, QButtonGroup, QPushButton, QHBoxLayout
-        from PyQt5.QtGui import QColor
+        """显示案件选择对话框（支持红色显示身份证不同的案件）
+        cases 应已按匹配程度排序，列表分页加载，案件再多也不会一次创建全部控件
+        """
+        from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QListView, QPushButton, QHBoxLayout
+        from case_models import SameNameCaseModel
 
         dialog = QDialog(self)
         dialog.setWindowTitle("发现同名案件")
@@ -1033,50 +1809,19 @@ class MainWindow(QMainWindow):
 
         # 标题
         if id_card:
-            title = f'发现与"{name}"(身份证:{id_card[-4:]})同名的案件:'
+            title = f'发现与"{name}"(身份证:{id_card[-4:]})同名的案件（共{len(cases)}个）:'
         else:
-            title = f'发现与"{name}"同名的案件:'
+            title = f'发现与"{name}"同名的案件（共{len(cases)}个）:'
         layout.addWidget(QLabel(title))
 
-        # 创建单选按钮组
-        button_group = QButtonGroup()
-
-        # 添加"新建案件"选项
-        new_case_radio = QRadioButton("新建案件（不关联已有）")
-        new_case_radio.setChecked(True)
-        button_group.addButton(new_case_radio, 0)
-        layout.addWidget(new_case_radio)
-
-        layout.addWidget(QLabel("已有案本:"))
-
-        # 添加已有案件选项
-        for i, case in enumerate(cases, 1):
-            case_num = case['case_number']
-            # 从 person_info 里取身份证
-            case_id = case.get('person_info', {}).get('id_card', '')
-
-            # 创建水平布局放单选按钮和文本
-            h_layout = QHBoxLayout()
-            radio = QRadioButton()
-            button_group.addButton(radio, i)
-            h_layout.addWidget(radio)
-
-            # 创建显示文本的标签
-            if case_id:
-                id_display = case_id[-4:] if len(case_id) >= 4 else case_id
-                text = f"{case_num} (身份证:{id_display})"
-            else:
-                text = f"{case_num} (身份证:无)"
-
-            label = QLabel(text)
-
-            # 如果输入的身份证和案件的身份证不同，设为红色
-            if id_card and case_id and id_card != case_id:
-                label.setStyleSheet("color: red;")
-
-            h_layout.addWidget(label)
-            h_layout.addStretch()
-            layout.addLayout(h_layout)
+        # 第一行为"新建案件"，默认选中
+        model = SameNameCaseModel(cases, id_card, parent=dialog)
+        list_view = QListView()
+        list_view.setUniformItemSizes(True)
+        list_view.setModel(model)
+        list_view.setCurrentIndex(model.index(0))
+        list_view.doubleClicked.connect(dialog.accept)
+        layout.addWidget(list_view)
 
         # 按钮区域
         btn_layout = QHBoxLayout()
@@ -1093,14 +1838,49 @@ class MainWindow(QMainWindow):
         dialog.setLayout(layout)
 
         if dialog.exec_() == QDialog.Accepted:
-            selected_id = button_group.checkedId()
-            if selected_id == 0:
-                return "new"
-            elif selected_id > 0:
-                return cases[selected_id - 1]
+            current = list_view.currentIndex()
+            if current.isValid():
+                return model.data(current, Qt.UserRole)
 
         return None
 
+    def link_case(self, case):
+        """关联已有案本：后续证人、法人笔录都写入该案件，并填入本人信息"""
+        self.current_case_number = case['case_number']
+        self.current_folder_path = case['folder_path']
+
+        person_info = case.get('person_info', {})
+        selected_id_card = case_id_card(case)
+        self.lineEdit_name.setText(person_info.get('name', ''))
+        self.lineEdit_id_card.setText(selected_id_card)
+        self.lineEdit_phone.setText(person_info.get('phone', ''))
+        if selected_id_card:
+            self.auto_calculate_id_info()
+
+        self.statusBar().showMessage(f"已关联案本: {case['case_number']}", 3000)
+
+    def open_case(self, case_number):
+        """按案本号关联案件（由启动参数传入）"""
+        case = self.case_index.get(case_number)
+        if case is None:
+            self.statusBar().showMessage(f"找不到案本: {case_number}", 3000)
+            return False
+        self.link_case(case)
+        return True
+
+    def handle_existing_transcript(self, case):
+        """关联的案件已有本人笔录时，选择打开现有笔录或生成补充笔录"""
+        case_number = case['case_number']
+        case_folder = os.path.join(self.base_dir, case['folder_path'])
+        if not self.fs.exists(os.path.join(case_folder, f"{case_number}_笔录.docx")):
+            return
+
+        choice = self.show_transcript_exists_dialog(case_number)
+        if choice == "open":
+            self.preview_document(self.latest_transcript(case_folder, case_number))
+        elif choice == "supplement":
+            self.generate_supplement_transcript(case_folder, case_number)
+
     def show_transcript_exists_dialog(self, case_number):
         """显示已有笔录对话框"""
         from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QPushButton, QHBoxLayout
@@ -1176,175 +1956,156 @@ class MainWindow(QMainWindow):
             '当前时间': datetime.now().strftime('%H时%M分'),
         }
 
-        # 用变量作为前缀
-        data[f'{prefix}姓名'] = self.lineEdit_name.text().strip()
-        data[f'{prefix}性别'] = gender if gender else self.comboBox_gender.currentText()
-        data[f'{prefix}年龄'] = str(age) if age else self.lineEdit_age.text().strip()
-        data[f'{prefix}身份证号'] = id_card
-        data[f'{prefix}身份证地址'] = self.lineEdit_id_address.text().strip()
-        data[f'{prefix}现住址'] = self.lineEdit_current_address.text().strip()
-        data[f'{prefix}电话'] = self.lineEdit_phone.text().strip()
-        data[f'{prefix}岗位'] = self.lineEdit_position.text().strip()
+        # 人员信息按人员类型加前缀写入（如"证人姓名"）
+        person = PersonRecord(
+            name=self.lineEdit_name.text().strip(),
+            gender=gender if gender else self.comboBox_gender.currentText(),
+            age=str(age) if age else self.lineEdit_age.text().strip(),
+            id_card=id_card,
+            address=self.lineEdit_id_address.text().strip(),
+            current_address=self.lineEdit_current_address.text().strip(),
+            phone=self.lineEdit_phone.text().strip(),
+            position=self.lineEdit_position.text().strip(),
+        )
+        data.update(person.to_form(prefix))
 
         return data
 
     def generate_transcript(self, case_folder, template_name, data):
         """生成Word文档"""
-        template_path = os.path.join(os.path.dirname(__file__), "templates", template_name)
-
-        if not os.path.exists(template_path):
+        # 插入自我介绍、替换占位符、插入问答句后保存
+        doc_file = os.path.join(case_folder, f"{data['案本号']}_笔录.docx")
+        try:
+            self.renderer.render_transcript(template_name, data, doc_file)
+        except FileNotFoundError:
             self.statusBar().showMessage(f"模板不存在: {template_name}", 3000)
             return False
+        self.fs.added(doc_file)
 
-        from docx import Document
-        doc = Document(template_path)
-
-        # ===== 在这里插入自我介绍 =====
-        doc = self.insert_description_into_doc(doc, data)
-        # ============================
-
-        # 替换占位符
-        for paragraph in doc.paragraphs:
-            text = paragraph.text
-            for key, value in data.items():
-                if f"{{{key}}}" in text:
-                    text = text.replace(f"{{{key}}}", str(value))
-            paragraph.text = text
-
-        # ===== 在这里插入问答句 =====
-        doc = self.add_questions_to_doc(doc, data)
-
-        # 保存文件
-        doc_file = os.path.join(case_folder, f"{data['案本号']}_笔录.docx")
-        doc.save(doc_file)
-
-        # 打开Word文档
-        os.startfile(doc_file)
-
-        # 弹出提示框，询问是否已关闭Word
-        reply = QMessageBox.question(
-            self, '确认',
-            '请在关闭Word文档后点击"是"，程序将自动提取关键信息\n\n点击"否"则跳过提取',
-            QMessageBox.Yes | QMessageBox.No,
-            QMessageBox.Yes
-        )
+        # 在外部编辑器中修改后，询问是否已关闭Word
+        def after_edit():
+            reply = QMessageBox.question(
+                self, '确认',
+                '请在关闭Word文档后点击"是"，程序将自动提取关键信息\n\n点击"否"则跳过提取',
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.Yes
+            )
 
-        if reply == QMessageBox.Yes:
-            # 等待一小段时间确保Word完全关闭
-            from PyQt5.QtCore import QTimer
-            QTimer.singleShot(1000, lambda: self.extract_person_info_from_doc(doc_file, data['案本号']))
+            if reply == QMessageBox.Yes:
+                # 等待一小段时间确保Word完全关闭
+                from PyQt5.QtCore import QTimer
+                QTimer.singleShot(1000, lambda: self.extract_person_info_from_doc(doc_file, data['案本号']))
 
+        self.preview_document(doc_file, on_external=after_edit)
         return True
 
     def extract_person_info_from_doc(self, doc_file, case_number):
         """从Word文档中提取本人关键信息"""
         try:
-            from docx import Document
-            import json
+            from transcript_diff import read_transcript, extract_answers
 
             if not os.path.exists(doc_file):
                 return
 
-            doc = Document(doc_file)
+            texts, _ = read_transcript(doc_file)
+            extracted_info = extract_answers(texts)
 
-            # 要搜索的关键词
-            question_keywords = {
-                '受伤经过': ['什么工作原因', '事故发生', '具体经过'],
-                '就医情况': ['受伤后', '哪个医院', '是谁送你'],
-                '医疗结论': ['此次受伤', '医院对你', '医疗结论']
-            }
+            if extracted_info:
+                self.update_extracted_info_in_index(case_number, extracted_info)
 
-            extracted_info = {}
+        except Exception as e:
+            print(f"提取信息失败: {e}")
 
-            # 遍历所有段落，查找问题
-            for i, paragraph in enumerate(doc.paragraphs):
-                text = paragraph.text.strip()
-                if not text:
-                    continue
+    def latest_transcript(self, case_folder, case_number):
+        """案件最新的本人笔录（补充笔录优先，按序号取最后一份）"""
+        supplements = sorted(
+            filename for filename in self.fs.listdir(case_folder)
+            if filename.startswith(f"{case_number}_补充笔录") and filename.endswith('.docx')
+        )
+        if supplements:
+            return os.path.join(case_folder, supplements[-1])
+        return os.path.join(case_folder, f"{case_number}_笔录.docx")
+
+    def generate_supplement_transcript(self, case_folder, case_number):
+        """以最新一份笔录为底稿生成补充笔录，关闭Word后只更新有变化的问答"""
+        import shutil
+
+        previous_file = self.latest_transcript(case_folder, case_number)
+        number = 1
+        while True:
+            doc_file = os.path.join(case_folder, f"{case_number}_补充笔录{number:02d}.docx")
+            if not self.fs.exists(doc_file):
+                break
+            number += 1
 
-                for info_key, keywords in question_keywords.items():
-                    if info_key in extracted_info:
-                        continue
+        try:
+            shutil.copyfile(previous_file, doc_file)
+        except OSError as e:
+            self.statusBar().showMessage(f"生成补充笔录失败: {e}", 3000)
+            return False
+        self.fs.added(doc_file)
 
-                    match_count = 0
-                    for keyword in keywords:
-                        if keyword in text:
-                            match_count += 1
+        # 在外部编辑器中修改后，询问是否已关闭Word
+        def after_edit():
+            reply = QMessageBox.question(
+                self, '确认',
+                '请在关闭Word文档后点击"是"，程序将比对修改内容并更新关键信息\n\n点击"否"则跳过提取',
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.Yes
+            )
 
-                    if match_count >= 2:
-                        if i + 1 < len(doc.paragraphs):
-                            answer = doc.paragraphs[i + 1].text.strip()
-                            if answer.startswith('答：'):
-                                answer = answer[2:].strip()
-                            elif answer.startswith('答:'):
-                                answer = answer[1:].strip()
+            if reply == QMessageBox.Yes:
+                from PyQt5.QtCore import QTimer
+                QTimer.singleShot(1000, lambda: self.extract_changes_from_supplement(previous_file, doc_file, case_number))
 
-                            extracted_info[info_key] = answer
-                            break
+        self.preview_document(doc_file, on_external=after_edit)
+        return True
 
-            if extracted_info:
-                self.update_extracted_info_in_index(case_number, extracted_info)
+    def extract_changes_from_supplement(self, previous_file, doc_file, case_number):
+        """比对补充笔录与上一版本，只把有变化的问答写入索引"""
+        try:
+            from transcript_diff import changed_answers
+
+            changes = changed_answers(previous_file, doc_file)
+            if not changes:
+                self.statusBar().showMessage("补充笔录的关键信息没有变化", 3000)
+                return
+
+            self.case_index.update_person_info(case_number, changes)
+            self.statusBar().showMessage(f"已更新: {'、'.join(changes)}", 3000)
 
         except Exception as e:
-            print(f"提取信息失败: {e}")
+            print(f"比对补充笔录失败: {e}")
 
     def update_extracted_info_in_index(self, case_number, extracted_info):
         """只更新受伤经过、就医情况、医疗结论三个字段"""
-        index_file = os.path.join(os.path.dirname(__file__), "cases_index.json")
-
         try:
-            import json
-            with open(index_file, 'r', encoding='utf-8') as f:
-                index_data = json.load(f)
-
-            for case in index_data.get('cases', []):
-                if case['case_number'] == case_number:
-                    if 'person_info' in case:
-                        case['person_info']['受伤经过'] = extracted_info.get('受伤经过', '')
-                        case['person_info']['就医情况'] = extracted_info.get('就医情况', '')
-                        case['person_info']['医疗结论'] = extracted_info.get('医疗结论', '')
-                    break
-
-            with open(index_file, 'w', encoding='utf-8') as f:
-                json.dump(index_data, f, ensure_ascii=False, indent=2)
+            case = self.case_index.get(case_number)
+            if case and 'person_info' in case:
+                self.case_index.update_person_info(case_number, {
+                    '受伤经过': extracted_info.get('受伤经过', ''),
+                    '就医情况': extracted_info.get('就医情况', ''),
+                    '医疗结论': extracted_info.get('医疗结论', ''),
+                })
 
         except Exception as e:
             print(f"更新提取信息失败: {e}")
 
     def update_person_info_in_index(self, case_number, extracted_info):
         """在索引文件中更新本人的额外信息"""
-        index_file = os.path.join(os.path.dirname(__file__), "cases_index.json")
-
         try:
-            import json
-
-            if not os.path.exists(index_file):
+            if not self.case_index.exists():
                 self.statusBar().showMessage("索引文件不存在", 3000)
                 return
 
-            with open(index_file, 'r', encoding='utf-8') as f:
-                index_data = json.load(f)
-
-            # 查找对应的案本
-            updated = False
-            for case in index_data.get('cases', []):
-                if case['case_number'] == case_number:
-                    # 确保person_info存在
-                    if 'person_info' not in case:
-                        case['person_info'] = {}
-
-                    # 添加提取的信息
-                    case['person_info']['受伤经过'] = extracted_info.get('受伤经过', '')
-                    case['person_info']['就医情况'] = extracted_info.get('就医情况', '')
-                    case['person_info']['医疗结论'] = extracted_info.get('医疗结论', '')
-
-                    updated = True
-                    break
+            # 查找对应的案本并添加提取的信息
+            updated = self.case_index.update_person_info(case_number, {
+                '受伤经过': extracted_info.get('受伤经过', ''),
+                '就医情况': extracted_info.get('就医情况', ''),
+                '医疗结论': extracted_info.get('医疗结论', ''),
+            })
 
             if updated:
-                # 保存更新后的索引
-                with open(index_file, 'w', encoding='utf-8') as f:
-                    json.dump(index_data, f, ensure_ascii=False, indent=2)
                 print(f"已更新案本 {case_number} 的本人信息")
             else:
                 print(f"未找到案本 {case_number}")
@@ -1356,111 +2117,89 @@ class MainWindow(QMainWindow):
         """将案件类型问答句添加到文档中"""
         case_type = data['案件类型']
         if case_type != "普通案件":
-            questions = self.generate_case_questions(case_type, data)
-            if questions:
-                doc.add_paragraph()  # 空行
-                for q in questions:
-                    doc.add_paragraph(q)
+            add_questions(doc, self.generate_case_questions(case_type, data))
         return doc
 
-    def update_case_index(self, case_number, person_name, data):
-        index_file = os.path.join(os.path.dirname(__file__), "cases_index.json")
-
-        case_data = {
-            'case_number': case_number,
-            'person_name': person_name,
-            'case_type': data['案件类型'],
-            'year': datetime.now().year,
-            'folder_path': f"{datetime.now().year}/{case_number}",
-            'created_date': datetime.now().strftime('%Y-%m-%d'),
-            'employer': data.get('用人单位', ''),
-            'work_unit': data.get('用工单位', ''),
-            'workplace': data.get('工作场所', ''),
-            'regulation': data.get('条例', ''),
-            'operator': data.get('操作员', ''),
-            'person_info': {
-                'name': data.get('本人姓名', ''),
-                'gender': data.get('本人性别', ''),
-                'age': data.get('本人年龄', ''),
-                'phone': data.get('本人电话', ''),
-                'id_card': data.get('本人身份证号', ''),
-                'address': data.get('本人身份证地址', ''),
-                'current_address': data.get('本人现住址', ''),
-                'position': data.get('本人岗位', ''),
-                '自我介绍': data.get('自我介绍', ''),
-                '受伤经过': data.get('受伤经过', ''),
-                '就医情况': data.get('就医情况', ''),
-                '医疗结论': data.get('医疗结论', '')
-            },
-            'witnesses': [],
-            'legal_persons': []
-        }
+    def update_case_index(self, case_number, person_name, data, transcript=None):
+        """把表单数据写入索引"""
+        self.update_case_index_batch(case_number, person_name, [(data, transcript)])
 
+    def update_case_index_batch(self, case_number, person_name, entries):
+        """把一份或多份表单数据合并后一次写入索引
+        entries: [(表单数据, 笔录文件名)]
+        本人：新建案件（已有时保留立案信息、证人和提取的笔录信息）
+        证人/法人：加入已有案件的证人、法人列表，不改动案件其他信息
+        """
         try:
-            import json
-            if os.path.exists(index_file):
-                with open(index_file, 'r', encoding='utf-8') as f:
-                    index_data = json.load(f)
-            else:
-                index_data = {'cases': [], 'total_cases': 0, 'last_update': ''}
-
-            # 查找并更新
-            found = False
-            for i, existing_case in enumerate(index_data['cases']):
-                if existing_case['case_number'] == case_number:
-                    index_data['cases'][i] = case_data
-                    found = True
-                    break
-
-            if not found:
-                index_data['cases'].append(case_data)
+            existing = self.case_index.get(case_number)
+
+            for data, transcript in entries:
+                person_type = data.get('人员类型', "本人")
+                if person_type == "本人" or existing is None:
+                    case = CaseRecord.from_form(data)
+                    case.case_number = case_number
+                    case.person_name = person_name
+                    case.folder_path = f"{case.year}/{case_number}"
+                    if existing is not None:
+                        case.year = existing.year
+                        case.folder_path = existing.folder_path
+                        case.created_date = existing.created_date
+                        case.witnesses = existing.witnesses
+                        case.legal_persons = existing.legal_persons
+                        for attr in ('introduction', 'injury', 'treatment', 'conclusion'):
+                            if not getattr(case.person_info, attr):
+                                setattr(case.person_info, attr, getattr(existing.person_info, attr))
+                    if person_type != "本人":
+                        case.person_info = InjuredPerson()
+                else:
+                    case = existing.copy()
 
-            index_data['total_cases'] = len(index_data['cases'])
-            index_data['last_update'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                if person_type != "本人":
+                    person = person_from_form(data, person_type)
+                    person.transcript = transcript or ''
+                    case.add_person(person_type, person)
+                existing = case
 
-            with open(index_file, 'w', encoding='utf-8') as f:
-                json.dump(index_data, f, ensure_ascii=False, indent=2)
+            self.case_index.upsert(existing)
 
         except Exception as e:
             print(f"更新索引失败: {e}")
 
+    def case_folder_for(self, case_number):
+        """案件文件夹（不存在时创建）：已在索引中的案件用其所在文件夹（可能是往年），否则为当年新案件"""
+        case = self.case_index.get(case_number)
+        if case is not None and case.folder_path:
+            case_folder = os.path.join(self.base_dir, case.folder_path)
+        else:
+            case_folder = os.path.join(self.get_current_year_folder(), case_number)
+        self.fs.makedirs(case_folder)
+        return case_folder
+
     def get_current_year_folder(self):
         """获取当前年份的cases文件夹"""
         current_year = datetime.now().year
-        year_folder = os.path.join(os.path.dirname(__file__), str(current_year))
-        os.makedirs(year_folder, exist_ok=True)
+        year_folder = os.path.join(self.base_dir, str(current_year))
+        self.fs.makedirs(year_folder)
         return year_folder
 
     def generate_case_number(self, injured_name):
         """生成案本号：类型-姓名-序号（按年份）"""
         # 确定类型前缀
-        case_type = self.check_case_type()
-
-        if case_type == "普通案件":
-            prefix = "GS"  # 普通工伤
-        elif case_type == "个人案件":
-            prefix = "GR"  # 个人申请
-        elif case_type == "死亡案件":
-            prefix = "GSW"  # 工亡案件（单位申请）
-        elif case_type == "个人申请死亡案件":
-            prefix = "GRW"  # 个人申请工亡
-        else:
-            prefix = "GS"
+        prefix = case_number_prefix(self.check_case_type())
 
         # 使用年份文件夹
         year_folder = self.get_current_year_folder()
 
         # 计算下一个序号
         existing_numbers = []
-        if os.path.exists(year_folder):
-            for folder in os.listdir(year_folder):
-                # 匹配格式：前缀-姓名-数字
-                if folder.startswith(f"{prefix}-{injured_name}-"):
-                    try:
-                        num = int(folder.split('-')[-1])
-                        existing_numbers.append(num)
-                    except:
-                        continue
+        for folder in self.fs.listdir(year_folder):
+            # 匹配格式：前缀-姓名-数字
+            if folder.startswith(f"{prefix}-{injured_name}-"):
+                try:
+                    num = int(folder.split('-')[-1])
+                    existing_numbers.append(num)
+                except:
+                    continue
 
         # 生成新序号
         if existing_numbers:
@@ -1472,7 +2211,7 @@ class MainWindow(QMainWindow):
         return case_number
 
     def closeEvent(self, event):
-        """窗口关闭时最后保存一次"""
+        """窗口关闭时最后保存一次；驻留托盘时只隐藏窗口"""
         if self.checkBox_remember.isChecked():
             operator = self.lineEdit_operator.text().strip()
             api_url = self.lineEdit_api_url.text().strip()
@@ -1483,24 +2222,30 @@ class MainWindow(QMainWindow):
         settings = QSettings("WorkInjuryApp", "Window")
         settings.setValue("geometry", self.saveGeometry())
 
+        # 驻留托盘：只隐藏窗口，再次启动时直接显示
+        if self.tray is not None and not self.quitting:
+            self.hide()
+            event.ignore()
+            if not self.tray_hint_shown:
+                self.tray.showMessage("工伤案件管理系统", "程序仍在托盘中运行，右键托盘图标可退出")
+                self.tray_hint_shown = True
+            return
+
+        # 退出前把本地修改同步到共享目录
+        if self.sync_engine is not None:
+            self.sync_timer.stop()
+            if self.sync_worker is not None:
+                self.sync_worker.wait()
+            try:
+                self.on_synced(self.sync_engine.sync())
+            except Exception as e:
+                print(f"同步失败: {e}")
+
         event.accept()
 
     def insert_description_into_doc(self, doc, data):
         """将自我介绍插入到文档中（在指定问题后面插入）"""
-        description = self.generate_description(data)
-
-        # 查找目标段落
-        for i, paragraph in enumerate(doc.paragraphs):
-            if "问：请介绍一下你的姓名" in paragraph.text:
-                # 如果后面还有段落，在下一个段落前面插入
-                if i < len(doc.paragraphs) - 1:
-                    doc.paragraphs[i + 1].insert_paragraph_before(description)
-                else:
-                    # 如果是最后一个段落，直接在末尾添加
-                    doc.add_paragraph(description)
-                break
-
-        return doc
+        return insert_description(doc, self.generate_description(data))
 
     # 以下是测试程序，编程完成以后需要删除
     def keyPressEvent(self, event):
@@ -1633,34 +2378,57 @@ class MainWindow(QMainWindow):
         person_type = data['人员类型']  # 本人/证人/法人
         regulation = data.get('条例', '')  # 获取条例
 
-        # 条例到文件名的映射
-        regulation_map = {
-            "第十四条第一款第一项（普通工伤案件）": "普通工伤案件",
-            "第十四条第一款第二项（预备收尾案件）": "预备收尾案件",
-            "第十四条第一款第三项（暴力伤害案件）": "暴力伤害案件",
-            "第十四条第一款第四项（患职业病案件）": "患职业病案件",
-            "第十四条第一款第五项（因工外出案件）": "因工外出案件",
-            "第十四条第一款第六项（上下班时案件）": "上下班时案件",
-            "第十五条第一款第一项（工作时因病亡故案件）": "工作时因病亡故案件",
-            # 可以继续添加其他映射
-        }
-
         # 获取条例对应的案件类型，如果没有匹配则用"普通工伤案件"
-        case_type = regulation_map.get(regulation, "普通工伤案件")
+        case_type = regulation_name(regulation)
 
         # 生成模板名：人员类型 + 谈话笔录（ + 案件类型 + ）.docx
         template_name = f"{person_type}谈话笔录（{case_type}）.docx"
         return template_name
 
 
+def resolve_base_dir(config):
+    """返回 (数据目录, 同步引擎或None)，见 replica_sync.resolve_data_root"""
+    from replica_sync import resolve_data_root
+
+    return resolve_data_root(config.load_sync_config(), os.path.dirname(os.path.abspath(__file__)))
+
+
 def main():
+    # 命令行模式：python main.py <命令> ...
+    import cli
+    if len(sys.argv) > 1 and sys.argv[1] in cli.COMMANDS:
+        sys.exit(cli.run(sys.argv[1:]))
+
+    # 单实例：程序已在运行时把参数（如案本号）交给它，立即退出
+    from single_instance import InstanceServer, send_to_running
+    launch_args = sys.argv[1:]
+    if send_to_running(launch_args):
+        sys.exit(0)
+
     app = QApplication(sys.argv)
 
     app.setApplicationName("工伤案件管理系统")
     app.setOrganizationName("WorkInjuryApp")
 
-    window = MainWindow()
-    window.show()
+    # 尽早监听：启动期间再次启动的参数会排队，事件循环开始后处理
+    server = InstanceServer(app)
+    if not server.listen(launch_args):
+        sys.exit(0)  # 同时启动的另一个实例已在运行，参数已交给它
+
+    # 数据目录：配置了本地副本时读写本地副本，后台与共享目录同步
+    base_dir, sync_engine = resolve_base_dir(ConfigManager())
+
+    # 启动检查：索引等文件损坏时从上次备份恢复
+    integrity_messages = check_integrity(base_dir)
+    for message in integrity_messages:
+        print(message)
+
+    window = MainWindow(base_dir, sync_engine)
+    server.received.connect(window.handle_launch_args)
+    window.handle_launch_args(launch_args)
+
+    if integrity_messages:
+        QMessageBox.warning(window, "数据检查", "\n".join(integrity_messages))
 
     sys.exit(app.exec_())
 
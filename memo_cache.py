@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结果缓存 - 按规范化后的输入字段缓存计算结果
+
+- 内存中按最近使用（LRU）保留固定数量
+- 指定 cache_dir 时同时写入磁盘，程序重启后仍可命中
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from atomic_io import atomic_write_json
+
+
+_MISSING = object()
+
+
+def normalize_value(value):
+    """规范化输入：字符串去首尾空白，None 视为空字符串"""
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (list, tuple)):
+        return [normalize_value(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): normalize_value(v) for k, v in value.items()}
+    return value
+
+
+def make_key(*parts):
+    """由输入字段生成缓存键（sha256），字段顺序和空白不影响结果"""
+    content = json.dumps(normalize_value(list(parts)), ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class MemoCache:
+    """LRU内存缓存 + 可选的磁盘缓存"""
+
+    def __init__(self, maxsize=256, cache_dir=None):
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return _MISSING
+        path = self._path(key)
+        if not os.path.exists(path):
+            return _MISSING
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)['value']
+        except Exception as e:
+            print(f"读取缓存失败 {path}: {e}")
+            return _MISSING
+
+    def _write_disk(self, key, value):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        try:
+            atomic_write_json(path, {'value': value})
+        except Exception as e:
+            print(f"写入缓存失败 {path}: {e}")
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def get(self, key, default=None):
+        """先查内存再查磁盘，磁盘命中的结果放回内存"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+        value = self._read_disk(key)
+        with self._lock:
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._remember(key, value)
+            return value
+
+    def set(self, key, value):
+        """保存结果（值需可JSON序列化才能写入磁盘）"""
+        with self._lock:
+            self._remember(key, value)
+        self._write_disk(key, value)
+
+    def get_or_compute(self, key, compute):
+        """有缓存时直接返回，否则调用 compute() 计算并保存"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        """清空内存缓存（磁盘文件保留）"""
+        with self._lock:
+            self._memory.clear()
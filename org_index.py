@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+单位反向索引 - 规范化的单位名称 -> 涉及的案件（作为用人单位、用工单位或工作场所）
+
+按年份缓存到 org_index_cache.json，索引更新时增量调整；查询不需要加载案件分区。
+"""
+
+from collections import Counter
+
+from org_names import canonical_key
+from partition_cache import PartitionCache
+
+
+# (案件字段, 显示名)
+ROLES = (
+    ('employer', '用人单位'),
+    ('work_unit', '用工单位'),
+    ('workplace', '工作场所'),
+)
+ROLE_TITLES = dict(ROLES)
+
+
+def case_orgs(case):
+    """案件涉及的单位 {规范名称: {角色: 原始名称}}"""
+    orgs = {}
+    for role, _ in ROLES:
+        raw = (case.get(role, '') or '').strip()
+        normalized = canonical_key(raw)
+        if normalized:
+            orgs.setdefault(normalized, {})[role] = raw
+    return orgs
+
+
+class OrgIndex(PartitionCache):
+    """单位反向索引
+
+    每年的数据为 {规范名称: {案本号: {'roles': {角色: 原始名称}, 'person_name', 'created_date', 'case_type'}}}
+    """
+
+    # 2: 键改用 canonical_key（统一组织形式）
+    CACHE_VERSION = 2
+
+    def build_year(self, cases):
+        data = {}
+        for case in cases:
+            self.apply_case(data, case, 1)
+        return data
+
+    def apply_case(self, data, case, delta):
+        case_number = case['case_number']
+        for normalized, roles in case_orgs(case).items():
+            if delta > 0:
+                data.setdefault(normalized, {})[case_number] = {
+                    'roles': roles,
+                    'person_name': case.get('person_name', ''),
+                    'created_date': case.get('created_date', ''),
+                    'case_type': case.get('case_type', ''),
+                }
+            else:
+                entries = data.get(normalized)
+                if entries is not None:
+                    entries.pop(case_number, None)
+                    if not entries:
+                        del data[normalized]
+
+    def cases_for(self, name, years=None, roles=None):
+        """某单位涉及的案件（立案日期从新到旧）
+        返回 [{'case_number', 'year', 'roles', 'person_name', 'created_date', 'case_type'}, ...]
+        """
+        normalized = canonical_key(name)
+        if not normalized:
+            return []
+
+        result = []
+        for year, data in self.year_data(years):
+            for case_number, entry in data.get(normalized, {}).items():
+                if roles and not set(roles) & set(entry['roles']):
+                    continue
+                result.append(dict(entry, case_number=case_number, year=year))
+        result.sort(key=lambda entry: (entry['created_date'], entry['case_number']), reverse=True)
+        return result
+
+    def cases_with_name(self, text, role='employer', years=None):
+        """某角色的单位原始名称包含 text（不区分大小写）的案件
+        返回 (案本号集合, {年份: 分区文件标记})，调用方据标记判断结果是否与索引一致
+        """
+        text = text.lower()
+        matched = {}  # 原始名称 -> 是否包含，同一写法只比较一次
+        case_numbers = set()
+        stamps = {}
+        for year, stamp, data in self.year_entries(years):
+            stamps[year] = stamp
+            for entries in data.values():
+                for case_number, entry in entries.items():
+                    raw = entry['roles'].get(role)
+                    if raw is None:
+                        continue
+                    hit = matched.get(raw)
+                    if hit is None:
+                        hit = matched[raw] = text in raw.lower()
+                    if hit:
+                        case_numbers.add(case_number)
+        return case_numbers, stamps
+
+    def repeat_orgs(self, min_cases=2, years=None, role='employer'):
+        """涉及案件数不少于 min_cases 的单位（按案件数从多到少）
+        返回 [{'name', 'normalized', 'count', 'first_date', 'last_date', 'years'}, ...]
+        """
+        stats = {}
+        for year, data in self.year_data(years):
+            for normalized, entries in data.items():
+                for entry in entries.values():
+                    if role not in entry['roles']:
+                        continue
+                    item = stats.setdefault(normalized, {'names': Counter(), 'dates': [], 'years': set()})
+                    item['names'][entry['roles'][role]] += 1
+                    item['dates'].append(entry['created_date'])
+                    item['years'].add(year)
+
+        result = []
+        for normalized, item in stats.items():
+            count = len(item['dates'])
+            if count < min_cases:
+                continue
+            dates = sorted(date for date in item['dates'] if date)
+            result.append({
+                'name': item['names'].most_common(1)[0][0],  # 最常用的写法
+                'normalized': normalized,
+                'count': count,
+                'first_date': dates[0] if dates else '',
+                'last_date': dates[-1] if dates else '',
+                'years': sorted(item['years']),
+            })
+        result.sort(key=lambda item: (-item['count'], item['normalized']))
+        return result
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+单位名称规范化与查重 - 同一单位的不同写法归为同一个名称
+
+- normalize_org_name: 全角/半角、空格、括号统一，用于索引和比较
+- canonical_key: 在此基础上统一组织形式（有限责任公司 -> 有限公司 等），相同即视为同一单位
+- find_similar_pairs: 字符二元组 Jaccard 相似度连接，按稀有度取前缀分块，十万级名称可用
+- find_duplicate_groups: 以上两步合并为重复组，供汇总表查重和合并
+"""
+
+import re
+import math
+import unicodedata
+from collections import Counter, defaultdict
+
+
+_WHITESPACE = re.compile(r'\s+')
+
+# 不影响单位身份的标点
+_PUNCTUATION = re.compile(r'[·・.,，。、:：;；\'"“”‘’\-—_/\\]')
+
+# 组织形式的同义写法 -> 统一写法（按顺序替换）
+LEGAL_FORM_SYNONYMS = (
+    ('有限责任公司', '有限公司'),
+    ('股份有限公司', '股份公司'),
+    ('有限公司公司', '有限公司'),
+    ('集团有限公司', '集团公司'),
+)
+
+
+def normalize_org_name(name):
+    """单位名称的规范形式，用于比较和建立索引（不用于显示）"""
+    if not name:
+        return ''
+    # NFKC 把全角字母数字和全角括号（）转换为半角
+    name = unicodedata.normalize('NFKC', str(name))
+    name = _WHITESPACE.sub('', name)
+    name = name.replace('〔', '(').replace('〕', ')').replace('[', '(').replace(']', ')')
+    return name.upper()
+
+
+def canonical_key(name):
+    """判断是否为同一单位的键：规范形式 + 去标点 + 统一组织形式"""
+    key = _PUNCTUATION.sub('', normalize_org_name(name))
+    for variant, canonical in LEGAL_FORM_SYNONYMS:
+        key = key.replace(variant, canonical)
+    return key
+
+
+class NameSet:
+    """按 canonical_key 判断是否已有的名称集合"""
+
+    def __init__(self, names=()):
+        self._by_key = {}
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def __contains__(self, name):
+        return canonical_key(name) in self._by_key
+
+    def existing(self, name):
+        """同一单位已有的写法，没有时返回None"""
+        return self._by_key.get(canonical_key(name))
+
+    def add(self, name):
+        """加入名称（已有同一单位时保留原写法），返回是否为新单位"""
+        key = canonical_key(name)
+        if not key or key in self._by_key:
+            return False
+        self._by_key[key] = name
+        return True
+
+
+def _grams(key, n=2):
+    if len(key) <= n:
+        return {key}
+    return {key[i:i + n] for i in range(len(key) - n + 1)}
+
+
+def find_similar_pairs(keys, threshold=0.8, n=2):
+    """找出 Jaccard 相似度不低于 threshold 的键对 [(i, j, 相似度), ...]
+
+    每个键的二元组按全局出现次数从少到多排序，只用前缀建立倒排索引：
+    相似度 >= t 的两个集合在各自前 |x| - ceil(t*|x|) + 1 个元素中必有一个相同。
+    常见的"有限公司"等二元组排在后面，不会产生大量候选。
+    """
+    gram_sets = [_grams(key, n) for key in keys]
+    frequency = Counter(gram for grams in gram_sets for gram in grams)
+    ordered = [sorted(grams, key=lambda gram: (frequency[gram], gram)) for grams in gram_sets]
+
+    # 按集合大小处理，只与更小或相等的集合比较，配合长度过滤
+    order = sorted(range(len(keys)), key=lambda i: len(ordered[i]))
+    index = defaultdict(list)
+    pairs = []
+
+    for i in order:
+        grams = ordered[i]
+        size = len(grams)
+        prefix = size - math.ceil(threshold * size) + 1
+        min_size = threshold * size
+
+        candidates = set()
+        for gram in grams[:prefix]:
+            for j in index[gram]:
+                if len(ordered[j]) >= min_size:
+                    candidates.add(j)
+
+        for j in candidates:
+            common = len(gram_sets[i] & gram_sets[j])
+            similarity = common / (len(gram_sets[i]) + len(gram_sets[j]) - common)
+            if similarity >= threshold:
+                pairs.append((j, i, similarity))
+
+        for gram in grams[:prefix]:
+            index[gram].append(i)
+
+    return pairs
+
+
+def find_duplicate_groups(names, threshold=0.8):
+    """找出疑似同一单位的名称组 [[名称, ...], ...]，组内按原顺序，第一个为建议保留的写法"""
+    # 第一步：canonical_key 相同的为同一组
+    key_members = {}
+    for position, name in enumerate(names):
+        key = canonical_key(name)
+        if key:
+            key_members.setdefault(key, []).append(position)
+    keys = list(key_members)
+
+    # 第二步：不同的键之间按相似度合并（并查集）
+    parent = list(range(len(keys)))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j, _ in find_similar_pairs(keys, threshold):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[root_j] = root_i
+
+    grouped = defaultdict(list)
+    for k, key in enumerate(keys):
+        grouped[find(k)].extend(key_members[key])
+
+    groups = sorted(sorted(positions) for positions in grouped.values() if len(positions) > 1)
+    return [[names[p] for p in positions] for positions in groups]
+
+
+# ---------- 名称汇总表 ----------
+
+# (列名, 文件名)
+NAME_LISTS = (
+    ('用人单位', '用人单位名称汇总.xlsx'),
+    ('用工单位', '用工单位名称汇总.xlsx'),
+    ('工作场所', '工作场所名称汇总.xlsx'),
+)
+
+
+def read_name_list(filepath, header=None):
+    """读取汇总表第一列的名称（跳过表头），filepath 也可以是文件对象"""
+    from openpyxl import load_workbook
+
+    names = []
+    wb = load_workbook(filepath, read_only=True)
+    try:
+        for row in wb.active.iter_rows(max_col=1, values_only=True):
+            value = str(row[0]).strip() if row and row[0] is not None else ''
+            if value and value != header:
+                names.append(value)
+    finally:
+        wb.close()
+    return names
+
+
+def merge_name_list(filepath, header, groups):
+    """合并汇总表中的重复名称：每组只保留第一个写法（位置不变），返回删除的行数"""
+    from atomic_io import atomic_save
+
+    keeper = {name: group[0] for group in groups for name in group}
+    if not keeper:
+        return 0
+
+    names = read_name_list(filepath, header)
+    written = []
+    seen = set()
+    for name in names:
+        name = keeper.get(name, name)
+        if name not in seen:
+            seen.add(name)
+            written.append(name)
+    atomic_save(name_list_workbook(header, written), filepath, snapshot=True)
+    return len(names) - len(written)
+
+
+def name_list_workbook(header, names):
+    """由名称列表生成汇总表（只写模式，第一行为表头）"""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("汇总表")
+    ws.append([header])
+    for name in names:
+        ws.append([name])
+    return wb
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分区缓存 - 按年份缓存由案件索引计算出的数据（统计汇总、反向索引等）
+
+- 每个年份的数据按分区文件的修改时间和大小判断是否过期，过期才重新计算
+- 索引新增或替换案件时增量调整，写入前缓存已过期的年份留到下次使用时重新计算
+- 可选保存到磁盘，重启后往年数据无需加载分区即可使用
+"""
+
+import os
+import json
+import threading
+
+from atomic_io import atomic_write_json
+
+
+class PartitionCache:
+    """按年份分区的派生数据缓存，子类实现 build_year / apply_case / dump_year / load_year"""
+
+    # 数据格式或计算规则变化时加1，旧缓存作废
+    CACHE_VERSION = 1
+
+    def __init__(self, case_index, cache_file=None):
+        self.case_index = case_index
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+        self._years = {}  # 年份 -> {'stamp': 分区文件标记, 'data': 数据}
+        self._load_cache()
+        case_index.add_listener(self.on_cases_changed)
+
+    # ---------- 子类实现 ----------
+
+    def build_year(self, cases):
+        """由一个年份的全部案件计算数据"""
+        raise NotImplementedError
+
+    def apply_case(self, data, case, delta):
+        """把一个案件加入（delta=1）或移出（delta=-1）数据"""
+        raise NotImplementedError
+
+    def dump_year(self, data):
+        """数据转换为可保存为 JSON 的形式"""
+        return data
+
+    def load_year(self, raw):
+        return raw
+
+    # ---------- 缓存 ----------
+
+    def _load_cache(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                content = json.load(f)
+            if content.get('version', 1) != self.CACHE_VERSION:
+                return
+            for year, entry in content.get('years', {}).items():
+                self._years[year] = {'stamp': entry['stamp'], 'data': self.load_year(entry['data'])}
+        except Exception as e:
+            print(f"读取缓存失败 {self.cache_file}: {e}")
+            self._years = {}
+
+    def _save_cache(self):
+        if not self.cache_file:
+            return
+        content = {'version': self.CACHE_VERSION, 'years': {
+            year: {'stamp': entry['stamp'], 'data': self.dump_year(entry['data'])}
+            for year, entry in self._years.items()
+        }}
+        try:
+            atomic_write_json(self.cache_file, content, compact=True)
+        except OSError as e:
+            print(f"保存缓存失败 {self.cache_file}: {e}")
+
+    def _year_data(self, year):
+        """某年份的数据，分区文件变化后重新计算；返回 (数据, 是否重新计算)"""
+        stamp = self.case_index.partition_stamp(year)
+        entry = self._years.get(year)
+        if entry is not None and entry['stamp'] == stamp:
+            return entry['data'], False
+
+        data = self.build_year(self.case_index.cases(year) if stamp else [])
+        self._years[year] = {'stamp': stamp, 'data': data}
+        return data, True
+
+    def year_data(self, years=None):
+        """指定年份（默认全部）的数据 [(年份, 数据), ...]，从新到旧"""
+        return [(year, data) for year, _, data in self.year_entries(years)]
+
+    def year_entries(self, years=None):
+        """同 year_data，同时给出数据对应的分区文件标记 [(年份, 标记, 数据), ...]"""
+        with self._lock:
+            years = [str(y) for y in years] if years else self.case_index.years()
+            result = []
+            changed = False
+            for year in sorted(years, reverse=True):
+                data, rebuilt = self._year_data(year)
+                result.append((year, self._years[year]['stamp'], data))
+                changed = changed or rebuilt
+            if changed:
+                self._save_cache()
+            return result
+
+    def on_cases_changed(self, changes, previous_stamps):
+        """索引新增或替换案件后增量调整
+        只调整写入前与缓存一致的年份，其余年份下次使用时重新计算
+        """
+        from case_index import case_year
+
+        with self._lock:
+            affected = set()
+            for old_case, new_case in changes:
+                for case, delta in ((old_case, -1), (new_case, 1)):
+                    if case is None:
+                        continue
+                    year = case_year(case)
+                    entry = self._years.get(year)
+                    if entry is None or entry['stamp'] != previous_stamps.get(year):
+                        continue
+                    self.apply_case(entry['data'], case, delta)
+                    affected.add(year)
+
+            for year in affected:
+                self._years[year]['stamp'] = self.case_index.partition_stamp(year)
+            if affected:
+                self._save_cache()
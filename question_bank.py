@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+问答句题库 - 从 questions/ 目录的数据文件加载，按 案件类型/条例/人员类型 查找
+
+数据文件格式（每个文件一个案件类型，"*" 表示适用于全部）:
+{
+  "case_type": "个人案件",
+  "sets": [
+    {"regulation": "*", "person_type": "*", "questions": ["问：...{受伤职工}...", "答：..."]}
+  ]
+}
+条例使用简称，如 "普通工伤案件"、"上下班时案件"。
+"""
+
+import os
+import re
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+WILDCARD = "*"
+
+FIELD_PATTERN = re.compile(r'\{([^{}]+)\}')
+
+
+def compile_question(text):
+    """把问答句拆成 (文字, 字段名) 片段，渲染时不再解析"""
+    segments = []
+    fields = []
+    pos = 0
+    for match in FIELD_PATTERN.finditer(text):
+        if match.start() > pos:
+            segments.append((text[pos:match.start()], None))
+        segments.append((match.group(0), match.group(1)))
+        fields.append(match.group(1))
+        pos = match.end()
+    if pos < len(text):
+        segments.append((text[pos:], None))
+    return tuple(segments), fields
+
+
+class QuestionBank:
+    """问答句题库 - 数据文件编译成索引后缓存，文件变化时自动重新编译"""
+
+    def __init__(self, question_dir, render_cache_size=256, check_interval=2.0):
+        self.question_dir = question_dir
+        self.check_interval = check_interval  # 检查数据文件变化的最短间隔（秒）
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._checked_at = None
+        self._index = {}      # (案件类型, 条例, 人员类型) -> (编译后的问答句, 用到的字段)
+        self._resolved = {}   # 查询键 -> 匹配到的索引键（含通配符回退）
+        self._rendered = OrderedDict()
+        self._render_cache_size = render_cache_size
+
+    def _dir_stamp(self):
+        """数据目录中所有文件的名称、修改时间和大小"""
+        if not os.path.isdir(self.question_dir):
+            return ()
+        stamp = []
+        for entry in os.scandir(self.question_dir):
+            if entry.name.endswith('.json'):
+                stat = entry.stat()
+                stamp.append((entry.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(sorted(stamp))
+
+    def _compile(self):
+        """加载并编译全部数据文件"""
+        index = {}
+        if not os.path.isdir(self.question_dir):
+            return index
+
+        for filename in sorted(os.listdir(self.question_dir)):
+            if not filename.endswith('.json'):
+                continue
+            filepath = os.path.join(self.question_dir, filename)
+            try:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    content = json.load(f)
+            except Exception as e:
+                print(f"读取题库失败 {filepath}: {e}")
+                continue
+
+            case_type = content.get('case_type', WILDCARD)
+            for question_set in content.get('sets', []):
+                key = (
+                    case_type,
+                    question_set.get('regulation', WILDCARD),
+                    question_set.get('person_type', WILDCARD),
+                )
+                compiled = [compile_question(q) for q in question_set.get('questions', [])]
+                fields = sorted({field for _, qf in compiled for field in qf})
+                index[key] = ([segments for segments, _ in compiled], fields)
+        return index
+
+    def _ensure_compiled(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+
+        stamp = self._dir_stamp()
+        if stamp != self._stamp:
+            self._index = self._compile()
+            self._resolved = {}
+            self._rendered.clear()
+            self._stamp = stamp
+
+    def _resolve(self, case_type, regulation, person_type):
+        """按从具体到通用的顺序查找问答句集"""
+        query = (case_type, regulation, person_type)
+        if query in self._resolved:
+            return self._resolved[query]
+
+        found = None
+        for key in (
+            (case_type, regulation, person_type),
+            (case_type, regulation, WILDCARD),
+            (case_type, WILDCARD, person_type),
+            (case_type, WILDCARD, WILDCARD),
+        ):
+            if key in self._index:
+                found = key
+                break
+
+        self._resolved[query] = found
+        return found
+
+    def questions(self, case_type, regulation, person_type, data):
+        """返回渲染后的问答句列表，没有对应题目时返回空列表"""
+        with self._lock:
+            self._ensure_compiled()
+            key = self._resolve(case_type, regulation, person_type)
+            if key is None:
+                return []
+
+            compiled, fields = self._index[key]
+            values = tuple(None if data.get(field) is None else str(data[field]) for field in fields)
+
+            # 同一次生成中重复调用时直接返回上次结果
+            render_key = (key, values)
+            rendered = self._rendered.get(render_key)
+            if rendered is not None:
+                self._rendered.move_to_end(render_key)
+                return list(rendered)
+
+            # 数据中没有的字段保留原样，便于发现题库写错的字段名
+            field_values = dict(zip(fields, values))
+            rendered = tuple(
+                ''.join(text if field is None or field_values[field] is None else field_values[field]
+                        for text, field in segments)
+                for segments in compiled
+            )
+
+            self._rendered[render_key] = rendered
+            if len(self._rendered) > self._render_cache_size:
+                self._rendered.popitem(last=False)
+
+            return list(rendered)
+
+
+_default_bank = None
+
+
+def default_bank():
+    """程序目录下 questions/ 的题库（全局共用一个）"""
+    global _default_bank
+    if _default_bank is None:
+        _default_bank = QuestionBank(os.path.join(os.path.dirname(os.path.abspath(__file__)), "questions"))
+    return _default_bank
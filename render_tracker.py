@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成记录 - 记录每份生成文书所用模板和输入的哈希，只重新生成过期的文书
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+from datetime import datetime
+
+from atomic_io import atomic_write_json
+from document_renderer import CASE_DOCUMENTS, DocumentRenderer, build_case_placeholders, iter_paragraphs
+from transcript_content import transcript_content
+
+
+# 每次生成都会变化的字段，不参与比较
+VOLATILE_FIELDS = {'当前日期', '当前时间'}
+
+# 自我介绍和问答句不是占位符，用固定键参与哈希
+DESCRIPTION_KEY = '#自我介绍'
+QUESTIONS_KEY = '#问答句'
+
+# 笔录表单字段 <- 索引字段，用于按最新案件数据刷新笔录输入
+CASE_FIELD_MAP = {
+    '受伤职工': 'person_name',
+    '用人单位': 'employer',
+    '用工单位': 'work_unit',
+    '工作场所': 'workplace',
+    '条例': 'regulation',
+    '案件类型': 'case_type',
+}
+PERSON_FIELD_MAP = {
+    '本人姓名': 'name',
+    '本人性别': 'gender',
+    '本人年龄': 'age',
+    '本人电话': 'phone',
+    '本人身份证号': 'id_card',
+    '本人身份证地址': 'address',
+    '本人现住址': 'current_address',
+    '本人岗位': 'position',
+}
+
+PLACEHOLDER_PATTERN = re.compile(r'\{([^{}]+)\}')
+
+
+def sha256_bytes(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def sha256_file(filepath):
+    """分块计算文件哈希"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_inputs(values):
+    """对输入字段计算稳定的哈希"""
+    content = json.dumps(values, ensure_ascii=False, sort_keys=True, default=str)
+    return sha256_bytes(content.encode('utf-8'))
+
+
+def refresh_transcript_data(data, case_data):
+    """用索引中的最新案件数据覆盖笔录的表单输入（只覆盖非空值）"""
+    data = dict(data)
+    if not case_data:
+        return data
+
+    for form_key, index_key in CASE_FIELD_MAP.items():
+        value = case_data.get(index_key)
+        if value:
+            data[form_key] = value
+
+    if data.get('人员类型') == "本人":
+        person_info = case_data.get('person_info', {})
+        for form_key, index_key in PERSON_FIELD_MAP.items():
+            value = person_info.get(index_key)
+            if value:
+                data[form_key] = str(value)
+
+    return data
+
+
+class RenderTracker:
+    """生成记录 - 保存在 generated_files.json，键为相对基础目录的文件路径"""
+
+    def __init__(self, base_dir, templates):
+        self.base_dir = base_dir
+        self.template_dir = os.path.join(base_dir, "templates")
+        self.manifest_file = os.path.join(base_dir, "generated_files.json")
+        self.templates = templates  # 与渲染器共用的模板缓存
+        self._lock = threading.RLock()
+        self._entries = None
+        self._stamp = None  # 读取时的文件修改时间和大小，文件被外部替换（如同步）后重新读取
+        self._template_fields = {}  # 模板哈希 -> 模板中的占位符集合
+
+    # ---------- 记录 ----------
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.manifest_file)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _load(self):
+        stamp = self._file_stamp()
+        if self._entries is None or stamp != self._stamp:
+            self._entries = {}
+            if stamp is not None:
+                try:
+                    with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                        self._entries = json.load(f).get('files', {})
+                except Exception as e:
+                    print(f"读取生成记录失败: {e}")
+            self._stamp = stamp
+        return self._entries
+
+    def _save(self):
+        atomic_write_json(self.manifest_file, {'files': self._entries}, indent=2, snapshot=True)
+        self._stamp = self._file_stamp()
+
+    def relative_path(self, filepath):
+        return os.path.relpath(filepath, self.base_dir).replace(os.sep, '/')
+
+    def entries(self):
+        """全部生成记录 {相对路径: 记录}"""
+        with self._lock:
+            return dict(self._load())
+
+    def template_hash(self, template_name):
+        return self.templates.get_hash(os.path.join(self.template_dir, template_name))
+
+    def template_fields(self, template_name):
+        """模板中出现的占位符名称（按模板哈希缓存）"""
+        template_hash = self.template_hash(template_name)
+        with self._lock:
+            fields = self._template_fields.get(template_hash)
+        if fields is None:
+            doc = self.templates.open(os.path.join(self.template_dir, template_name))
+            fields = set()
+            for paragraph in iter_paragraphs(doc):
+                fields.update(PLACEHOLDER_PATTERN.findall(paragraph.text))
+            with self._lock:
+                self._template_fields[template_hash] = fields
+        return fields
+
+    def used_inputs(self, template_name, values, extra=None):
+        """只保留模板实际用到的输入字段"""
+        fields = self.template_fields(template_name)
+        used = {key: str(value) for key, value in values.items()
+                if key in fields and key not in VOLATILE_FIELDS}
+        if extra:
+            used.update(extra)
+        return used
+
+    def record(self, filepath, entry):
+        """保存一条生成记录"""
+        self.record_many([(filepath, entry)])
+
+    def record_many(self, items):
+        """保存多条生成记录 [(文件路径, 记录)]，只写回一次文件"""
+        generated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        for filepath, entry in items:
+            entry['output_hash'] = sha256_file(filepath)
+            entry['generated_at'] = generated_at
+        with self._lock:
+            entries = self._load()
+            for filepath, entry in items:
+                entries[self.relative_path(filepath)] = entry
+            self._save()
+
+    def case_document_entry(self, doc_type, case_data):
+        """案件文书（审批表、告知书等）的生成记录"""
+        template_name, _ = CASE_DOCUMENTS[doc_type]
+        inputs = self.used_inputs(template_name, build_case_placeholders(case_data))
+        return {
+            'kind': 'case_document',
+            'doc_type': doc_type,
+            'case_number': case_data['case_number'],
+            'template': template_name,
+            'template_hash': self.template_hash(template_name),
+            'inputs_hash': hash_inputs(inputs),
+        }
+
+    def record_case_document(self, filepath, doc_type, case_data):
+        """记录案件文书"""
+        self.record(filepath, self.case_document_entry(doc_type, case_data))
+
+    def transcript_inputs(self, template_name, data):
+        placeholders, description, questions = transcript_content(data)
+        return self.used_inputs(template_name, placeholders, {
+            DESCRIPTION_KEY: description or '',
+            QUESTIONS_KEY: '\n'.join(questions),
+        })
+
+    def transcript_entry(self, template_name, data):
+        """笔录的生成记录，同时保存表单数据以便重新生成"""
+        return {
+            'kind': 'transcript',
+            'case_number': data.get('案本号', ''),
+            'template': template_name,
+            'template_hash': self.template_hash(template_name),
+            'inputs_hash': hash_inputs(self.transcript_inputs(template_name, data)),
+            'data': {key: str(value) for key, value in data.items()},
+        }
+
+    def record_transcript(self, filepath, template_name, data):
+        """记录笔录"""
+        self.record(filepath, self.transcript_entry(template_name, data))
+
+    # ---------- 过期检查 ----------
+
+    def check_entry(self, rel_path, entry, case_index):
+        """检查一条记录
+        返回: None 表示最新；否则返回 dict {path, reason, edited, ...}
+        """
+        filepath = os.path.join(self.base_dir, rel_path)
+        template_name = entry['template']
+        template_path = os.path.join(self.template_dir, template_name)
+
+        if not os.path.exists(template_path):
+            return None  # 模板已删除，无法重新生成
+
+        case_data = case_index.get(entry.get('case_number', ''))
+        reasons = []
+
+        if self.template_hash(template_name) != entry.get('template_hash'):
+            reasons.append("模板已修改")
+
+        if entry['kind'] == 'case_document':
+            if not case_data:
+                return None
+            inputs = self.used_inputs(template_name, build_case_placeholders(case_data))
+            data = None
+        else:
+            data = refresh_transcript_data(entry.get('data', {}), case_data)
+            inputs = self.transcript_inputs(template_name, data)
+
+        if hash_inputs(inputs) != entry.get('inputs_hash'):
+            reasons.append("案件数据已修改")
+
+        missing = not os.path.exists(filepath)
+        if missing:
+            reasons.append("文件不存在")
+
+        if not reasons:
+            return None
+
+        # 生成后被手工修改过的文件默认不覆盖
+        edited = not missing and sha256_file(filepath) != entry.get('output_hash')
+
+        return {
+            'path': rel_path,
+            'reason': "、".join(reasons),
+            'edited': edited,
+            'entry': entry,
+            'case_data': case_data,
+            'data': data,
+        }
+
+    def find_stale(self, case_index, year=None):
+        """查找过期的文书，year 可限定年份"""
+        stale = []
+        for rel_path, entry in sorted(self.entries().items()):
+            if year and not rel_path.startswith(f"{year}/"):
+                continue
+            try:
+                item = self.check_entry(rel_path, entry, case_index)
+            except Exception as e:
+                print(f"检查生成记录失败 {rel_path}: {e}")
+                continue
+            if item:
+                stale.append(item)
+        return stale
+
+
+def create_tracked_renderer(base_dir):
+    """创建带生成记录的文书渲染器"""
+    renderer = DocumentRenderer(base_dir)
+    renderer.tracker = RenderTracker(base_dir, renderer.templates)
+    return renderer
+
+
+def regenerate_stale(renderer, case_index, year=None, force=False, dry_run=False, progress=None):
+    """重新生成过期的文书
+    force: 覆盖生成后被手工修改过的文件
+    返回: dict {regenerated: [路径], skipped: [路径], errors: {路径: 错误}, stale: [检查结果]}
+    """
+    tracker = renderer.tracker
+    stale = tracker.find_stale(case_index, year)
+    result = {'regenerated': [], 'skipped': [], 'errors': {}, 'stale': stale}
+
+    for i, item in enumerate(stale, 1):
+        if progress:
+            progress(i, len(stale))
+
+        if item['edited'] and not force:
+            result['skipped'].append(item['path'])
+            continue
+        if dry_run:
+            continue
+
+        entry = item['entry']
+        filepath = os.path.join(tracker.base_dir, item['path'])
+        try:
+            if entry['kind'] == 'case_document':
+                renderer.render_case_document(entry['doc_type'], item['case_data'], filepath)
+            else:
+                renderer.render_transcript(entry['template'], item['data'], filepath)
+            result['regenerated'].append(item['path'])
+        except Exception as e:
+            result['errors'][item['path']] = str(e)
+
+    return result
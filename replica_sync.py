@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地副本同步 - 共享目录（SMB）较慢时，程序只读写本地副本，后台与共享目录双向同步
+
+- 同步范围：年份文件夹、模板、索引分区（cases_index/*.json）、名称汇总表、生成记录；
+  索引清单、快照和各类缓存由两边各自生成，不同步
+- 本地副本的 .sync/state.json 记录上次同步时每个文件的哈希和两边的修改时间/大小，
+  修改时间和大小没变的文件不重新计算哈希
+- 按"上次同步时的内容"三方比较：只有一边改了就复制过去，两边都删了就忘掉
+- 两边都改了：索引分区按案件、汇总表按名称、生成记录按文件合并，同一案件两边都改时以共享目录为准，
+  本地的版本存入 .sync/conflicts/；其他文件以共享目录为准，本地的版本另存为"原名.冲突-时间"
+- 复制前再检查目标文件，扫描后被修改过的留到下次同步
+"""
+
+import io
+import os
+import json
+import shutil
+import threading
+from contextlib import nullcontext
+from datetime import datetime
+
+from atomic_io import TEMP_SUFFIX, BACKUP_SUFFIX, atomic_write, atomic_write_json
+from case_index import INDEX_DIR, MANIFEST_NAME
+from dedup_store import SKIP_PREFIXES, SKIP_SUFFIXES, iter_store_roots
+from org_names import NAME_LISTS
+from render_tracker import sha256_file
+
+
+SYNC_DIR = ".sync"
+STATE_NAME = "state.json"
+CONFLICT_LOG = "conflicts.log"
+TRACKER_FILE = "generated_files.json"
+
+_MISSING = object()
+
+
+def _stamp(path):
+    """文件的修改时间和大小，不存在时为None"""
+    try:
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size]
+    except FileNotFoundError:
+        return None
+
+
+def _skipped(filename):
+    return (filename.startswith(SKIP_PREFIXES) or filename.endswith(SKIP_SUFFIXES)
+            or filename.endswith(TEMP_SUFFIX) or filename.endswith(BACKUP_SUFFIX))
+
+
+def scan_tree(root):
+    """同步范围内的文件 {相对路径: [修改时间, 大小]}"""
+    files = {}
+
+    def walk(dirpath, prefix):
+        with os.scandir(dirpath) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    walk(entry.path, prefix + entry.name + '/')
+                elif entry.is_file() and not _skipped(entry.name):
+                    stat = entry.stat()
+                    files[prefix + entry.name] = [stat.st_mtime_ns, stat.st_size]
+
+    if not os.path.isdir(root):
+        return files
+    for folder in iter_store_roots(root):
+        walk(folder, os.path.basename(folder) + '/')
+
+    index_dir = os.path.join(root, INDEX_DIR)
+    if os.path.isdir(index_dir):
+        for name in os.listdir(index_dir):
+            if name.endswith('.json') and name != MANIFEST_NAME and not _skipped(name):
+                files[f"{INDEX_DIR}/{name}"] = _stamp(os.path.join(index_dir, name))
+
+    for name in [filename for _, filename in NAME_LISTS] + [TRACKER_FILE]:
+        stamp = _stamp(os.path.join(root, name))
+        if stamp is not None:
+            files[name] = stamp
+    return {path: stamp for path, stamp in files.items() if stamp is not None}
+
+
+# ---------- 合并 ----------
+
+def merge_keyed(base, local, remote):
+    """三方合并两个 {键: 值}：只有一边改的取改动，两边改得不同时以 remote 为准
+    （remote 删了而 local 改了时保留 local）。返回 (合并结果, 冲突的键)，顺序以 remote 为主
+    """
+    merged = {}
+    conflicts = []
+    for key in list(remote) + [key for key in local if key not in remote]:
+        b = base.get(key, _MISSING)
+        l = local.get(key, _MISSING)
+        r = remote.get(key, _MISSING)
+        if l == r or l == b:
+            value = r
+        elif r == b:
+            value = l
+        else:
+            conflicts.append(key)
+            value = l if r is _MISSING else r
+        if value is not _MISSING:
+            merged[key] = value
+    # 两边都没有、只在上次同步时存在的键已被删除，不需要处理
+    return merged, conflicts
+
+
+def merge_case_partition(base, local, remote):
+    """按案本号合并索引分区，返回 (内容, 冲突说明, 被覆盖的本地案件)"""
+    def cases_of(data):
+        if data is None:
+            return {}
+        return {case['case_number']: case for case in json.loads(data).get('cases', [])}
+
+    local_cases = cases_of(local)
+    merged, conflicts = merge_keyed(cases_of(base), local_cases, cases_of(remote))
+
+    content = json.loads(remote)
+    content['cases'] = list(merged.values())
+    content['total_cases'] = len(merged)
+    content['last_update'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    if content.get('sealed'):
+        data = json.dumps(content, ensure_ascii=False, separators=(',', ':'))
+    else:
+        data = json.dumps(content, ensure_ascii=False, indent=2)
+
+    notes = [f"案件 {number} 两边都有修改，已采用共享目录的版本" for number in conflicts]
+    overwritten = [local_cases[number] for number in conflicts if number in local_cases]
+    return data.encode('utf-8'), notes, overwritten
+
+
+def merge_tracker(base, local, remote):
+    """按文件路径合并生成记录"""
+    def files_of(data):
+        return json.loads(data).get('files', {}) if data is not None else {}
+
+    merged, conflicts = merge_keyed(files_of(base), files_of(local), files_of(remote))
+    data = json.dumps({'files': merged}, ensure_ascii=False, indent=2).encode('utf-8')
+    notes = [f"生成记录 {path} 两边都有修改，已采用共享目录的版本" for path in conflicts]
+    return data, notes, []
+
+
+def merge_name_list_bytes(header, base, local, remote):
+    """合并名称汇总表：以共享目录的顺序为准，加上本地新增的名称，去掉本地删除的名称"""
+    from org_names import read_name_list, name_list_workbook
+
+    def names_of(data):
+        return read_name_list(io.BytesIO(data), header) if data is not None else []
+
+    base_names = set(names_of(base))
+    local_names = names_of(local)
+    local_set = set(local_names)
+    deleted = base_names - local_set
+
+    names = [name for name in names_of(remote) if name not in deleted]
+    present = set(names)
+    for name in local_names:
+        if name not in base_names and name not in present:
+            names.append(name)
+            present.add(name)
+
+    output = io.BytesIO()
+    name_list_workbook(header, names).save(output)
+    return output.getvalue(), [], []
+
+
+def merger_for(relpath):
+    """可按内容合并的文件返回合并函数 f(base, local, remote) -> (内容, 冲突说明, 被覆盖的记录)"""
+    if relpath.startswith(INDEX_DIR + '/'):
+        return merge_case_partition
+    if relpath == TRACKER_FILE:
+        return merge_tracker
+    for header, filename in NAME_LISTS:
+        if relpath == filename:
+            return lambda base, local, remote: merge_name_list_bytes(header, base, local, remote)
+    return None
+
+
+# ---------- 同步 ----------
+
+class _Changed(Exception):
+    """扫描后文件又被修改，留到下次同步"""
+
+
+class SyncEngine:
+    """本地副本与共享目录的双向同步；local_index 为程序正在使用的本地 CaseIndex（可选）"""
+
+    def __init__(self, local_root, remote_root, local_index=None):
+        self.local_root = local_root
+        self.remote_root = remote_root
+        self.local_index = local_index
+        self.sync_dir = os.path.join(local_root, SYNC_DIR)
+        self.state_file = os.path.join(self.sync_dir, STATE_NAME)
+        self._lock = threading.Lock()
+
+    def initialized(self):
+        """是否已完成过首次同步"""
+        return os.path.exists(self.state_file)
+
+    def _path(self, root, relpath):
+        return os.path.join(root, *relpath.split('/'))
+
+    def _base_copy(self, relpath):
+        return os.path.join(self.sync_dir, 'base', *relpath.split('/'))
+
+    # ---------- 状态 ----------
+
+    def _load_state(self):
+        if not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('files', {})
+        except Exception as e:
+            print(f"读取同步状态失败，按首次同步处理: {e}")
+            return {}
+
+    def _save_state(self, state):
+        atomic_write_json(self.state_file, {
+            'remote_root': self.remote_root,
+            'last_sync': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'files': state,
+        }, compact=True)
+
+    def _hash(self, root, relpath, stamp, entry, side):
+        """文件哈希：修改时间和大小与上次同步时相同则直接用记录的哈希"""
+        if stamp is None:
+            return None
+        if entry and entry.get(side) == stamp:
+            return entry['hash']
+        return sha256_file(self._path(root, relpath))
+
+    def _record(self, state, relpath, sha):
+        """记录同步后的状态；可合并的文件另存一份内容，供下次三方合并"""
+        local_path = self._path(self.local_root, relpath)
+        state[relpath] = {
+            'hash': sha,
+            'local': _stamp(local_path),
+            'remote': _stamp(self._path(self.remote_root, relpath)),
+        }
+        if merger_for(relpath):
+            base_copy = self._base_copy(relpath)
+            os.makedirs(os.path.dirname(base_copy), exist_ok=True)
+            shutil.copyfile(local_path, base_copy)
+
+    def _forget(self, state, relpath):
+        state.pop(relpath, None)
+        base_copy = self._base_copy(relpath)
+        if os.path.exists(base_copy):
+            os.remove(base_copy)
+
+    # ---------- 文件操作 ----------
+
+    def _guard(self, root, relpath):
+        """写本地索引分区时持有索引的锁，避免与程序同时写"""
+        if root == self.local_root and self.local_index is not None and relpath.startswith(INDEX_DIR + '/'):
+            return self.local_index.lock
+        return nullcontext()
+
+    def _check(self, path, expected):
+        if _stamp(path) != expected:
+            raise _Changed(path)
+
+    def _copy(self, relpath, source_root, target_root, source_stamp, target_stamp):
+        source = self._path(source_root, relpath)
+        target = self._path(target_root, relpath)
+        with self._guard(target_root, relpath):
+            self._check(source, source_stamp)
+            self._check(target, target_stamp)
+            with open(source, 'rb') as src:
+                atomic_write(target, lambda f: shutil.copyfileobj(src, f, 1024 * 1024))
+
+    def _delete(self, relpath, root, stamp):
+        path = self._path(root, relpath)
+        with self._guard(root, relpath):
+            self._check(path, stamp)
+            os.remove(path)
+
+    def _write(self, relpath, root, data, stamp):
+        path = self._path(root, relpath)
+        with self._guard(root, relpath):
+            self._check(path, stamp)
+            atomic_write(path, lambda f: f.write(data))
+
+    def _read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    # ---------- 同步 ----------
+
+    def sync(self):
+        """同步一次，返回 dict {pulled, pushed, merged, deleted, conflicts, skipped, errors}"""
+        with self._lock:
+            result = {'pulled': [], 'pushed': [], 'merged': [], 'deleted': [],
+                      'conflicts': [], 'skipped': [], 'errors': {}}
+            if not os.path.isdir(self.remote_root):
+                result['errors'][self.remote_root] = "共享目录不可用"
+                return result
+
+            state = self._load_state()
+            local = scan_tree(self.local_root)
+            remote = scan_tree(self.remote_root)
+
+            for relpath in sorted(set(local) | set(remote) | set(state)):
+                try:
+                    self._sync_file(relpath, local.get(relpath), remote.get(relpath), state, result)
+                except _Changed:
+                    result['skipped'].append(relpath)
+                except Exception as e:
+                    result['errors'][relpath] = str(e)
+
+            os.makedirs(self.sync_dir, exist_ok=True)
+            self._save_state(state)
+            self._log_conflicts(result['conflicts'])
+            self._refresh_manifests(result)
+            return result
+
+    def _sync_file(self, relpath, local_stamp, remote_stamp, state, result):
+        entry = state.get(relpath)
+        base = entry['hash'] if entry else None
+        local = self._hash(self.local_root, relpath, local_stamp, entry, 'local')
+        remote = self._hash(self.remote_root, relpath, remote_stamp, entry, 'remote')
+
+        if local == remote:
+            if local is None:
+                self._forget(state, relpath)
+            elif entry is None or entry['local'] != local_stamp or entry['remote'] != remote_stamp:
+                self._record(state, relpath, local)
+            return
+
+        if local == base:
+            self._pull(relpath, local_stamp, remote_stamp, remote, state, result)
+        elif remote == base:
+            self._push(relpath, local_stamp, remote_stamp, local, state, result)
+        elif local is None or remote is None:
+            # 一边删除、另一边修改：保留修改后的文件
+            result['conflicts'].append((relpath, "一边删除、另一边修改，已保留修改后的文件"))
+            if local is None:
+                self._pull(relpath, local_stamp, remote_stamp, remote, state, result)
+            else:
+                self._push(relpath, local_stamp, remote_stamp, local, state, result)
+        elif merger_for(relpath):
+            self._merge(relpath, local_stamp, remote_stamp, base, state, result)
+        else:
+            self._keep_remote(relpath, local_stamp, remote_stamp, remote, state, result)
+
+    def _pull(self, relpath, local_stamp, remote_stamp, remote, state, result):
+        if remote is None:
+            self._delete(relpath, self.local_root, local_stamp)
+            self._forget(state, relpath)
+            result['deleted'].append(relpath)
+        else:
+            self._copy(relpath, self.remote_root, self.local_root, remote_stamp, local_stamp)
+            self._record(state, relpath, remote)
+            result['pulled'].append(relpath)
+
+    def _push(self, relpath, local_stamp, remote_stamp, local, state, result):
+        if local is None:
+            self._delete(relpath, self.remote_root, remote_stamp)
+            self._forget(state, relpath)
+            result['deleted'].append(relpath)
+        else:
+            self._copy(relpath, self.local_root, self.remote_root, local_stamp, remote_stamp)
+            self._record(state, relpath, local)
+            result['pushed'].append(relpath)
+
+    def _merge(self, relpath, local_stamp, remote_stamp, base, state, result):
+        """两边都改过的索引分区、汇总表、生成记录：按内容合并后写回两边"""
+        base_copy = self._base_copy(relpath)
+        base_data = self._read(base_copy) if base and os.path.exists(base_copy) else None
+        local_data = self._read(self._path(self.local_root, relpath))
+        remote_data = self._read(self._path(self.remote_root, relpath))
+
+        data, notes, overwritten = merger_for(relpath)(base_data, local_data, remote_data)
+        self._write(relpath, self.remote_root, data, remote_stamp)
+        self._write(relpath, self.local_root, data, local_stamp)
+        self._record(state, relpath, sha256_file(self._path(self.local_root, relpath)))
+        result['merged'].append(relpath)
+        result['conflicts'].extend((relpath, note) for note in notes)
+        if overwritten:
+            # 被共享目录版本覆盖的本地案件另存，需要时可手工找回
+            stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+            path = os.path.join(self.sync_dir, 'conflicts', f"{stamp}-{os.path.basename(relpath)}")
+            atomic_write_json(path, {'source': relpath, 'cases': overwritten}, indent=2)
+
+    def _keep_remote(self, relpath, local_stamp, remote_stamp, remote, state, result):
+        """其他文件两边都改过：以共享目录为准，本地的版本另存为冲突副本（下次同步时上传）"""
+        local_path = self._path(self.local_root, relpath)
+        stem, ext = os.path.splitext(local_path)
+        conflict_path = f"{stem}.冲突-{datetime.now().strftime('%Y%m%d-%H%M%S')}{ext}"
+        self._check(local_path, local_stamp)
+        shutil.copy2(local_path, conflict_path)
+        self._copy(relpath, self.remote_root, self.local_root, remote_stamp, local_stamp)
+        self._record(state, relpath, remote)
+        result['pulled'].append(relpath)
+        result['conflicts'].append((relpath, f"两边都有修改，已采用共享目录的版本，本地版本另存为 "
+                                             f"{os.path.basename(conflict_path)}"))
+
+    def _log_conflicts(self, conflicts):
+        if not conflicts:
+            return
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with open(os.path.join(self.sync_dir, CONFLICT_LOG), 'a', encoding='utf-8') as f:
+            for relpath, note in conflicts:
+                f.write(f"{now}\t{relpath}\t{note}\n")
+
+    def _refresh_manifests(self, result):
+        """索引分区变化后，更新对应一边的索引清单"""
+        from case_index import CaseIndex
+
+        def years(paths):
+            prefix = INDEX_DIR + '/'
+            return sorted({path[len(prefix):-len('.json')] for path in paths
+                           if path.startswith(prefix) and path[len(prefix):-len('.json')].isdigit()})
+
+        deleted = years(result['deleted'])
+        merged = years(result['merged'])
+        local_years = sorted(set(years(result['pulled']) + merged + deleted))
+        remote_years = sorted(set(years(result['pushed']) + merged + deleted))
+        try:
+            if local_years:
+                (self.local_index or CaseIndex(self.local_root)).refresh_manifest(local_years)
+            if remote_years:
+                CaseIndex(self.remote_root).refresh_manifest(remote_years)
+        except Exception as e:
+            result['errors'][INDEX_DIR] = f"更新索引清单失败: {e}"
+
+
+def resolve_data_root(sync_config, app_dir):
+    """数据目录，界面和命令行共用：返回 (数据目录, 同步引擎或None)
+    没有配置本地副本时直接使用共享目录（未单独配置时为程序所在目录）；本地副本首次使用时先完整下载一次
+    """
+    share_root = sync_config['share_root'] or app_dir
+    local_root = sync_config['local_root']
+    if not local_root:
+        return share_root, None
+
+    os.makedirs(local_root, exist_ok=True)
+    engine = SyncEngine(local_root, share_root)
+    if not engine.initialized():
+        print(f"首次使用本地副本，正在从 {engine.remote_root} 下载...")
+        result = engine.sync()
+        if result['errors'] and not engine.initialized():
+            # 共享目录不可用且本地还没有数据，只能直接使用共享目录
+            print(f"本地副本初始化失败，直接使用共享目录: {result['errors']}")
+            return share_root, None
+    return local_root, engine
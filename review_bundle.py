@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+案审会材料合订 - 多个案件的审批表合并为一个文档
+"""
+
+import os
+import shutil
+import subprocess
+import zipfile
+
+from docx.oxml.ns import qn
+from lxml import etree
+
+from atomic_io import atomic_write
+from document_renderer import CASE_DOCUMENTS, build_case_placeholders, replace_placeholders
+from docx_writer import copy_member_raw
+
+
+DOCUMENT_PART = 'word/document.xml'
+
+# 案件之间的分页符
+PAGE_BREAK = b'<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+
+def select_cases(case_index, start_date=None, end_date=None, case_numbers=None):
+    """按立案日期范围或案本号列表挑选案件
+    日期格式与索引一致：YYYY-MM-DD；指定案本号列表时按列表顺序返回
+    按日期挑选时只加载日期范围内的年份
+    """
+    if case_numbers:
+        selected = []
+        for case_number in case_numbers:
+            case = case_index.get(case_number)
+            if case:
+                selected.append(case)
+        return selected
+
+    # 案件按立案年份分区，立案日期的前四位即年份
+    years = [year for year in case_index.years()
+             if (not start_date or year >= start_date[:4]) and (not end_date or year <= end_date[:4])]
+    selected = []
+    for case in (case for year in years for case in case_index.cases(year)):
+        created = case.get('created_date', '')
+        if start_date and created < start_date:
+            continue
+        if end_date and created > end_date:
+            continue
+        selected.append(case)
+
+    selected.sort(key=lambda case: (case.get('created_date', ''), case['case_number']))
+    return selected
+
+
+def _split_document_xml(document_xml):
+    """把模板正文拆成 body 之前、body 结尾（分节属性）两段"""
+    body_tag = b'<w:body>'
+    body_start = document_xml.index(body_tag) + len(body_tag)
+
+    root = etree.fromstring(document_xml)
+    sect_pr = root.find(qn('w:body')).find(qn('w:sectPr'))
+    tail = b''
+    if sect_pr is not None:
+        tail = etree.tostring(sect_pr)
+
+    return document_xml[:body_start], tail + b'</w:body></w:document>'
+
+
+def _render_body(renderer, template_path, case_data):
+    """渲染一个案件，只返回正文内容的XML"""
+    doc = renderer.templates.open(template_path)
+    replace_placeholders(doc, build_case_placeholders(case_data))
+
+    parts = []
+    for child in doc.element.body:
+        if child.tag != qn('w:sectPr'):
+            parts.append(etree.tostring(child))
+    return b''.join(parts)
+
+
+def write_bundle(renderer, cases, output_path, doc_type="案件审批表", progress=None):
+    """把多个案件的文书流式写入一个docx
+    每个案件渲染完即写出并释放，内存中同时只有一个案件的文档
+    progress: 可选回调 progress(已完成数, 总数)
+    返回: 写入的案件数
+    """
+    template_name, _ = CASE_DOCUMENTS[doc_type]
+    template_path = renderer.template_path(template_name)
+    if not os.path.exists(template_path):
+        raise FileNotFoundError(f"模板不存在: {template_name}")
+
+    total = len(cases)
+    written = 0
+
+    def write(f):
+        nonlocal written
+        with zipfile.ZipFile(template_path) as source, \
+                zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED) as output:
+
+            # 1. 原样复制模板中除正文外的所有部件（样式、编号、图片等，不重新压缩）
+            for info in source.infolist():
+                if info.filename != DOCUMENT_PART:
+                    copy_member_raw(source, info, output)
+
+            head, tail = _split_document_xml(source.read(DOCUMENT_PART))
+
+            # 2. 正文流式写入：逐个案件渲染、写出、释放
+            with output.open(DOCUMENT_PART, 'w', force_zip64=True) as stream:
+                stream.write(head)
+
+                for case_data in cases:
+                    if written:
+                        stream.write(PAGE_BREAK)
+                    stream.write(_render_body(renderer, template_path, case_data))
+                    written += 1
+
+                    if progress:
+                        progress(written, total)
+
+                stream.write(tail)
+
+    # 写完整个文件后才替换目标，中途出错时原文件不变
+    atomic_write(output_path, write)
+    return written
+
+
+def convert_to_pdf(docx_path):
+    """使用LibreOffice把docx转换为PDF，未安装时返回None"""
+    soffice = shutil.which('soffice') or shutil.which('libreoffice')
+    if not soffice:
+        return None
+
+    out_dir = os.path.dirname(os.path.abspath(docx_path))
+    subprocess.run(
+        [soffice, '--headless', '--convert-to', 'pdf', '--outdir', out_dir, docx_path],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    pdf_path = os.path.splitext(docx_path)[0] + '.pdf'
+    return pdf_path if os.path.exists(pdf_path) else None
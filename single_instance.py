@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+单实例 - 程序已在运行时，再次启动只把参数交给正在运行的程序，然后立即退出
+
+- 正在运行的程序通过 QLocalServer 监听（每个系统用户一个名称）
+- 再次启动时用 QLocalSocket 连接，发送一行 JSON {"args": [...]}，收到 "ok" 即完成
+- 监听失败时先再连接一次（可能有同时启动的另一个实例刚开始监听），
+  仍连接不上才清除上次异常退出留下的监听名称
+"""
+
+import json
+import getpass
+
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
+
+
+def server_name():
+    """本机当前用户的监听名称"""
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = "default"
+    return f"WorkInjuryApp-{user}"
+
+
+def send_to_running(args, timeout=500):
+    """把参数交给正在运行的程序：成功返回True，没有正在运行的程序返回False"""
+    socket = QLocalSocket()
+    socket.connectToServer(server_name())
+    if not socket.waitForConnected(timeout):
+        return False
+
+    socket.write((json.dumps({'args': list(args)}, ensure_ascii=False) + "\n").encode('utf-8'))
+    socket.waitForBytesWritten(timeout)
+    if not socket.waitForReadyRead(timeout * 4):
+        print("正在运行的程序没有响应")
+    socket.disconnectFromServer()
+    return True
+
+
+class InstanceServer(QObject):
+    """接收再次启动时传来的参数"""
+
+    # 启动参数列表
+    received = pyqtSignal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self._on_new_connection)
+
+    def listen(self, args=()):
+        """开始监听
+        返回 False 表示同时启动的另一个实例已在监听，args 已交给它，本程序应退出；
+        其他情况返回 True（监听失败时不再保证单实例，但程序照常运行）
+        """
+        name = server_name()
+        if self.server.listen(name):
+            return True
+        # 名称被占用：先确认是否有实例在监听，连接不上才是上次异常退出留下的
+        if send_to_running(args):
+            return False
+        QLocalServer.removeServer(name)
+        if self.server.listen(name):
+            return True
+        print(f"单实例监听失败: {self.server.errorString()}")
+        return True
+
+    def _on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            socket.readyRead.connect(lambda socket=socket: self._on_ready_read(socket))
+            socket.disconnected.connect(socket.deleteLater)
+            # 启动期间排队的连接，数据可能在事件循环开始前就已到达
+            self._on_ready_read(socket)
+
+    def _on_ready_read(self, socket):
+        while socket.canReadLine():
+            line = bytes(socket.readLine()).decode('utf-8').strip()
+            if not line:
+                continue
+            try:
+                args = json.loads(line).get('args', [])
+            except ValueError as e:
+                print(f"启动参数无效: {e}")
+                continue
+            socket.write(b"ok\n")
+            socket.flush()
+            self.received.emit(args)
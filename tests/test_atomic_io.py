@@ -0,0 +1,110 @@
+"""原子写入的重试判断和临时文件清理"""
+
+import errno
+import os
+import time
+
+import pytest
+
+import atomic_io
+from atomic_io import TEMP_SUFFIX, _is_sharing_violation, _retry, atomic_write_json, remove_stale_temp_files
+
+
+def winerror(code):
+    error = PermissionError(errno.EACCES, 'locked')
+    error.winerror = code
+    return error
+
+
+def test_only_sharing_violations_are_retried():
+    assert _is_sharing_violation(winerror(32))
+    assert _is_sharing_violation(winerror(5))   # 被 Word 打开时 MoveFileEx 的错误
+    assert not _is_sharing_violation(winerror(2))
+    assert _is_sharing_violation(OSError(errno.EBUSY, 'busy'))
+    assert not _is_sharing_violation(PermissionError(errno.EACCES, 'read-only'))
+    assert not _is_sharing_violation(PermissionError(errno.EPERM, 'not permitted'))
+
+
+def test_only_old_temp_files_are_removed(tmp_path):
+    old = tmp_path / f".index.json.1234{TEMP_SUFFIX}"
+    fresh = tmp_path / f".index.json.5678{TEMP_SUFFIX}"
+    old.write_text('{')
+    fresh.write_text('{')
+    stale = time.time() - 7200
+    os.utime(old, (stale, stale))
+
+    assert remove_stale_temp_files(str(tmp_path), max_age=3600) == 1
+    assert not old.exists()
+    assert fresh.exists()
+
+
+def test_atomic_write_json_leaves_no_temp_file(tmp_path):
+    path = tmp_path / 'state.json'
+    atomic_write_json(str(path), {'名称': '值'})
+
+    assert path.read_text(encoding='utf-8') == '{"名称": "值"}'
+    assert os.listdir(tmp_path) == ['state.json']
+
+
+def test_concurrent_writers_to_one_file_use_separate_temp_files(tmp_path):
+    import json
+    import threading
+
+    path = tmp_path / 'memo.json'
+    errors = []
+
+    def write(n):
+        try:
+            for _ in range(20):
+                atomic_write_json(str(path), {'value': 'x' * n * 1000})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(1, 6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(json.loads(path.read_text(encoding='utf-8'))['value']) % 1000 == 0
+    assert os.listdir(tmp_path) == ['memo.json']
+
+
+def test_retry_waits_out_a_locked_target(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(atomic_io.time, 'sleep', sleeps.append)
+    attempts = []
+
+    def replace():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise winerror(5)
+        return 'done'
+
+    assert _retry(replace, retries=5, backoff=0.1) == 'done'
+    assert sleeps == [0.1, 0.2]
+
+
+def test_retry_gives_up_after_the_last_attempt(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(atomic_io.time, 'sleep', sleeps.append)
+
+    def replace():
+        raise winerror(32)
+
+    with pytest.raises(PermissionError):
+        _retry(replace, retries=2, backoff=0.1)
+    assert sleeps == [0.1, 0.2]
+
+
+def test_retry_does_not_wait_for_other_errors(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(atomic_io.time, 'sleep', sleeps.append)
+
+    def replace():
+        raise PermissionError(errno.EACCES, 'read-only')
+
+    with pytest.raises(PermissionError):
+        _retry(replace, retries=5, backoff=0.1)
+    assert sleeps == []
@@ -0,0 +1,95 @@
+"""导入案件包时的路径检查"""
+
+import os
+
+import pytest
+
+from case_archive import CASES_PREFIX, ArchiveError, _target_path
+
+
+@pytest.mark.parametrize('rel_path', [
+    '', '/etc/passwd', '../outside.docx', '2026/../../outside.docx', '2026\\..\\outside.docx',
+    'C:/Windows/win.ini', 'C:outside.docx', '2026//a.docx', './2026/a.docx',
+])
+def test_rejects_paths_outside_data_dir(tmp_path, rel_path):
+    with pytest.raises(ArchiveError):
+        _target_path(str(tmp_path), CASES_PREFIX + rel_path)
+
+
+def test_rejects_symlink_escaping_data_dir(tmp_path):
+    base_dir = tmp_path / 'data'
+    outside = tmp_path / 'outside'
+    base_dir.mkdir()
+    outside.mkdir()
+    os.symlink(outside, base_dir / '2026')
+
+    with pytest.raises(ArchiveError):
+        _target_path(str(base_dir), CASES_PREFIX + '2026/GS-张三-001/a.docx')
+
+
+def test_accepts_case_file(tmp_path):
+    target = _target_path(str(tmp_path), CASES_PREFIX + '2026/GS-张三-001/a.docx')
+    assert target == os.path.join(os.path.realpath(tmp_path), '2026', 'GS-张三-001', 'a.docx')
+
+
+def make_bundle(path, cases, files):
+    """手工写出归档包：cases 为索引条目，files 为 {包内路径: (案本号, 内容)}"""
+    import hashlib
+    import json
+    import zipfile
+    from case_archive import INDEX_NAME, MANIFEST_NAME
+
+    manifest = {'format': 'case-archive', 'version': 1, 'cases': [c.get('case_number') for c in cases],
+                'files': {}}
+    with zipfile.ZipFile(path, 'w') as zf:
+        for arcname, (case_number, data) in files.items():
+            zf.writestr(arcname, data)
+            manifest['files'][arcname] = {'sha256': hashlib.sha256(data).hexdigest(), 'size': len(data),
+                                          'case_number': case_number}
+        zf.writestr(INDEX_NAME, json.dumps({'cases': cases}, ensure_ascii=False))
+        zf.writestr(MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False))
+    return str(path)
+
+
+@pytest.mark.parametrize('case', [
+    {'case_number': '../evil', 'year': '2026'},
+    {'case_number': 'GS/张三/001', 'year': '2026'},
+    {'case_number': 'GS-张三-001', 'year': '2026', 'folder_path': '../../x'},
+    {'case_number': 'GS-张三-001', 'year': '2026', 'folder_path': '/tmp/x'},
+    {'case_number': 'GS-张三-001', 'year': '2026', 'folder_path': '2026/其他案件'},
+])
+def test_hostile_index_record_is_not_imported(tmp_path, case):
+    from case_archive import import_bundle
+    from case_index import CaseIndex
+
+    base_dir = tmp_path / 'data'
+    base_dir.mkdir()
+    bundle = make_bundle(tmp_path / 'in.zip', [case], {
+        CASES_PREFIX + '2026/GS-张三-001/a.docx': (case['case_number'], b'data'),
+    })
+    case_index = CaseIndex(str(base_dir), current_year=2026)
+
+    result = import_bundle(str(base_dir), bundle, case_index)
+
+    assert result['imported'] == []
+    assert list(result['errors']) == [case['case_number']]
+    assert case_index.cases() == []
+    assert not (base_dir / '2026').exists()
+
+
+def test_missing_folder_path_is_rebuilt_from_year_and_case_number(tmp_path):
+    from case_archive import import_bundle
+    from case_index import CaseIndex
+
+    base_dir = tmp_path / 'data'
+    base_dir.mkdir()
+    bundle = make_bundle(tmp_path / 'in.zip', [{'case_number': 'GS-张三-001', 'year': '2026'}], {
+        CASES_PREFIX + '2026/GS-张三-001/a.docx': ('GS-张三-001', b'data'),
+    })
+    case_index = CaseIndex(str(base_dir), current_year=2026)
+
+    result = import_bundle(str(base_dir), bundle, case_index)
+
+    assert result['imported'] == ['GS-张三-001']
+    assert case_index.get('GS-张三-001').folder_path == '2026/GS-张三-001'
+    assert (base_dir / '2026' / 'GS-张三-001' / 'a.docx').read_bytes() == b'data'
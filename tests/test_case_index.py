@@ -0,0 +1,81 @@
+"""案件浏览查询：筛选结果与逐个比较的结果一致，索引更新后不返回过期的缓存"""
+
+import random
+
+import pytest
+
+from case_index import QUERY_FIELDS, CaseIndex
+from org_index import OrgIndex
+
+NAMES = ['张三', '张三丰', '李四', '王五', '赵六']
+EMPLOYERS = ['甲建筑有限责任公司', '甲建筑有限公司', '乙物流（集团）', '丙商贸', '']
+
+
+def make_cases(count, seed=1):
+    rng = random.Random(seed)
+    cases = []
+    for i in range(count):
+        name = rng.choice(NAMES)
+        year = rng.choice(['2025', '2026'])
+        cases.append({
+            'case_number': f'GS-{name}-{i:03d}',
+            'person_name': name,
+            'employer': rng.choice(EMPLOYERS),
+            'regulation': rng.choice(['第十四条', '第十五条']),
+            'operator': rng.choice(['甲', '乙']),
+            'year': year,
+            'folder_path': f'{year}/GS-{name}-{i:03d}',
+            'created_date': f'{year}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}',
+        })
+    return cases
+
+
+def expected(index, filters, text, year=None):
+    cases = [case for case in index.query(year=year)]
+    result = []
+    for case in cases:
+        if any(value.lower() not in str(getattr(case, field) or '').lower() for field, value in filters.items()):
+            continue
+        if text and not any(text.lower() in str(getattr(case, field) or '').lower() for field in QUERY_FIELDS):
+            continue
+        result.append(case.case_number)
+    return result
+
+
+@pytest.fixture
+def indexes(tmp_path):
+    case_index = CaseIndex(str(tmp_path), current_year=2026)
+    case_index.upsert_many(make_cases(120))
+    return case_index, OrgIndex(case_index)
+
+
+@pytest.mark.parametrize('filters, text, year', [
+    ({'person_name': '张三'}, '', None),
+    ({'employer': '甲建筑'}, '', None),
+    ({'employer': '有限责任'}, '', '2025'),
+    ({'person_name': '张', 'employer': '物流'}, '', None),
+    ({'employer': '丙'}, '十五', None),
+    ({}, '李四', '2026'),
+])
+def test_query_matches_full_scan(indexes, filters, text, year):
+    case_index, org_index = indexes
+    want = expected(case_index, filters, text, year)
+    assert want
+
+    for org in (None, org_index):
+        got = case_index.query(filters, text, year=year, org_index=org)
+        assert [case.case_number for case in got] == want
+        assert len(got) == len(want)
+        assert [case.case_number for case in got[:3]] == want[:3]
+
+
+def test_cached_filter_is_refreshed_after_upsert(indexes):
+    case_index, org_index = indexes
+    filters = {'employer': '丁制造'}
+    assert len(case_index.query(filters, org_index=org_index)) == 0
+
+    case = dict(make_cases(1, seed=7)[0], case_number='GS-新人-001', person_name='新人', employer='丁制造厂')
+    case_index.upsert(case)
+
+    assert [c.case_number for c in case_index.query(filters, org_index=org_index)] == ['GS-新人-001']
+    assert [c.case_number for c in case_index.query({'person_name': '新人'})] == ['GS-新人-001']
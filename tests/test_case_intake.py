@@ -0,0 +1,192 @@
+"""申请表批量立案：身份证校验、申请表解析、查重编号和失败时撤销"""
+
+import os
+from datetime import datetime
+
+import pytest
+
+import case_intake
+from case_index import CaseIndex
+from case_intake import (check_id_card, commit_intake, id_card_info, normalize_id_card,
+                         parse_docx, parse_folder, parse_xlsx, prepare_intake)
+
+
+VALID_MALE = '440308199901011234'
+VALID_FEMALE = '11010519491231002X'
+
+
+def with_check_code(first17):
+    """补上校验位"""
+    total = sum(int(digit) * weight for digit, weight in zip(first17, case_intake._ID_WEIGHTS))
+    return first17 + case_intake._ID_CHECK_CODES[total % 11]
+
+
+VALID_OTHER = with_check_code('44030819900101001')
+
+
+def test_check_id_card():
+    assert check_id_card(VALID_MALE) == ''
+    assert check_id_card(VALID_FEMALE) == ''
+    assert check_id_card('') == "缺少身份证号"
+    assert check_id_card('44030819990101123') == "身份证号应为18位"
+    assert check_id_card('44030819990101123A') == "身份证号应为18位"
+    assert check_id_card('440308199902301234') == "身份证号中的出生日期无效"
+    assert check_id_card('110105194912310021') == "身份证号校验位不符"
+    assert check_id_card('440308199901011235') == "身份证号校验位不符"
+
+
+def test_normalize_and_info():
+    assert normalize_id_card(' 1101051949 1231002x ') == VALID_FEMALE
+    assert normalize_id_card(330302.0) == '330302'
+    assert normalize_id_card(None) == ''
+
+    assert id_card_info(VALID_MALE, today=datetime(2026, 1, 1)) == (27, "男")
+    assert id_card_info(VALID_MALE, today=datetime(2025, 12, 31)) == (26, "男")
+    assert id_card_info(VALID_FEMALE, today=datetime(2026, 10, 19)) == (76, "女")
+
+
+def write_form_xlsx(path):
+    """“标签 | 内容”写法的申请表"""
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.append(['工伤认定申请表'])
+    ws.append(['职工姓名：', '张三', '性别', '男'])
+    ws.append(['身份证号码', VALID_MALE, '联系电话', 13800000000])
+    ws.append(['用人单位名称', '甲公司', '', ''])
+    wb.save(path)
+
+
+def write_summary_xlsx(path):
+    """一行一个申请的汇总表"""
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = '汇总'
+    ws.append(['序号', '姓名', '身份证号', '用人单位', '工种'])
+    ws.append([1, '李四', VALID_FEMALE, '乙公司', '木工'])
+    ws.append([2, '', '', '', ''])
+    ws.append([3, '王五', '123', '丙公司', ''])
+    wb.save(path)
+
+
+def write_form_docx(path):
+    import docx
+
+    document = docx.Document()
+    document.add_paragraph('申请类型：个人案件')
+    table = document.add_table(rows=2, cols=4)
+    for row, values in zip(table.rows, [('姓名', '赵六', '性别', '女'), ('身份证号', VALID_FEMALE, '现住址', '温州')]):
+        for cell, value in zip(row.cells, values):
+            cell.text = value
+    document.save(path)
+
+
+def test_parse_xlsx_form_and_summary(tmp_path):
+    form = str(tmp_path / 'form.xlsx')
+    summary = str(tmp_path / 'summary.xlsx')
+    write_form_xlsx(form)
+    write_summary_xlsx(summary)
+
+    [(source, fields)] = parse_xlsx(form)
+    assert source == 'form.xlsx'
+    assert fields == {'受伤职工': '张三', '本人性别': '男', '本人身份证号': VALID_MALE,
+                      '本人电话': '13800000000', '用人单位': '甲公司'}
+
+    rows = parse_xlsx(summary)
+    assert [source for source, _ in rows] == ['summary.xlsx#汇总!2', 'summary.xlsx#汇总!4']
+    assert rows[0][1] == {'受伤职工': '李四', '本人身份证号': VALID_FEMALE, '用人单位': '乙公司', '本人岗位': '木工'}
+
+
+def test_parse_docx(tmp_path):
+    path = str(tmp_path / 'form.docx')
+    write_form_docx(path)
+    assert parse_docx(path) == [('form.docx', {'案件类型': '个人案件', '受伤职工': '赵六', '本人性别': '女',
+                                               '本人身份证号': VALID_FEMALE, '本人现住址': '温州'})]
+
+
+def test_parse_folder_reports_errors(tmp_path):
+    write_form_xlsx(str(tmp_path / 'a.xlsx'))
+    write_form_docx(str(tmp_path / 'b.docx'))
+    (tmp_path / 'c.docx').write_bytes(b'not a zip')
+    (tmp_path / '~$a.xlsx').write_bytes(b'lock')
+    (tmp_path / 'notes.txt').write_text('x')
+
+    applications, errors = parse_folder(str(tmp_path))
+    assert [(os.path.basename(path), source) for path, source, _ in applications] == \
+        [('a.xlsx', 'a.xlsx'), ('b.docx', 'b.docx')]
+    assert list(errors) == ['c.docx']
+
+
+def make_plan(tmp_path):
+    year = datetime.now().year
+    index = CaseIndex(str(tmp_path), current_year=year)
+    index.upsert_many([{'case_number': 'GS-钱七-001', 'person_name': '钱七', 'case_type': '普通案件',
+                        'year': year, 'folder_path': f'{year}/GS-钱七-001', 'created_date': f'{year}-01-01',
+                        'person_info': {'name': '钱七', 'id_card': VALID_MALE}}])
+    os.makedirs(tmp_path / str(year) / 'GS-张三-002')
+
+    source = str(tmp_path / 'form.xlsx')
+    write_form_xlsx(source)
+    applications = [
+        (source, 'form.xlsx', {'受伤职工': '张三', '本人身份证号': VALID_OTHER}),
+        ('summary.xlsx', 'summary.xlsx#2', {'受伤职工': '李四', '本人身份证号': VALID_FEMALE.lower()}),
+        ('summary.xlsx', 'summary.xlsx#3', {'受伤职工': '李四', '本人身份证号': VALID_FEMALE}),
+        ('summary.xlsx', 'summary.xlsx#4', {'受伤职工': '钱七', '本人身份证号': VALID_MALE}),
+        ('summary.xlsx', 'summary.xlsx#5', {'受伤职工': '孙八', '本人身份证号': '123'}),
+    ]
+    return year, index, source, applications
+
+
+def test_prepare_intake_checks_and_numbers(tmp_path):
+    year, index, _, applications = make_plan(tmp_path)
+
+    plan = prepare_intake(str(tmp_path), applications, index)
+    numbers = [case.case_number for _, _, case in plan['cases']]
+    assert numbers == ['GS-张三-003', 'GS-李四-001']
+    assert plan['cases'][1][2].person_info.gender == "女"
+    assert set(plan['skipped']) == {'summary.xlsx#3', 'summary.xlsx#4'}
+    assert 'GS-钱七-001' in plan['skipped']['summary.xlsx#4']
+    assert plan['invalid'] == {'summary.xlsx#5': "孙八: 身份证号应为18位"}
+    assert plan['single_files'] == {applications[0][0]}
+
+
+def test_commit_intake_creates_folders_and_index(tmp_path):
+    year, index, source, applications = make_plan(tmp_path)
+    plan = prepare_intake(str(tmp_path), applications, index)
+
+    assert commit_intake(str(tmp_path), plan, index) == ['GS-张三-003', 'GS-李四-001']
+    folder = tmp_path / str(year) / 'GS-张三-003'
+    assert (folder / 'form.xlsx').exists()
+    assert not list((tmp_path / str(year) / 'GS-李四-001').iterdir())  # 汇总表不复制
+    assert index.get('GS-李四-001')['person_info']['id_card'] == VALID_FEMALE
+
+
+def test_commit_intake_rolls_back_when_index_fails(tmp_path, monkeypatch):
+    year, index, _, applications = make_plan(tmp_path)
+    plan = prepare_intake(str(tmp_path), applications, index)
+
+    def fail(cases):
+        raise OSError("索引写入失败")
+    monkeypatch.setattr(index, 'upsert_many', fail)
+
+    with pytest.raises(OSError):
+        commit_intake(str(tmp_path), plan, index)
+    assert os.listdir(tmp_path / str(year)) == ['GS-张三-002']
+    assert index.get('GS-张三-003') is None
+    assert index.get('GS-李四-001') is None
+
+
+def test_commit_intake_rolls_back_on_existing_folder(tmp_path):
+    year, index, _, applications = make_plan(tmp_path)
+    plan = prepare_intake(str(tmp_path), applications, index)
+    # 准备之后别处建立了同号案件
+    os.makedirs(tmp_path / str(year) / 'GS-李四-001')
+
+    with pytest.raises(FileExistsError):
+        commit_intake(str(tmp_path), plan, index)
+    assert not (tmp_path / str(year) / 'GS-张三-003').exists()
+    assert (tmp_path / str(year) / 'GS-李四-001').exists()
+    assert index.get('GS-张三-003') is None
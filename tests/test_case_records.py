@@ -0,0 +1,50 @@
+"""证人/法人记录的合并规则和索引分区的增删"""
+
+from case_index import _Partition
+from case_records import CaseRecord, WitnessRecord
+
+
+def witness(name, transcript='', created_date='2026-01-01', id_card=''):
+    return WitnessRecord(name=name, transcript=transcript, created_date=created_date, id_card=id_card)
+
+
+def test_new_transcript_for_same_witness_is_appended():
+    case = CaseRecord(case_number='GS-张三-001')
+    case.add_person("证人", witness('李四', '张三_证人01_李四.docx'))
+    case.add_person("证人", witness('李四', '张三_证人02_李四.docx', '2026-02-01'))
+
+    assert [w.transcript for w in case.witnesses] == ['张三_证人01_李四.docx', '张三_证人02_李四.docx']
+
+
+def test_regenerated_transcript_is_updated_in_place():
+    case = CaseRecord(case_number='GS-张三-001')
+    case.add_person("证人", witness('李四', '张三_证人01_李四.docx'))
+    case.add_person("证人", witness('王五', '张三_证人02_王五.docx'))
+    case.add_person("证人", WitnessRecord(name='李四', phone='139', transcript='张三_证人01_李四.docx',
+                                         created_date='2026-03-01'))
+
+    assert [(w.name, w.phone) for w in case.witnesses] == [('李四', '139'), ('王五', '')]
+    assert case.witnesses[0].created_date == '2026-01-01'
+
+
+def test_person_without_transcript_replaces_same_name_entry_without_transcript():
+    case = CaseRecord(case_number='GS-张三-001')
+    case.add_person("法人", witness('赵六'))
+    case.add_person("法人", witness('赵六', '张三_法人01_赵六.docx'))
+    case.add_person("法人", witness('赵六', id_card='1'))
+
+    assert [p.transcript for p in case.legal_persons] == ['', '张三_法人01_赵六.docx']
+    assert case.legal_persons[0].id_card == '1'
+
+
+def test_partition_add_and_remove_keep_order_and_name_lookup(tmp_path):
+    partition = _Partition('2026', str(tmp_path / '2026.json'))
+    partition.set_cases([{'case_number': f'GS-{name}-001', 'person_name': name} for name in ('甲', '乙', '丙')])
+
+    partition.add(CaseRecord(case_number='GS-乙-001', person_name='乙二'))
+    partition.add(CaseRecord(case_number='GS-丁-001', person_name='丁'))
+    partition.remove('GS-甲-001')
+
+    assert [case.case_number for case in partition.cases] == ['GS-乙-001', 'GS-丙-001', 'GS-丁-001']
+    assert partition.names() == sorted(['乙二', '丙', '丁'])
+    assert list(partition.by_name['乙二']) == ['GS-乙-001']
@@ -0,0 +1,75 @@
+"""统计报表：汇总、交叉统计、增量调整和磁盘缓存"""
+
+from case_index import CaseIndex
+from case_reports import EMPTY_VALUE, ReportEngine
+
+
+def case(number, created_date, **fields):
+    year = created_date[:4]
+    return dict({'case_number': number, 'person_name': number.split('-')[1], 'year': year,
+                 'folder_path': f'{year}/{number}', 'created_date': created_date,
+                 'case_type': '工伤', 'operator': '甲'}, **fields)
+
+
+CASES = [
+    case('GS-张三-001', '2025-03-02', employer='甲公司', regulation='第十四条第一款第一项（普通工伤案件）'),
+    case('GS-李四-001', '2025-03-20', employer='甲公司', operator='乙'),
+    case('GS-王五-001', '2026-01-05', employer='乙公司', case_type='死亡'),
+    case('GS-赵六-001', '2026-01-09', employer=' '),
+]
+
+
+def make_engine(tmp_path, cache_file=None):
+    index = CaseIndex(str(tmp_path), current_year=2026)
+    if not index.cases():
+        index.upsert_many(CASES)
+    return index, ReportEngine(index, cache_file)
+
+
+def test_totals_crosstab_and_monthly(tmp_path):
+    _, engine = make_engine(tmp_path)
+
+    assert engine.totals('employer') == {'甲公司': 2, '乙公司': 1, EMPTY_VALUE: 1}
+    assert engine.totals('regulation')['普通工伤案件'] == 1
+    assert engine.totals('operator', years=['2025']) == {'甲': 1, '乙': 1}
+    assert engine.monthly() == {'2025-03': 2, '2026-01': 2}
+    assert engine.crosstab('month', 'case_type') == {'2025-03': {'工伤': 2}, '2026-01': {'死亡': 1, '工伤': 1}}
+
+
+def test_incremental_update_matches_full_rebuild(tmp_path):
+    index, engine = make_engine(tmp_path)
+    engine.totals('employer')  # 先建立缓存
+
+    index.upsert_many([
+        case('GS-王五-001', '2026-01-05', employer='丙公司', case_type='死亡'),
+        case('GS-孙七-001', '2026-02-01', employer='甲公司'),
+    ])
+
+    rebuilt = ReportEngine(CaseIndex(str(tmp_path), current_year=2026))
+    assert engine.cells() == rebuilt.cells()
+    assert engine.totals('employer') == {'甲公司': 3, '丙公司': 1, EMPTY_VALUE: 1}
+
+
+def test_cached_years_are_read_from_disk(tmp_path):
+    cache_file = str(tmp_path / 'report_cache.json')
+    _, engine = make_engine(tmp_path, cache_file)
+    expected = engine.cells()
+
+    index = CaseIndex(str(tmp_path), current_year=2026)
+    again = ReportEngine(index, cache_file)
+    assert again.cells() == expected
+    assert not any(partition.loaded for partition in index._partitions.values())
+
+
+def test_export_xlsx(tmp_path):
+    from openpyxl import load_workbook
+
+    _, engine = make_engine(tmp_path)
+    path = engine.export_xlsx(str(tmp_path / '统计.xlsx'))
+
+    wb = load_workbook(path)
+    rows = list(wb['按用人单位'].iter_rows(values_only=True))
+    assert rows[0] == ('用人单位', '案件数')
+    assert rows[1] == ('甲公司', 2)
+    assert rows[-1] == ('合计', 4)
+    assert list(wb['月度-案件类型'].iter_rows(values_only=True))[0] == ('月份', '工伤', '死亡', '合计')
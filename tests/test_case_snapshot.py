@@ -0,0 +1,100 @@
+"""案件快照：编码后读回、按案本号查找、JSON 往返和损坏文件"""
+
+import json
+
+import pytest
+
+from case_records import CaseRecord
+from case_snapshot import (Snapshot, SnapshotError, json_to_snapshot, sample_cases,
+                           snapshot_to_json, write_snapshot)
+
+
+def detailed_case():
+    """含证人、法人、非字符串取值和未知键的案件"""
+    return {
+        'case_number': 'GS-张三-001', 'person_name': '张三', 'case_type': '死亡案件',
+        'year': 2025, 'folder_path': '2025/GS-张三-001', 'created_date': '2025-06-01',
+        'employer': '甲公司', 'work_unit': '', 'workplace': '工地', 'regulation': '', 'operator': '王',
+        'person_info': {'name': '张三', 'age': 45, 'phone': None, 'custom': '附加信息'},
+        'witnesses': [{'name': '李四', 'phone': '13800000000'}, {'name': '王五'}],
+        'legal_persons': [{'name': '赵六'}],
+        'archived': True,
+    }
+
+
+def expected(cases):
+    return [CaseRecord.from_dict(case).to_dict() for case in cases]
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_cases_round_trip(tmp_path, compress):
+    cases = sample_cases(50) + [detailed_case()]
+    path = str(tmp_path / 'cases.snap')
+    write_snapshot(path, cases, {'year': '2025'}, compress)
+
+    with Snapshot(path) as snapshot:
+        assert len(snapshot) == len(cases)
+        assert snapshot.meta['year'] == '2025'
+        assert [case.to_dict() for case in snapshot.cases()] == expected(cases)
+        assert [snapshot.row(row).to_dict() for row in range(len(cases))] == expected(cases)
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_get_by_case_number(tmp_path, compress):
+    cases = sample_cases(30) + [detailed_case()]
+    path = str(tmp_path / 'cases.snap')
+    write_snapshot(path, cases, compress=compress)
+
+    with Snapshot(path) as snapshot:
+        for row, case in enumerate(cases):
+            assert snapshot.find_row(case['case_number']) == row
+            assert snapshot.get(case['case_number']).to_dict() == expected([case])[0]
+        detailed = snapshot.get('GS-张三-001')
+        assert detailed.year == 2025
+        assert detailed.person_info.age == 45
+        assert [w.name for w in detailed.witnesses] == ['李四', '王五']
+        # 排在最前、最后和不存在的案本号
+        assert snapshot.get('') is None
+        assert snapshot.get('A') is None
+        assert snapshot.get('ZZ') is None
+        assert snapshot.get('GS-张三-002') is None
+
+
+def test_empty_snapshot(tmp_path):
+    path = str(tmp_path / 'empty.snap')
+    write_snapshot(path, [])
+    with Snapshot(path) as snapshot:
+        assert len(snapshot) == 0
+        assert snapshot.cases() == []
+        assert snapshot.get('GS-张三-001') is None
+
+
+def test_json_round_trip(tmp_path):
+    cases = sample_cases(20) + [detailed_case()]
+    source = tmp_path / '2025.json'
+    source.write_text(json.dumps({'year': '2025', 'cases': cases}, ensure_ascii=False), encoding='utf-8')
+    snap_path = str(tmp_path / '2025.snap')
+    back = tmp_path / 'back.json'
+
+    assert json_to_snapshot(str(source), snap_path) == len(cases)
+    assert snapshot_to_json(snap_path, str(back)) == len(cases)
+
+    content = json.loads(back.read_text(encoding='utf-8'))
+    assert content == {'year': '2025', 'cases': expected(cases)}
+
+
+def test_corrupt_files(tmp_path):
+    path = str(tmp_path / 'cases.snap')
+    write_snapshot(path, sample_cases(10))
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    broken = {
+        'empty.snap': b'',
+        'magic.snap': b'XXXX' + content[4:],
+        'truncated.snap': content[:len(content) // 2],
+    }
+    for name, data in broken.items():
+        (tmp_path / name).write_bytes(data)
+        with pytest.raises(SnapshotError):
+            Snapshot(str(tmp_path / name))
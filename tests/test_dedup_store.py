@@ -0,0 +1,85 @@
+"""重复文件合并：只合并完全相同的文件，不越出数据目录"""
+
+import os
+
+from atomic_io import atomic_write
+from dedup_store import STORE_DIR, DedupStore
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def test_identical_files_are_linked_and_stay_separate_after_rewrite(tmp_path):
+    base_dir = str(tmp_path)
+    first = os.path.join(base_dir, '2026', 'GS-张三-001', '病历.pdf')
+    second = os.path.join(base_dir, '2026', 'GS-李四-001', '病历.pdf')
+    write(first, b'scan' * 100)
+    write(second, b'scan' * 100)
+    store = DedupStore(base_dir)
+
+    report = store.report()
+    assert report['duplicate_groups'] == 1
+    assert report['reclaimable_bytes'] == 400
+
+    result = store.reclaim()
+    assert result == {'linked': 1, 'reclaimed_bytes': 400, 'errors': {}}
+    assert os.stat(first).st_ino == os.stat(second).st_ino
+    assert store.report()['reclaimable_bytes'] == 0
+
+    # 本程序的写入先写临时文件再替换，不影响另一个副本
+    atomic_write(first, lambda f: f.write(b'new'))
+    with open(second, 'rb') as f:
+        assert f.read() == b'scan' * 100
+
+
+def test_files_that_differ_are_not_linked(tmp_path):
+    base_dir = str(tmp_path)
+    write(os.path.join(base_dir, '2026', 'a', '笔录.docx'), b'transcript A')
+    write(os.path.join(base_dir, '2026', 'b', '笔录.docx'), b'transcript B')
+
+    assert DedupStore(base_dir).reclaim()['linked'] == 0
+
+
+def test_symlinks_to_outside_files_are_skipped(tmp_path):
+    base_dir = tmp_path / 'data'
+    outside = tmp_path / 'outside.pdf'
+    write(str(outside), b'same content')
+    write(str(base_dir / '2026' / 'a' / 'copy.pdf'), b'same content')
+    os.symlink(outside, base_dir / '2026' / 'a' / 'link.pdf')
+    os.symlink(tmp_path, base_dir / '2026' / 'linked-dir')
+
+    result = DedupStore(str(base_dir)).reclaim()
+
+    assert result['linked'] == 0
+    assert os.stat(outside).st_nlink == 1
+
+
+def test_store_dir_outside_data_root_is_refused(tmp_path):
+    base_dir = tmp_path / 'data'
+    elsewhere = tmp_path / 'elsewhere'
+    elsewhere.mkdir()
+    write(str(base_dir / '2026' / 'a' / 'x.pdf'), b'dup')
+    write(str(base_dir / '2026' / 'b' / 'x.pdf'), b'dup')
+    os.symlink(elsewhere, base_dir / STORE_DIR)
+
+    result = DedupStore(str(base_dir)).reclaim()
+
+    assert result['linked'] == 0
+    assert list(result['errors']) == [str(base_dir / STORE_DIR)]
+    assert os.listdir(elsewhere) == []
+
+
+def test_prune_removes_unreferenced_objects(tmp_path):
+    base_dir = str(tmp_path)
+    paths = [os.path.join(base_dir, '2026', name, 'x.pdf') for name in ('a', 'b')]
+    for path in paths:
+        write(path, b'dup')
+    store = DedupStore(base_dir)
+    store.reclaim()
+
+    for path in paths:
+        os.remove(path)
+    assert store.prune() == 1
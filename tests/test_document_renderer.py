@@ -0,0 +1,42 @@
+"""案件文书并行生成和生成记录"""
+
+import os
+import shutil
+
+from document_renderer import CASE_DOCUMENTS, DocumentRenderer, TemplateCache
+from render_tracker import RenderTracker
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_renderer(base_dir):
+    shutil.copytree(os.path.join(REPO_DIR, 'templates'), os.path.join(base_dir, 'templates'))
+    templates = TemplateCache()
+    return DocumentRenderer(base_dir, templates, RenderTracker(base_dir, templates))
+
+
+def test_render_all_records_every_document_with_one_manifest_write(tmp_path, monkeypatch):
+    renderer = make_renderer(str(tmp_path))
+    saves = []
+    original_save = renderer.tracker._save
+    monkeypatch.setattr(renderer.tracker, '_save', lambda: saves.append(1) or original_save())
+    case_data = {'case_number': 'GS-张三-001', 'person_name': '张三', 'folder_path': '2026/GS-张三-001'}
+
+    generated, errors = renderer.render_all(case_data)
+
+    assert errors == {}
+    assert len(generated) == len(CASE_DOCUMENTS)
+    assert len(saves) == 1
+    entries = renderer.tracker.entries()
+    assert sorted(entry['doc_type'] for entry in entries.values()) == sorted(CASE_DOCUMENTS)
+
+
+def test_render_all_records_only_successful_documents(tmp_path):
+    renderer = make_renderer(str(tmp_path))
+    os.remove(renderer.template_path(CASE_DOCUMENTS['谈话通知书'][0]))
+    case_data = {'case_number': 'GS-张三-001', 'person_name': '张三', 'folder_path': '2026/GS-张三-001'}
+
+    generated, errors = renderer.render_all(case_data)
+
+    assert list(errors) == ['谈话通知书']
+    assert len(renderer.tracker.entries()) == len(generated) == len(CASE_DOCUMENTS) - 1
@@ -0,0 +1,130 @@
+"""文书预览：docx 转 HTML（格式、合并单元格、占位符）和预览缓存"""
+
+import io
+import os
+
+import docx
+import pytest
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.shared import Pt
+
+import docx_preview
+from docx_preview import PreviewCache, docx_to_html
+
+
+def make_document(title='询问笔录'):
+    document = docx.Document()
+    heading = document.add_paragraph()
+    heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    run = heading.add_run(title)
+    run.bold = True
+    run.font.size = Pt(16)
+
+    paragraph = document.add_paragraph('被询问人：')
+    # 占位符被拆在两个文字块中
+    paragraph.add_run('{受伤')
+    paragraph.add_run('职工}')
+    paragraph.add_run(' <未填写> & {用人单位}')
+    document.add_paragraph()
+
+    table = document.add_table(rows=3, cols=3)
+    table.cell(0, 0).merge(table.cell(0, 1)).text = '横向合并'
+    table.cell(1, 2).merge(table.cell(2, 2)).text = '纵向合并'
+    table.cell(0, 2).text = '右上'
+    table.cell(1, 0).text = '{案本号}'
+    table.cell(2, 1).text = '末行'
+    return document
+
+
+def to_bytes(document):
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def test_docx_to_html_formatting_and_placeholders():
+    page, placeholders = docx_to_html(to_bytes(make_document()))
+
+    assert page.startswith('<html><body>') and page.endswith('</body></html>')
+    assert '<p align="center"><b><span style="font-size:16pt">询问笔录</span></b></p>' in page
+    mark = '<span style="background-color:#ffe08a">{}</span>'
+    # 拆开的占位符在正文中不高亮，但按整段文字查找时仍会列出
+    assert '<p>被询问人：{受伤职工} ' in page
+    assert ' &lt;未填写&gt; &amp; ' + mark.format('{用人单位}') in page
+    assert '<p>&nbsp;</p>' in page
+    assert placeholders == ['受伤职工', '用人单位', '案本号']
+
+
+def test_docx_to_html_merged_cells():
+    page, _ = docx_to_html(to_bytes(make_document()))
+    table = page[page.index('<table'):page.index('</table>')]
+
+    rows = table.split('<tr>')[1:]
+    assert len(rows) == 3
+    assert rows[0].count('<td') == 2
+    assert '<td colspan="2"><p>横向合并</p></td>' in rows[0]
+    assert '<td rowspan="2"><p>纵向合并</p></td>' in rows[1]
+    # 纵向合并的后续单元格不输出
+    assert rows[2].count('<td') == 2
+    assert '末行' in rows[2]
+    assert '<span style="background-color:#ffe08a">{案本号}</span>' in rows[1]
+
+
+def test_docx_to_html_accepts_path_and_file(tmp_path):
+    path = tmp_path / 'a.docx'
+    make_document().save(str(path))
+    expected = docx_to_html(path.read_bytes())
+    assert docx_to_html(str(path)) == expected
+    with open(path, 'rb') as f:
+        assert docx_to_html(f) == expected
+
+
+def test_preview_cache_hits_and_rereads(tmp_path, monkeypatch):
+    calls = []
+    convert = docx_preview.docx_to_html
+
+    def counting(source):
+        calls.append(source)
+        return convert(source)
+    monkeypatch.setattr(docx_preview, 'docx_to_html', counting)
+
+    path = str(tmp_path / 'a.docx')
+    make_document('第一版').save(path)
+    cache = PreviewCache()
+    first = cache.get(path)
+    assert '第一版' in first[0]
+    assert cache.get(path) is first
+    assert len(calls) == 1
+
+    # 内容相同的另一个文件使用同一转换结果
+    copy = str(tmp_path / 'b.docx')
+    with open(path, 'rb') as src, open(copy, 'wb') as dst:
+        dst.write(src.read())
+    assert cache.get(copy) is first
+    assert len(calls) == 1
+
+    # 文件变化后重新读取
+    make_document('第二版').save(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    second = cache.get(path)
+    assert '第二版' in second[0]
+    assert len(calls) == 2
+    assert cache.get(copy) is first
+
+
+def test_preview_cache_evicts_oldest(tmp_path):
+    cache = PreviewCache(maxsize=2)
+    paths = []
+    for name in ('a', 'b', 'c'):
+        path = str(tmp_path / f'{name}.docx')
+        make_document(name).save(path)
+        paths.append(path)
+        cache.get(path)
+    assert len(cache._pages) == 2
+    assert '16pt">a</span>' in cache.get(paths[0])[0]
+    assert len(cache._pages) == 2
+
+    os.remove(paths[1])
+    with pytest.raises(FileNotFoundError):
+        cache.get(paths[1])
@@ -0,0 +1,163 @@
+"""目录列表缓存：有效期、本程序新建的文件、失效和监视器"""
+
+import os
+
+import pytest
+
+import fs_cache
+from fs_cache import FsCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Signal:
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot):
+        self.slots.append(slot)
+
+    def emit(self, path):
+        for slot in self.slots:
+            slot(path)
+
+
+class FakeWatcher:
+    """与 QFileSystemWatcher 相同的接口，只记录监视的目录"""
+
+    def __init__(self):
+        self.directoryChanged = Signal()
+        self.paths = set()
+
+    def addPath(self, path):
+        self.paths.add(path)
+        return True
+
+    def removePath(self, path):
+        self.paths.discard(path)
+        return True
+
+    def removePaths(self, paths):
+        for path in paths:
+            self.removePath(path)
+
+    def directories(self):
+        return sorted(self.paths)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fs_cache.time, 'monotonic', clock)
+    return clock
+
+
+def test_listing_cached_until_ttl(tmp_path, clock):
+    (tmp_path / 'a.docx').write_bytes(b'a')
+    cache = FsCache(ttl=2.0)
+    assert cache.listdir(str(tmp_path)) == ['a.docx']
+
+    # 别处新建的文件在有效期内看不到，过期后重新读取
+    (tmp_path / 'b.docx').write_bytes(b'b')
+    (tmp_path / 'sub').mkdir()
+    assert cache.listdir(str(tmp_path)) == ['a.docx']
+    assert not cache.exists(str(tmp_path / 'b.docx'))
+    clock.now += 2.5
+    assert cache.listdir(str(tmp_path)) == ['a.docx', 'b.docx', 'sub']
+    assert cache.isdir(str(tmp_path / 'sub'))
+    assert not cache.isdir(str(tmp_path / 'b.docx'))
+
+
+def test_missing_directory(tmp_path, clock):
+    cache = FsCache()
+    missing = str(tmp_path / 'missing')
+    assert cache.listdir(missing) == []
+    assert not cache.exists(missing)
+    assert cache.mtime(os.path.join(missing, 'a.docx')) is None
+
+
+def test_invalidate_rereads(tmp_path, clock):
+    cache = FsCache(ttl=60.0)
+    assert cache.listdir(str(tmp_path)) == []
+    (tmp_path / 'a.docx').write_bytes(b'a')
+    cache.invalidate(str(tmp_path))
+    assert cache.listdir(str(tmp_path)) == ['a.docx']
+
+    (tmp_path / 'b.docx').write_bytes(b'b')
+    cache.invalidate()
+    assert cache.listdir(str(tmp_path)) == ['a.docx', 'b.docx']
+
+
+def test_added_and_makedirs_update_without_rereading(tmp_path, clock, monkeypatch):
+    cache = FsCache(ttl=60.0)
+    assert cache.listdir(str(tmp_path)) == []
+
+    (tmp_path / 'a.docx').write_bytes(b'a')
+    cache.added(str(tmp_path / 'a.docx'))
+    cache.makedirs(str(tmp_path / '2026' / 'GS-张三-001'))
+    assert os.path.isdir(tmp_path / '2026' / 'GS-张三-001')
+
+    # 新建的内容已记入缓存，之后的查询不再列目录
+    real_scandir = os.scandir
+
+    def scandir(path):
+        raise AssertionError(f"不应重新读取 {path}")
+    monkeypatch.setattr(fs_cache.os, 'scandir', scandir)
+    assert cache.listdir(str(tmp_path)) == ['2026', 'a.docx']
+    assert cache.isdir(str(tmp_path / '2026'))
+    assert not cache.isdir(str(tmp_path / 'a.docx'))
+    cache.makedirs(str(tmp_path / '2026'))
+
+    monkeypatch.setattr(fs_cache.os, 'scandir', real_scandir)
+    assert cache.listdir(str(tmp_path / '2026')) == ['GS-张三-001']
+
+
+def test_mtime_invalidated_with_directory(tmp_path, clock):
+    path = tmp_path / 'a.docx'
+    path.write_bytes(b'a')
+    os.utime(path, (100, 100))
+    cache = FsCache(ttl=60.0)
+    assert cache.mtime(str(path)) == 100
+
+    os.utime(path, (200, 200))
+    assert cache.mtime(str(path)) == 100
+    cache.invalidate(str(tmp_path))
+    assert cache.mtime(str(path)) == 200
+
+    os.utime(path, (300, 300))
+    cache.added(str(path))
+    assert cache.mtime(str(path)) == 300
+
+
+def test_watcher_notification_and_eviction(tmp_path, clock):
+    dirs = []
+    for name in ('a', 'b', 'c'):
+        (tmp_path / name).mkdir()
+        dirs.append(str(tmp_path / name))
+    watcher = FakeWatcher()
+    cache = FsCache(ttl=2.0, watched_ttl=60.0, maxsize=2, watcher=watcher)
+
+    assert cache.listdir(dirs[0]) == []
+    assert cache.listdir(dirs[1]) == []
+    assert watcher.paths == {cache._key(dirs[0]), cache._key(dirs[1])}
+
+    # 监视中的目录使用较长的有效期，变化以通知为准
+    (tmp_path / 'a' / 'x.docx').write_bytes(b'x')
+    clock.now += 10
+    assert cache.listdir(dirs[0]) == []
+    watcher.directoryChanged.emit(cache._key(dirs[0]))
+    assert cache.listdir(dirs[0]) == ['x.docx']
+    assert cache._key(dirs[0]) in watcher.paths
+
+    # 超出 maxsize 时移除最久未用的目录及其监视
+    assert cache.listdir(dirs[2]) == []
+    assert watcher.paths == {cache._key(dirs[0]), cache._key(dirs[2])}
+
+    cache.invalidate()
+    assert watcher.paths == set()
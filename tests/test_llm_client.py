@@ -0,0 +1,98 @@
+"""AI起草客户端：用本机 http.server 桩服务代替大模型接口"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import llm_client
+from llm_client import DraftClient, DraftError, build_prompt
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8'))
+        self.server.requests.append((self.path, body))
+        prompt = body['messages'][-1]['content']
+        name = next((line.split('：', 1)[1] for line in prompt.splitlines() if line.startswith('姓名：')), '')
+        content = json.dumps({'choices': [{'message': {'content': f"答：我是{name}"}}]},
+                             ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    # 同一目录的缓存在进程内共用，每个测试用新目录并清掉登记
+    llm_client._response_caches.clear()
+    return str(tmp_path / "llm_cache")
+
+
+def api_url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def witness(name):
+    return {'人员类型': '证人', '受伤职工': '张三', '用人单位': '甲公司', '证人姓名': name, '证人岗位': '工人'}
+
+
+def test_batch_of_witnesses_in_one_run(stub_server, cache_dir):
+    client = DraftClient(api_url(stub_server), cache_dir=cache_dir)
+    names = ['李四', '王五', '赵六']
+    prompts = [build_prompt('自我介绍', witness(name)) for name in names]
+
+    results = client.draft_many(prompts + prompts[:1])  # 同一批中重复的提示词只请求一次
+
+    assert results == ['我是李四', '我是王五', '我是赵六', '我是李四']
+    assert len(stub_server.requests) == 3
+    assert all(path == '/v1/chat/completions' for path, _ in stub_server.requests)
+
+
+def test_repeated_prompt_is_served_from_disk_cache(stub_server, cache_dir):
+    prompt = build_prompt('受伤经过', witness('李四'))
+    assert DraftClient(api_url(stub_server), cache_dir=cache_dir).draft_many([prompt]) == ['我是李四']
+    assert len(stub_server.requests) == 1
+
+    # 新的缓存对象（相当于程序重启），只能从磁盘命中
+    llm_client._response_caches.clear()
+    client = DraftClient(api_url(stub_server), cache_dir=cache_dir)
+    assert client.draft_many([prompt]) == ['我是李四']
+    assert len(stub_server.requests) == 1
+    assert client.cache.hits == 1
+
+
+def test_model_is_sent_only_when_configured(stub_server, cache_dir):
+    prompt = build_prompt('自我介绍', witness('李四'))
+    DraftClient(api_url(stub_server), cache_dir=cache_dir).draft_many([prompt])
+    DraftClient(api_url(stub_server), cache_dir=cache_dir, model='qwen-plus').draft_many([prompt])
+
+    assert 'model' not in stub_server.requests[0][1]
+    assert stub_server.requests[1][1]['model'] == 'qwen-plus'
+
+
+def test_empty_api_url_degrades_without_network(cache_dir):
+    client = DraftClient('', cache_dir=cache_dir)
+
+    assert not client.is_configured()
+    with pytest.raises(DraftError):
+        client.draft_many([build_prompt('自我介绍', witness('李四'))])
@@ -0,0 +1,71 @@
+"""单位反向索引：不同写法归为同一单位，索引更新时增量调整"""
+
+from case_index import CaseIndex
+from org_index import OrgIndex
+
+
+def case(number, created_date, **fields):
+    year = created_date[:4]
+    return dict({'case_number': number, 'person_name': number.split('-')[1], 'year': year,
+                 'folder_path': f'{year}/{number}', 'created_date': created_date}, **fields)
+
+
+CASES = [
+    case('GS-张三-001', '2025-03-02', employer='甲建筑有限责任公司', workplace='一号工地'),
+    case('GS-李四-001', '2025-08-20', employer='甲建筑有限公司', work_unit='乙劳务（集团）'),
+    case('GS-王五-001', '2026-01-05', employer='甲 建筑 有限公司', workplace='甲建筑有限公司'),
+    case('GS-赵六-001', '2026-02-09', employer='乙劳务(集团)'),
+]
+
+
+def make(tmp_path, cache_file=None):
+    index = CaseIndex(str(tmp_path), current_year=2026)
+    if not index.cases():
+        index.upsert_many(CASES)
+    return index, OrgIndex(index, cache_file)
+
+
+def test_spellings_of_one_org_share_an_entry(tmp_path):
+    _, orgs = make(tmp_path)
+
+    entries = orgs.cases_for('甲建筑有限公司')
+    assert [e['case_number'] for e in entries] == ['GS-王五-001', 'GS-李四-001', 'GS-张三-001']
+    assert entries[0]['roles'] == {'employer': '甲 建筑 有限公司', 'workplace': '甲建筑有限公司'}
+    assert entries[0]['year'] == '2026'
+
+    assert [e['case_number'] for e in orgs.cases_for('乙劳务（集团）', roles=['work_unit'])] == ['GS-李四-001']
+    assert [e['case_number'] for e in orgs.cases_for('乙劳务（集团）', years=['2026'])] == ['GS-赵六-001']
+    assert orgs.cases_for('') == []
+
+
+def test_repeat_orgs(tmp_path):
+    _, orgs = make(tmp_path)
+
+    [top] = orgs.repeat_orgs(min_cases=3)
+    assert top['count'] == 3
+    assert top['name'] in {'甲建筑有限责任公司', '甲建筑有限公司', '甲 建筑 有限公司'}
+    assert (top['first_date'], top['last_date']) == ('2025-03-02', '2026-01-05')
+    assert top['years'] == ['2025', '2026']
+    assert [item['count'] for item in orgs.repeat_orgs(min_cases=1, role='work_unit')] == [1]
+
+
+def test_upsert_moves_case_to_new_org(tmp_path):
+    index, orgs = make(tmp_path)
+    orgs.cases_for('甲建筑有限公司')  # 先建立缓存
+
+    index.upsert(case('GS-王五-001', '2026-01-05', employer='丙商贸'))
+
+    assert [e['case_number'] for e in orgs.cases_for('甲建筑有限公司')] == ['GS-李四-001', 'GS-张三-001']
+    assert [e['case_number'] for e in orgs.cases_for('丙商贸')] == ['GS-王五-001']
+    rebuilt = OrgIndex(CaseIndex(str(tmp_path), current_year=2026))
+    assert orgs.year_data() == rebuilt.year_data()
+
+
+def test_cache_file_is_reused(tmp_path):
+    cache_file = str(tmp_path / 'org_index_cache.json')
+    _, orgs = make(tmp_path, cache_file)
+    expected = orgs.year_data()
+
+    index = CaseIndex(str(tmp_path), current_year=2026)
+    assert OrgIndex(index, cache_file).year_data() == expected
+    assert not any(partition.loaded for partition in index._partitions.values())
@@ -0,0 +1,63 @@
+"""单位名称规范化与查重"""
+
+import random
+
+import pytest
+
+from org_names import (NameSet, _grams, canonical_key, find_duplicate_groups, find_similar_pairs,
+                       merge_name_list, name_list_workbook, normalize_org_name, read_name_list)
+
+
+def test_normalize_and_canonical_key():
+    assert normalize_org_name(' ａｂｃ 建筑（集团）\t') == 'ABC建筑(集团)'
+    assert normalize_org_name('甲〔2025〕[一]') == '甲(2025)(一)'
+    assert normalize_org_name(None) == ''
+    assert canonical_key('甲建筑有限责任公司') == canonical_key('甲·建筑 有限公司') == '甲建筑有限公司'
+    assert canonical_key('乙股份有限公司') == '乙股份公司'
+    assert canonical_key('--') == ''
+
+
+def test_name_set_keeps_first_spelling():
+    names = NameSet(['甲建筑有限责任公司', '乙商贸'])
+    assert not names.add('甲建筑有限公司')
+    assert names.add('丙物流')
+    assert '甲 建筑有限公司' in names
+    assert names.existing('甲建筑有限公司') == '甲建筑有限责任公司'
+    assert len(names) == 3
+    assert not names.add('')
+
+
+@pytest.mark.parametrize('threshold', [0.5, 0.7, 0.8, 0.9])
+def test_similar_pairs_match_brute_force(threshold):
+    rng = random.Random(threshold)
+    alphabet = '甲乙丙丁建筑劳务有限公司集团'
+    keys = list({''.join(rng.choice(alphabet) for _ in range(rng.randint(2, 10))) for _ in range(300)})
+
+    found = {(min(i, j), max(i, j)) for i, j, _ in find_similar_pairs(keys, threshold)}
+
+    expected = set()
+    grams = [_grams(key) for key in keys]
+    for i in range(len(keys)):
+        for j in range(i + 1, len(keys)):
+            common = len(grams[i] & grams[j])
+            if common / (len(grams[i]) + len(grams[j]) - common) >= threshold:
+                expected.add((i, j))
+    assert found == expected
+
+
+def test_duplicate_groups():
+    names = ['甲建筑有限公司', '乙商贸', '甲建筑有限责任公司', '丙物流', '甲建筑有限公司（一分公司）', '乙商贸 ']
+    groups = find_duplicate_groups(names, threshold=0.5)
+    assert ['甲建筑有限公司', '甲建筑有限责任公司', '甲建筑有限公司（一分公司）'] in groups
+    assert ['乙商贸', '乙商贸 '] in groups
+    assert all('丙物流' not in group for group in groups)
+
+
+def test_merge_name_list_keeps_first_spelling_in_place(tmp_path):
+    path = str(tmp_path / '用人单位名称汇总.xlsx')
+    name_list_workbook('用人单位', ['甲建筑有限公司', '乙商贸', '甲建筑有限责任公司', '丙物流']).save(path)
+
+    removed = merge_name_list(path, '用人单位', [['甲建筑有限公司', '甲建筑有限责任公司']])
+
+    assert removed == 1
+    assert read_name_list(path, '用人单位') == ['甲建筑有限公司', '乙商贸', '丙物流']
@@ -0,0 +1,164 @@
+"""本地副本同步：用两个临时目录分别作为本地副本和共享目录"""
+
+import json
+import os
+
+import pytest
+
+from case_index import CaseIndex
+from replica_sync import SyncEngine, TRACKER_FILE
+
+
+def write(root, relpath, data):
+    path = os.path.join(root, *relpath.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def read(root, relpath):
+    with open(os.path.join(root, *relpath.split('/')), 'rb') as f:
+        return f.read()
+
+
+def exists(root, relpath):
+    return os.path.exists(os.path.join(root, *relpath.split('/')))
+
+
+@pytest.fixture
+def roots(tmp_path):
+    local = tmp_path / 'local'
+    remote = tmp_path / 'remote'
+    local.mkdir()
+    remote.mkdir()
+    return str(local), str(remote)
+
+
+@pytest.fixture
+def synced(roots):
+    """两边已经同步过一个案件文件"""
+    local, remote = roots
+    write(remote, '2026/GS-张三-001/笔录.docx', b'v1')
+    engine = SyncEngine(local, remote)
+    assert engine.sync()['pulled'] == ['2026/GS-张三-001/笔录.docx']
+    return local, remote, engine
+
+
+def test_push_and_pull(roots):
+    local, remote = roots
+    engine = SyncEngine(local, remote)
+    write(local, '2026/GS-张三-001/a.docx', b'local')
+    write(remote, '2025/GS-李四-001/b.docx', b'remote')
+
+    result = engine.sync()
+
+    assert result['pushed'] == ['2026/GS-张三-001/a.docx']
+    assert result['pulled'] == ['2025/GS-李四-001/b.docx']
+    assert result['errors'] == {} and result['conflicts'] == []
+    assert read(remote, '2026/GS-张三-001/a.docx') == b'local'
+    assert read(local, '2025/GS-李四-001/b.docx') == b'remote'
+
+    again = engine.sync()
+    assert again['pushed'] == again['pulled'] == again['conflicts'] == []
+
+
+def test_edit_on_one_side_is_copied(synced):
+    local, remote, engine = synced
+    write(local, '2026/GS-张三-001/笔录.docx', b'v2-local')
+
+    result = engine.sync()
+
+    assert result['pushed'] == ['2026/GS-张三-001/笔录.docx']
+    assert read(remote, '2026/GS-张三-001/笔录.docx') == b'v2-local'
+
+
+def test_conflicting_edit_keeps_remote_and_saves_local_copy(synced):
+    local, remote, engine = synced
+    write(local, '2026/GS-张三-001/笔录.docx', b'local edit')
+    write(remote, '2026/GS-张三-001/笔录.docx', b'remote edit!')
+
+    result = engine.sync()
+
+    assert [relpath for relpath, _ in result['conflicts']] == ['2026/GS-张三-001/笔录.docx']
+    assert read(local, '2026/GS-张三-001/笔录.docx') == b'remote edit!'
+    copies = [name for name in os.listdir(os.path.join(local, '2026', 'GS-张三-001')) if '.冲突-' in name]
+    assert len(copies) == 1 and copies[0].endswith('.docx')
+    assert read(local, '2026/GS-张三-001/' + copies[0]) == b'local edit'
+
+    # 冲突副本下次同步上传，共享目录的版本保持不变
+    engine.sync()
+    assert read(remote, '2026/GS-张三-001/' + copies[0]) == b'local edit'
+    assert read(remote, '2026/GS-张三-001/笔录.docx') == b'remote edit!'
+
+
+def test_delete_on_one_side_is_propagated(synced):
+    local, remote, engine = synced
+    os.remove(os.path.join(local, '2026', 'GS-张三-001', '笔录.docx'))
+
+    result = engine.sync()
+
+    assert result['deleted'] == ['2026/GS-张三-001/笔录.docx']
+    assert not exists(remote, '2026/GS-张三-001/笔录.docx')
+    assert engine.sync()['deleted'] == []
+
+
+def test_delete_against_edit_keeps_edited_file(synced):
+    local, remote, engine = synced
+    os.remove(os.path.join(local, '2026', 'GS-张三-001', '笔录.docx'))
+    write(remote, '2026/GS-张三-001/笔录.docx', b'remote edit')
+
+    result = engine.sync()
+
+    assert len(result['conflicts']) == 1
+    assert read(local, '2026/GS-张三-001/笔录.docx') == b'remote edit'
+
+
+def case(number, **fields):
+    return dict({'case_number': number, 'person_name': number.split('-')[1], 'year': '2026',
+                 'folder_path': f'2026/{number}'}, **fields)
+
+
+def test_index_partitions_merge_by_case(roots):
+    local, remote = roots
+    CaseIndex(remote, current_year=2026).upsert(case('GS-张三-001', operator='甲'))
+    engine = SyncEngine(local, remote)
+    engine.sync()
+
+    CaseIndex(local, current_year=2026).upsert_many([case('GS-李四-001'), case('GS-张三-001', operator='本地')])
+    CaseIndex(remote, current_year=2026).upsert_many([case('GS-王五-001'), case('GS-张三-001', operator='共享')])
+
+    result = engine.sync()
+
+    assert result['merged'] == ['cases_index/2026.json']
+    assert result['errors'] == {}
+    for root in (local, remote):
+        index = CaseIndex(root, current_year=2026)
+        assert sorted(c.case_number for c in index.cases()) == ['GS-张三-001', 'GS-李四-001', 'GS-王五-001']
+        assert index.get('GS-张三-001').operator == '共享'
+
+    # 被覆盖的本地版本另存在 .sync/conflicts/
+    conflict_dir = os.path.join(local, '.sync', 'conflicts')
+    [saved] = os.listdir(conflict_dir)
+    with open(os.path.join(conflict_dir, saved), encoding='utf-8') as f:
+        assert json.load(f)['cases'][0]['operator'] == '本地'
+
+
+def test_tracker_merges_by_file(roots):
+    local, remote = roots
+    def tracker(**files):
+        return json.dumps({'files': files}, ensure_ascii=False).encode('utf-8')
+
+    write(remote, TRACKER_FILE, tracker(**{'2026/a.docx': {'kind': 'transcript'}}))
+    engine = SyncEngine(local, remote)
+    engine.sync()
+
+    write(local, TRACKER_FILE, tracker(**{'2026/a.docx': {'kind': 'transcript'}, '2026/b.docx': {'kind': 'local'}}))
+    write(remote, TRACKER_FILE, tracker(**{'2026/a.docx': {'kind': 'transcript'}, '2026/c.docx': {'kind': 'remote'},
+                                           '2026/d.docx': {'kind': 'remote'}}))
+
+    result = engine.sync()
+
+    assert result['merged'] == [TRACKER_FILE]
+    for root in (local, remote):
+        assert sorted(json.loads(read(root, TRACKER_FILE))['files']) == ['2026/a.docx', '2026/b.docx',
+                                                                         '2026/c.docx', '2026/d.docx']
@@ -0,0 +1,37 @@
+"""案审会材料：按日期范围挑选案件时只加载范围内的年份"""
+
+from case_index import CaseIndex
+from review_bundle import select_cases
+
+
+def case(number, created_date):
+    year = created_date[:4]
+    return {'case_number': number, 'person_name': number.split('-')[1], 'year': year,
+            'folder_path': f'{year}/{number}', 'created_date': created_date}
+
+
+def test_date_range_loads_only_years_in_range(tmp_path):
+    index = CaseIndex(str(tmp_path), current_year=2026)
+    index.upsert_many([
+        case('GS-甲-001', '2024-06-01'),
+        case('GS-乙-001', '2025-03-01'),
+        case('GS-丙-001', '2025-11-20'),
+        case('GS-丁-001', '2026-01-05'),
+    ])
+
+    fresh = CaseIndex(str(tmp_path), current_year=2026)
+    selected = select_cases(fresh, '2025-03-01', '2025-12-31')
+
+    assert [c['case_number'] for c in selected] == ['GS-乙-001', 'GS-丙-001']
+    loaded = {year for year, partition in fresh._partitions.items() if partition.loaded}
+    assert loaded == {'2025'}
+
+
+def test_open_ended_range_and_case_number_list(tmp_path):
+    index = CaseIndex(str(tmp_path), current_year=2026)
+    index.upsert_many([case('GS-甲-001', '2024-06-01'), case('GS-丁-001', '2026-01-05')])
+
+    assert [c['case_number'] for c in select_cases(index, start_date='2025-01-01')] == ['GS-丁-001']
+    assert [c['case_number'] for c in select_cases(index, end_date='2024-12-31')] == ['GS-甲-001']
+    assert [c['case_number'] for c in select_cases(index, case_numbers=['GS-丁-001', 'GS-甲-001'])] == \
+        ['GS-丁-001', 'GS-甲-001']
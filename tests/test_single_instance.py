@@ -0,0 +1,55 @@
+"""单实例：同时启动时第二个实例把参数交给第一个，异常退出留下的名称被清除"""
+
+import os
+import socket
+import uuid
+
+import pytest
+
+pytest.importorskip('PyQt5.QtNetwork')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QCoreApplication, QDir  # noqa: E402
+
+import single_instance  # noqa: E402
+from single_instance import InstanceServer, send_to_running  # noqa: E402
+
+
+@pytest.fixture
+def app(monkeypatch):
+    name = f"WorkInjuryApp-test-{uuid.uuid4().hex[:8]}"
+    monkeypatch.setattr(single_instance, 'server_name', lambda: name)
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def test_second_instance_hands_over_instead_of_removing_the_first(app):
+    first = InstanceServer()
+    assert first.listen()
+    received = []
+    first.received.connect(received.append)
+
+    second = InstanceServer()
+    assert not second.listen(['GS-张三-001'])   # 另一个实例在监听：交出参数，不抢占名称
+    assert not second.server.isListening()
+    assert first.server.isListening()
+
+    # 第一个实例的事件循环开始后收到参数，且仍然可以连接
+    for _ in range(20):
+        app.processEvents()
+    assert received == [['GS-张三-001']]
+    first.server.close()
+
+
+def test_stale_name_from_a_crash_is_removed(app):
+    if os.name != 'posix':
+        pytest.skip("Unix 域套接字文件")
+    path = os.path.join(QDir.tempPath(), single_instance.server_name())
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(path)
+    stale.close()  # 留下无人监听的套接字文件
+
+    server = InstanceServer()
+    assert server.listen()
+    assert server.server.isListening()
+    assert send_to_running([]) is True
+    server.server.close()
@@ -0,0 +1,88 @@
+"""笔录比对：patience diff 的正确性和只返回有变化的问答"""
+
+import random
+
+import pytest
+from docx import Document
+
+from transcript_diff import _read_paragraphs, changed_answers, diff_opcodes, extract_answers
+
+
+def rebuild(a, b, opcodes):
+    """按 opcodes 由 a 重建 b，同时检查各段连续、相等段确实相等"""
+    result = []
+    i = j = 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        assert (i1, j1) == (i, j)
+        if tag == 'equal':
+            assert a[i1:i2] == b[j1:j2]
+            result.extend(a[i1:i2])
+        else:
+            assert tag in ('replace', 'delete', 'insert')
+            result.extend(b[j1:j2])
+        i, j = i2, j2
+    assert (i, j) == (len(a), len(b))
+    return result
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_opcodes_rebuild_the_second_sequence(seed):
+    rng = random.Random(seed)
+    a = [rng.choice('abcdefg') for _ in range(rng.randint(0, 40))]
+    b = list(a)
+    for _ in range(rng.randint(0, 8)):
+        op = rng.choice('idr')
+        pos = rng.randint(0, len(b))
+        if op == 'i':
+            b.insert(pos, rng.choice('abcdefgxyz'))
+        elif b and pos < len(b):
+            if op == 'd':
+                del b[pos]
+            else:
+                b[pos] = rng.choice('xyz')
+
+    assert rebuild(a, b, diff_opcodes(a, b)) == b
+
+
+def test_unique_lines_anchor_the_diff():
+    a = ['头', '问1', '答1', '问2', '答2', '尾']
+    b = ['头', '问1', '答1改', '问2', '答2', '新增', '尾']
+    opcodes = diff_opcodes(a, b)
+    assert [op for op in opcodes if op[0] != 'equal'] == [('replace', 2, 3, 2, 3), ('insert', 5, 5, 5, 6)]
+
+
+QA = [
+    ('问：你是因为什么工作原因，事故发生的具体经过？', '答：搬运货物时摔倒。'),
+    ('问：你受伤后是谁送你去哪个医院？', '答：同事送到市医院。'),
+    ('问：此次受伤医院对你的医疗结论？', '答：右腿骨折。'),
+]
+
+
+def make_transcript(path, answers=None, extra=()):
+    doc = Document()
+    doc.add_paragraph('谈话笔录')
+    table = doc.add_table(rows=1, cols=1)
+    table.cell(0, 0).text = '表格内的文字'
+    for k, (question, answer) in enumerate(QA):
+        doc.add_paragraph(question)
+        doc.add_paragraph((answers or {}).get(k, answer))
+    for text in extra:
+        doc.add_paragraph(text)
+    doc.save(str(path))
+    return str(path)
+
+
+def test_read_paragraphs_matches_python_docx(tmp_path):
+    path = make_transcript(tmp_path / 'a.docx')
+    assert _read_paragraphs(path) == [p.text for p in Document(path).paragraphs]
+    assert extract_answers(_read_paragraphs(path)) == {
+        '受伤经过': '搬运货物时摔倒。', '就医情况': '同事送到市医院。', '医疗结论': '右腿骨折。'}
+
+
+def test_changed_answers_returns_only_changed_fields(tmp_path):
+    old = make_transcript(tmp_path / 'old.docx')
+    same = make_transcript(tmp_path / 'same.docx', extra=['补充：无'])
+    new = make_transcript(tmp_path / 'new.docx', answers={1: '答：自己去的区医院。'})
+
+    assert changed_answers(old, same) == {}
+    assert changed_answers(old, new) == {'就医情况': '自己去的区医院。'}
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+笔录内容 - 自我介绍、案件类型问答句和笔录占位符
+"""
+
+from case_records import person_from_form
+from memo_cache import normalize_value
+from question_bank import default_bank
+
+
+# 条例到案件类别（模板名、题库）的映射
+REGULATION_MAP = {
+    "第十四条第一款第一项（普通工伤案件）": "普通工伤案件",
+    "第十四条第一款第二项（预备收尾案件）": "预备收尾案件",
+    "第十四条第一款第三项（暴力伤害案件）": "暴力伤害案件",
+    "第十四条第一款第四项（患职业病案件）": "患职业病案件",
+    "第十四条第一款第五项（因工外出案件）": "因工外出案件",
+    "第十四条第一款第六项（上下班时案件）": "上下班时案件",
+    "第十五条第一款第一项（工作时因病亡故案件）": "工作时因病亡故案件",
+    # 可以继续添加其他映射
+}
+
+
+def description_fields(data):
+    """生成自我介绍用到的字段（已去除首尾空白）"""
+    person_type = data['人员类型']  # 本人/证人/法人
+    return tuple(normalize_value(value) for value in (
+        person_type,
+        data.get(f'{person_type}姓名', ''),  # 姓名的键名随人员类型不同
+        data.get('用人单位', ''),
+        data.get('用工单位', ''),
+        data.get('工作场所', ''),
+        data.get(f'{person_type}岗位', ''),
+    ))
+
+
+def build_description(data):
+    """根据人员类型和单位情况生成描述语句"""
+    return _compose_description(*description_fields(data))
+
+
+def _compose_description(person_type, name, employer, work_unit, workplace, position):
+    # 生成描述语句
+    if employer and work_unit and workplace:
+        description = f"我是{name}，系{employer}的职工，被指派到{work_unit}的{workplace}工作。从事{position}工作。"
+    elif employer and work_unit:
+        description = f"我是{name}，系{employer}的职工，被指派到{work_unit}工作。从事{position}工作。"
+    elif employer:
+        description = f"我是{name}，系{employer}的职工。从事{position}工作。"
+    else:
+        description = f"我是{name}。从事{position}工作。"
+
+    return f"答：{description}"
+
+
+def regulation_name(regulation):
+    """条例全称转换为案件类别简称，没有匹配时为"普通工伤案件" """
+    return REGULATION_MAP.get(regulation, "普通工伤案件")
+
+
+def build_case_questions(case_type, data):
+    """根据案件类型、条例和人员类型从题库生成对应的问答句"""
+    if case_type == "普通案件":
+        return []
+
+    return default_bank().questions(
+        case_type,
+        regulation_name(data.get('条例', '')),
+        data.get('人员类型', ''),
+        data,
+    )
+
+
+def insert_description(doc, description):
+    """将自我介绍插入到文档中（在指定问题后面插入）"""
+    paragraphs = doc.paragraphs
+
+    # 查找目标段落
+    for i, paragraph in enumerate(paragraphs):
+        if "问：请介绍一下你的姓名" in paragraph.text:
+            # 如果后面还有段落，在下一个段落前面插入
+            if i < len(paragraphs) - 1:
+                paragraphs[i + 1].insert_paragraph_before(description)
+            else:
+                # 如果是最后一个段落，直接在末尾添加
+                doc.add_paragraph(description)
+            break
+
+    return doc
+
+
+def add_questions(doc, questions):
+    """将案件类型问答句添加到文档末尾"""
+    if questions:
+        doc.add_paragraph()  # 空行
+        for q in questions:
+            doc.add_paragraph(q)
+    return doc
+
+
+def transcript_placeholders(data):
+    """按人员类型返回笔录模板的占位符"""
+    person_type = data['人员类型']
+
+    if person_type in ("证人", "法人"):
+        person = person_from_form(data, person_type)
+        placeholders = {
+            '受伤职工': data['受伤职工'],
+            f'{person_type}姓名': person.name,
+            f'{person_type}身份证': person.id_card,
+            f'{person_type}电话': person.phone,
+            '当前日期': data.get('当前日期', ''),
+            '当前时间': data.get('当前时间', ''),
+        }
+        if person_type == "法人":
+            placeholders['法人岗位'] = person.position
+        return placeholders
+
+    # 本人笔录使用全部表单字段
+    return data
+
+
+def transcript_content(data):
+    """笔录的全部生成内容：占位符、自我介绍（仅本人）和问答句"""
+    placeholders = transcript_placeholders(data)
+    description = build_description(data) if data['人员类型'] == "本人" else None
+
+    questions = build_case_questions(data['案件类型'], data)
+
+    return placeholders, description, questions
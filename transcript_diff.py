@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+笔录比对 - 比较两个版本的笔录，只重新提取有变化的问答
+
+- 段落文字直接从 word/document.xml 流式读取，不经过 python-docx
+- 每个段落取哈希后做 patience diff（以两边都只出现一次的段落为锚点，
+  锚点之间递归；没有锚点的片段交给 difflib）
+- 原笔录中的问答位置经比对结果映射到新笔录，未改动的问答不再重新提取
+"""
+
+import os
+import bisect
+import difflib
+import hashlib
+import zipfile
+from xml.etree import ElementTree
+
+from memo_cache import MemoCache, make_key
+
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+# 提取字段 -> 问题关键词（段落中出现两个及以上即为该问题）
+ANSWER_FIELDS = {
+    '受伤经过': ['什么工作原因', '事故发生', '具体经过'],
+    '就医情况': ['受伤后', '哪个医院', '是谁送你'],
+    '医疗结论': ['此次受伤', '医院对你', '医疗结论'],
+}
+
+# 文件路径+修改时间+大小 -> (段落文字, 问答位置)
+_paragraph_cache = MemoCache(maxsize=32)
+
+
+# ---------- 读取 ----------
+
+def _read_paragraphs(path):
+    """正文段落的文字（与 python-docx 的 doc.paragraphs 一致，不含表格内段落）"""
+    texts = []
+    depth = 0
+    parts = None
+    with zipfile.ZipFile(path) as zf, zf.open('word/document.xml') as f:
+        for event, elem in ElementTree.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                if elem.tag == _W + 'p':
+                    depth += 1
+                    if depth == 1 and parts is None:
+                        parts = []
+                elif elem.tag == _W + 'tbl':
+                    depth += 1
+                continue
+
+            tag = elem.tag
+            if parts is not None and depth == 1:
+                if tag == _W + 't':
+                    parts.append(elem.text or '')
+                elif tag == _W + 'tab':
+                    parts.append('\t')
+                elif tag in (_W + 'br', _W + 'cr'):
+                    parts.append('\n')
+            if tag == _W + 'p' or tag == _W + 'tbl':
+                depth -= 1
+                if tag == _W + 'p' and depth == 0 and parts is not None:
+                    texts.append(''.join(parts))
+                    parts = None
+                elem.clear()
+    return texts
+
+
+def read_transcript(path):
+    """读取笔录：返回 (段落文字列表, 问答位置)，按文件修改时间缓存"""
+    stat = os.stat(path)
+    key = make_key('paragraphs', os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+    def compute():
+        texts = _read_paragraphs(path)
+        return texts, locate_answers(texts)
+
+    return _paragraph_cache.get_or_compute(key, compute)
+
+
+def paragraph_hashes(texts):
+    """段落哈希（忽略首尾空白）"""
+    return [hashlib.blake2b(text.strip().encode('utf-8'), digest_size=8).digest() for text in texts]
+
+
+# ---------- 问答 ----------
+
+def _is_question(field, text):
+    return sum(1 for keyword in ANSWER_FIELDS[field] if keyword in text) >= 2
+
+
+def _answer_text(texts, index):
+    if index >= len(texts):
+        return None
+    answer = texts[index].strip()
+    if answer.startswith('答：'):
+        answer = answer[2:].strip()
+    elif answer.startswith('答:'):
+        answer = answer[1:].strip()
+    return answer
+
+
+def locate_answers(texts, indexes=None):
+    """查找各字段的问题段落位置 {字段: 段落号}（每个字段取第一个），indexes 限定查找范围"""
+    found = {}
+    for i in (range(len(texts)) if indexes is None else indexes):
+        text = texts[i].strip()
+        if not text:
+            continue
+        for field in ANSWER_FIELDS:
+            if field not in found and _is_question(field, text):
+                found[field] = i
+                break
+        if len(found) == len(ANSWER_FIELDS):
+            break
+    return found
+
+
+def extract_answers(texts):
+    """提取全部字段的回答 {字段: 回答}，找不到的字段不返回"""
+    answers = {}
+    for field, i in locate_answers(texts).items():
+        answer = _answer_text(texts, i + 1)
+        if answer is not None:
+            answers[field] = answer
+    return answers
+
+
+# ---------- 比对 ----------
+
+def _unique_anchors(a, alo, ahi, b, blo, bhi):
+    """两边各只出现一次的相同元素中，两边顺序一致的最长序列 [(i, j), ...]"""
+    positions = {}
+    for i in range(alo, ahi):
+        entry = positions.get(a[i])
+        positions[a[i]] = [i, None] if entry is None else [-1, None]
+    for j in range(blo, bhi):
+        entry = positions.get(b[j])
+        if entry is not None and entry[0] >= 0:
+            entry[1] = j if entry[1] is None else -1
+
+    pairs = sorted((i, j) for i, j in positions.values() if i >= 0 and j is not None and j >= 0)
+
+    # 按 i 排列的 j 的最长递增子序列（patience 排序）
+    tails = []
+    tail_index = []
+    previous = [None] * len(pairs)
+    for k, (_, j) in enumerate(pairs):
+        pos = bisect.bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tail_index.append(k)
+        else:
+            tails[pos] = j
+            tail_index[pos] = k
+        previous[k] = tail_index[pos - 1] if pos > 0 else None
+
+    anchors = []
+    k = tail_index[-1] if tail_index else None
+    while k is not None:
+        anchors.append(pairs[k])
+        k = previous[k]
+    anchors.reverse()
+    return anchors
+
+
+def _match(a, alo, ahi, b, blo, bhi, matches):
+    """把 a[alo:ahi] 与 b[blo:bhi] 中相同的元素位置对加入 matches"""
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        matches.append((alo, blo))
+        alo += 1
+        blo += 1
+    tail = []
+    while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+        ahi -= 1
+        bhi -= 1
+        tail.append((ahi, bhi))
+
+    if alo < ahi and blo < bhi:
+        anchors = _unique_anchors(a, alo, ahi, b, blo, bhi)
+        if anchors:
+            for i, j in anchors:
+                _match(a, alo, i, b, blo, j, matches)
+                matches.append((i, j))
+                alo, blo = i + 1, j + 1
+            _match(a, alo, ahi, b, blo, bhi, matches)
+        else:
+            matcher = difflib.SequenceMatcher(None, a[alo:ahi], b[blo:bhi], autojunk=False)
+            for i, j, size in matcher.get_matching_blocks():
+                matches.extend((alo + i + k, blo + j + k) for k in range(size))
+
+    matches.extend(reversed(tail))
+
+
+def diff_opcodes(a, b):
+    """patience diff，返回与 difflib 相同格式的 [(tag, i1, i2, j1, j2), ...]"""
+    matches = []
+    _match(a, 0, len(a), b, 0, len(b), matches)
+    matches.append((len(a), len(b)))
+
+    opcodes = []
+    i = j = 0
+    for mi, mj in matches:
+        if mi > i or mj > j:
+            tag = 'replace' if mi > i and mj > j else ('delete' if mi > i else 'insert')
+            opcodes.append((tag, i, mi, j, mj))
+        if mi < len(a):
+            if opcodes and opcodes[-1][0] == 'equal':
+                _, i1, _, j1, _ = opcodes[-1]
+                opcodes[-1] = ('equal', i1, mi + 1, j1, mj + 1)
+            else:
+                opcodes.append(('equal', mi, mi + 1, mj, mj + 1))
+        i, j = mi + 1, mj + 1
+    return opcodes
+
+
+def diff_paragraphs(old_texts, new_texts):
+    """段落级比对：返回 (opcodes, 旧段落号 -> 新段落号, 新笔录中有变化的段落号集合)"""
+    opcodes = diff_opcodes(paragraph_hashes(old_texts), paragraph_hashes(new_texts))
+    mapping = {}
+    changed = set()
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            mapping.update(zip(range(i1, i2), range(j1, j2)))
+        else:
+            changed.update(range(j1, j2))
+    return opcodes, mapping, changed
+
+
+def changed_answers(old_path, new_path):
+    """比较两个版本的笔录，只对问答有变化的字段重新提取
+    返回 {字段: 新回答}，没有变化时为空
+    """
+    old_texts, old_found = read_transcript(old_path)
+    new_texts, _ = read_transcript(new_path)
+    _, mapping, changed = diff_paragraphs(old_texts, new_texts)
+
+    result = {}
+    lookup = None
+    for field in ANSWER_FIELDS:
+        old_question = old_found.get(field)
+        new_question = mapping.get(old_question) if old_question is not None else None
+
+        if new_question is not None and mapping.get(old_question + 1) == new_question + 1:
+            continue  # 问题和回答都没有变化
+
+        if new_question is None:
+            # 问题是新加的或被改写过，只在有变化的段落中查找
+            if lookup is None:
+                lookup = locate_answers(new_texts, sorted(changed))
+            new_question = lookup.get(field)
+            if new_question is None:
+                continue
+
+        answer = _answer_text(new_texts, new_question + 1)
+        if answer is None:
+            continue
+        old_answer = _answer_text(old_texts, old_question + 1) if old_question is not None else None
+        if answer != old_answer:
+            result[field] = answer
+    return result